@@ -0,0 +1,353 @@
+"""
+Benchmark L'IA Pero
+
+Mesure reproductible des chemins critiques de l'application, hors-ligne:
+
+- guardrail: backend.check_relevance
+- scoring: scoring.calculate_weighted_coverage_score
+- recherche: app.search_cocktails_sbert sur des catalogues synthétiques de
+  600, 10 000 et 100 000 cocktails (src/generate_data.py), avec et sans
+  filtre de métadonnées
+- cache de recettes: écriture et lecture SQLite, chargement et écriture de
+  l'ancien cache JSON, pour plusieurs tailles de cache
+
+Par défaut, l'encodeur est un encodeur factice déterministe (sac de mots
+projeté par hachage, même dimension que all-MiniLM-L6-v2): les temps mesurés
+sont ceux du code de l'application, pas ceux du transformer. `--encoder sbert`
+utilise le vrai modèle s'il est disponible localement.
+
+Les résultats sont écrits en JSON et comparés à une référence
+(scripts/benchmark_baseline.json): une mesure dont la médiane dépasse celle
+de la référence de plus de --tolerance (et de plus de --min-delta-ms) est
+signalée comme régression. La référence dépend de la machine: la régénérer
+avec --update-baseline sur la machine de mesure.
+
+Usage:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --sizes 600 10000 --check
+    python scripts/benchmark.py --update-baseline
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+# Ajouter le répertoire parent au path pour importer depuis src/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("PREFETCH_ENABLED", "0")
+
+from src import backend, embeddings
+from src.catalog import CocktailCatalog
+from src.generate_data import generate_dataset
+from src.recipe_cache import JsonRecipeCache, SQLiteRecipeCache
+from src.scoring import DEFAULT_USER_WEIGHTS, calculate_weighted_coverage_score
+from src.vector_index import build_index
+
+BASELINE_FILE = Path(__file__).parent / "benchmark_baseline.json"
+RESULTS_FILE = Path(__file__).parent.parent / "data" / "benchmark_results.json"
+
+CORPUS_SIZES = [600, 10_000, 100_000]
+CACHE_SIZES = [100, 1_000, 10_000]
+RANDOM_SEED = 42
+
+QUERY_TEMPLATES = [
+    "un cocktail tropical et rafraichissant",
+    "quelque chose d'amer avec du gin",
+    "un mojito bien frais pour l'ete",
+    "une boisson sans alcool fruitee",
+    "un whisky fume pour l'hiver",
+    "un spritz leger en terrasse",
+    "un classique des annees folles",
+    "reparer mon velo",
+]
+
+
+class StubEncoder:
+    """
+    Encodeur factice déterministe (API de SentenceTransformer.encode).
+
+    Chaque mot est projeté sur un vecteur pseudo-aléatoire (graine = hash du
+    mot, mis en cache), un texte est la somme de ses mots.
+    """
+
+    dimension = 384
+
+    def __init__(self):
+        self._vectors = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._vectors.get(word)
+        if vector is None:
+            seed = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+            self._vectors[word] = vector
+        return vector
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i] += self._word_vector(word)
+        return vectors[0] if single else vectors
+
+
+def make_queries(count: int, tag: str) -> list:
+    """
+    Requêtes distinctes, propres à un benchmark (`tag`): aucune n'est servie
+    par le mémo d'encodage rempli par un autre benchmark.
+    """
+    return [f"{QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)]} {tag} {i}" for i in range(count)]
+
+
+def measure(fn, inputs, warmup: int = 3) -> dict:
+    """
+    Chronomètre `fn(x)` pour chaque entrée (après `warmup` appels à blanc).
+
+    Returns:
+        dict: iterations, mean_ms, p50_ms, p95_ms, min_ms
+    """
+    for x in inputs[:warmup]:
+        fn(x)
+    durations = []
+    for x in inputs:
+        start = time.perf_counter()
+        fn(x)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations = np.asarray(durations)
+    return {
+        "iterations": len(durations),
+        "mean_ms": round(float(durations.mean()), 4),
+        "p50_ms": round(float(np.percentile(durations, 50)), 4),
+        "p95_ms": round(float(np.percentile(durations, 95)), 4),
+        "min_ms": round(float(durations.min()), 4),
+    }
+
+
+def measure_once(fn) -> dict:
+    """Chronomètre une opération unique (construction, écriture en lot)."""
+    start = time.perf_counter()
+    fn()
+    ms = round((time.perf_counter() - start) * 1000, 4)
+    return {"iterations": 1, "mean_ms": ms, "p50_ms": ms, "p95_ms": ms, "min_ms": ms}
+
+
+# =============================================================================
+# BENCHMARKS
+# =============================================================================
+def bench_guardrail(model, iterations: int) -> dict:
+    backend._get_keyword_embeddings.cache_clear()
+    with patch.object(backend, "get_sbert_model", return_value=model):
+        return {"guardrail.check_relevance": measure(backend.check_relevance, make_queries(iterations, "guardrail"))}
+
+
+def bench_scoring(model, iterations: int) -> dict:
+    def score(query):
+        calculate_weighted_coverage_score(query, DEFAULT_USER_WEIGHTS, model)
+    return {"scoring.coverage_score": measure(score, make_queries(iterations, "scoring"))}
+
+
+def synthesize_catalog(size: int, model) -> tuple:
+    """Catalogue synthétique (generate_data) et ses embeddings normalisés."""
+    random.seed(RANDOM_SEED)
+    np.random.seed(RANDOM_SEED)
+    logging.disable(logging.INFO)
+    try:
+        df = generate_dataset(size)
+    finally:
+        logging.disable(logging.NOTSET)
+    df["source"] = "generated"
+
+    catalog = CocktailCatalog.from_dataframe(df)
+    texts = [f"{n}. {d}" for n, d in zip(catalog.names, catalog.descriptions)]
+    vectors = np.asarray(model.encode(texts, batch_size=256, convert_to_numpy=True), dtype=np.float32)
+    return catalog, embeddings.normalize_embeddings(vectors)
+
+
+def bench_search(model, sizes, iterations: int) -> dict:
+    from src import app
+
+    results = {}
+    for size in sizes:
+        catalog, vectors = synthesize_catalog(size, model)
+        index_holder = {}
+        results[f"search.build_index.{size}"] = measure_once(
+            lambda: index_holder.setdefault("index", build_index(vectors))
+        )
+        index = index_holder["index"]
+
+        with patch.object(app, "load_cocktail_catalog", return_value=catalog), \
+                patch.object(app, "_get_cocktail_index", return_value=index), \
+                patch.object(backend, "get_sbert_model", return_value=model):
+            results[f"search.sbert.{size}"] = measure(
+                lambda q: app.search_cocktails_sbert(q, top_k=5),
+                make_queries(iterations, f"search{size}"),
+            )
+            results[f"search.sbert_filtered.{size}"] = measure(
+                lambda q: app.search_cocktails_sbert(q, top_k=5, filters={"difficulty": "Facile"}),
+                make_queries(iterations, f"filtered{size}"),
+            )
+        print(f"   search @ {size:>7,}: {results[f'search.sbert.{size}']['p50_ms']:.2f} ms (p50)")
+    return results
+
+
+def bench_cache(sizes, iterations: int) -> dict:
+    recipe = {
+        "name": "Le Benchmark",
+        "ingredients": ["50ml Gin", "20ml Citron", "10ml Sirop"],
+        "instructions": "1. Secouer. 2. Filtrer.",
+        "taste_profile": {"Douceur": 3.0, "Acidite": 4.0, "Amertume": 1.0, "Force": 3.0},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            items = [(f"key-{size}-{i}", recipe) for i in range(size)]
+            keys = [key for key, _ in items]
+            lookups = random.Random(RANDOM_SEED).choices(keys, k=iterations)
+
+            sqlite_cache = SQLiteRecipeCache(Path(tmp) / f"cache-{size}.db")
+            results[f"cache.sqlite.save_many.{size}"] = measure_once(lambda: sqlite_cache.set_many(items))
+            results[f"cache.sqlite.get.{size}"] = measure(sqlite_cache.get, lookups)
+            results[f"cache.sqlite.set.{size}"] = measure(
+                lambda i: sqlite_cache.set(f"new-{i}", recipe), list(range(min(iterations, 50)))
+            )
+            sqlite_cache.close()
+
+            json_path = Path(tmp) / f"cache-{size}.json"
+            json_path.write_text(json.dumps(dict(items)), encoding="utf-8")
+            json_cache = JsonRecipeCache(json_path)
+            repeats = list(range(5 if size >= 10_000 else 20))
+            results[f"cache.json.load.{size}"] = measure(lambda _: json_cache.load(), repeats, warmup=1)
+            results[f"cache.json.set.{size}"] = measure(
+                lambda i: json_cache.set(f"new-{i}", recipe), repeats, warmup=1
+            )
+    return results
+
+
+# =============================================================================
+# COMPARAISON
+# =============================================================================
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """
+    Compare les médianes aux mesures de référence.
+
+    Returns:
+        list[dict]: Régressions (name, baseline_ms, current_ms, ratio)
+    """
+    regressions = []
+    for name, current in results.get("benchmarks", {}).items():
+        reference = baseline.get("benchmarks", {}).get(name)
+        if reference is None:
+            continue
+        base_ms, current_ms = reference["p50_ms"], current["p50_ms"]
+        if current_ms > base_ms * (1 + tolerance) and current_ms - base_ms > min_delta_ms:
+            regressions.append({
+                "name": name,
+                "baseline_ms": base_ms,
+                "current_ms": current_ms,
+                "ratio": round(current_ms / base_ms, 2) if base_ms else None,
+            })
+    return regressions
+
+
+def load_encoder(name: str):
+    if name == "sbert":
+        return backend.get_sbert_model()
+    return StubEncoder()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des chemins critiques de L'IA Pero")
+    parser.add_argument("--sizes", type=int, nargs="+", default=CORPUS_SIZES, help="Tailles de catalogue")
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=CACHE_SIZES, help="Tailles de cache")
+    parser.add_argument("--iterations", type=int, default=200, help="Appels mesurés par benchmark")
+    parser.add_argument("--encoder", choices=["stub", "sbert"], default="stub")
+    parser.add_argument("--output", type=Path, default=RESULTS_FILE, help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Fichier JSON de référence")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Hausse relative tolérée (0.25 = +25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="Hausse absolue ignorée (bruit)")
+    parser.add_argument("--check", action="store_true", help="Code de sortie 1 en cas de régression")
+    parser.add_argument("--update-baseline", action="store_true", help="Enregistre les résultats comme référence")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK L'IA PERO")
+    print("=" * 60)
+
+    model = load_encoder(args.encoder)
+    benchmarks = {}
+
+    print("\n[1/4] Guardrail...")
+    benchmarks.update(bench_guardrail(model, args.iterations))
+    print("[2/4] Scoring...")
+    benchmarks.update(bench_scoring(model, args.iterations))
+    print("[3/4] Recherche SBERT...")
+    benchmarks.update(bench_search(model, args.sizes, args.iterations))
+    print("[4/4] Cache de recettes...")
+    benchmarks.update(bench_cache(args.cache_sizes, args.iterations))
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "encoder": args.encoder,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "iterations": args.iterations,
+        },
+        "benchmarks": benchmarks,
+    }
+
+    print(f"\n{'Benchmark':<36} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    print("-" * 58)
+    for name, stats in benchmarks.items():
+        print(f"{name:<36} {stats['p50_ms']:>10.3f} {stats['p95_ms']:>10.3f}")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    print(f"\n[OK] Résultats: {args.output}")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"[OK] Référence mise à jour: {args.baseline}")
+        return
+
+    if not args.baseline.exists():
+        print(f"[WARN] Pas de référence ({args.baseline}): lancer avec --update-baseline")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("meta", {}).get("encoder") != args.encoder:
+        print("[WARN] Référence mesurée avec un autre encodeur: comparaison ignorée")
+        return
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+    if not regressions:
+        print(f"[OK] Aucune régression (tolérance +{args.tolerance:.0%})")
+        return
+
+    print(f"[REGRESSION] {len(regressions)} mesure(s) au-delà de +{args.tolerance:.0%}:")
+    for r in regressions:
+        print(f"   - {r['name']}: {r['baseline_ms']:.3f} ms -> {r['current_ms']:.3f} ms (x{r['ratio']})")
+    if args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
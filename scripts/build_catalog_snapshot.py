@@ -0,0 +1,61 @@
+"""
+Build Catalog Snapshot
+
+Ce script compile les CSV du catalogue (data/cocktails.csv et
+data/kaggle_cocktails_enriched.csv) en un snapshot binaire versionné
+(data/snapshot/), chargé en memory-map par l'application au démarrage.
+
+A relancer après chaque modification des CSV (generate_data.py,
+enrich_kaggle.py): tant que le snapshot est périmé, l'application
+repasse par les CSV.
+
+Usage:
+    python scripts/build_catalog_snapshot.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le répertoire parent au path pour importer depuis src/
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.catalog import CATALOG_SOURCES, CocktailCatalog, read_catalog_sources
+from src.catalog_snapshot import build_snapshot, load_snapshot
+
+
+def main():
+    """Compile les CSV et vérifie le snapshot produit."""
+    print("=" * 60)
+    print("BUILD CATALOG SNAPSHOT")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    df = read_catalog_sources()
+    if df.empty:
+        print("[ERROR] Aucun CSV trouvé:")
+        for _, path in CATALOG_SOURCES:
+            print(f"   - {path}")
+        sys.exit(1)
+
+    catalog = CocktailCatalog.from_dataframe(df)
+    csv_time = time.perf_counter() - start
+    print(f"[OK] {len(catalog)} cocktails lus depuis les CSV ({csv_time * 1000:.0f} ms)")
+
+    manifest_path = build_snapshot(catalog)
+    print(f"[SAVE] Snapshot publié: {manifest_path}")
+
+    # Vérification: rechargement en memory-map
+    start = time.perf_counter()
+    snapshot = load_snapshot()
+    snapshot_time = time.perf_counter() - start
+    if snapshot is None or len(snapshot) != len(catalog):
+        print("[ERROR] Le snapshot produit n'est pas relisible")
+        sys.exit(1)
+
+    print(f"[OK] Rechargement du snapshot: {snapshot_time * 1000:.1f} ms")
+    print("[DONE] Snapshot à jour")
+
+
+if __name__ == "__main__":
+    main()
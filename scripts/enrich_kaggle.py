@@ -19,17 +19,18 @@ Pré-requis:
 
 import sys
 import json
-import re
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
 import pandas as pd
 import logging
 
-# Ajouter src/ au path
+# Ajouter src/ au path (et la racine du projet pour les imports src.*)
+sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 from ingredient_profiler import IngredientProfiler
 from kaggle_integration import parse_kaggle_dataset
+from src.text_normalization import split_quantity
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -45,46 +46,20 @@ def parse_ingredient_text(ingredient_text: str) -> tuple[float, str]:
     Returns:
         Tuple (quantity_ml, ingredient_name)
     """
-    # Extraire quantité
-    quantity = 1.0  # Défaut
-
-    # Patterns pour quantités
-    patterns = [
-        (r'^(\d+(?:\.\d+)?)\s*ml', 1.0),      # 60ml
-        (r'^(\d+(?:\.\d+)?)\s*cl', 10.0),     # 6cl = 60ml
-        (r'^(\d+(?:\.\d+)?)\s*oz', 30.0),     # 2oz ≈ 60ml
-        (r'^(\d+)/(\d+)\s*oz', 30.0),         # 1/2oz ≈ 15ml
-        (r'^(\d+(?:\.\d+)?)\s*cup', 240.0),   # 1 cup ≈ 240ml
-        (r'^(\d+(?:\.\d+)?)\s*tsp', 5.0),     # 1 tsp ≈ 5ml
-        (r'^(\d+(?:\.\d+)?)\s*tbsp', 15.0),   # 1 tbsp ≈ 15ml
-    ]
-
-    for pattern, multiplier in patterns:
-        match = re.search(pattern, ingredient_text, re.IGNORECASE)
-        if match:
-            if '/' in pattern:
-                # Fraction
-                num, denom = match.groups()
-                quantity = (float(num) / float(denom)) * multiplier
-            else:
-                quantity = float(match.group(1)) * multiplier
-            break
-
-    # Extraire nom de l'ingrédient
-    name = re.sub(r'^\d+(\.\d+)?\s*(ml|oz|cl|cup|tsp|tbsp|dash|splash)?\s*', '', ingredient_text, flags=re.IGNORECASE)
-    name = re.sub(r'^\d+/\d+\s*(ml|oz|cl|cup|tsp|tbsp)?\s*', '', name, flags=re.IGNORECASE)
-    name = name.strip()
-
-    return quantity, name
-
-
-def compute_cocktail_profile(ingredients_list: List[str], profiler: IngredientProfiler) -> Dict:
+    # Motifs précompilés et résultat mémoïsé (src/text_normalization.py)
+    return split_quantity(ingredient_text)
+
+
+def compute_cocktail_profile(ingredients_list: List[str], profiler: IngredientProfiler,
+                             known_profiles: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     Calcule le profil de saveurs d'un cocktail par moyenne pondérée.
 
     Args:
         ingredients_list: Liste d'ingrédients (ex: ["60ml Vodka", "30ml Jus d'orange"])
         profiler: Instance de IngredientProfiler
+        known_profiles: Profils déjà résolus (nom → profil), complétés en
+            place par un seul appel à `profiler.get_profiles()`
 
     Returns:
         dict: Profil {Douceur, Acidite, Amertume, Force, Fraicheur}
@@ -99,21 +74,24 @@ def compute_cocktail_profile(ingredients_list: List[str], profiler: IngredientPr
             "Fraicheur": 2.5
         }
 
-    profiles = []
-    weights = []
-
+    parsed = []
     for ing_text in ingredients_list:
         try:
-            quantity, name = parse_ingredient_text(ing_text)
-            profile = profiler.get_profile(name)
-
-            profiles.append(profile)
-            weights.append(quantity)
-
+            parsed.append(parse_ingredient_text(ing_text))
         except Exception as e:
             logger.warning(f"[WARN] Failed to parse ingredient {ing_text}: {e}")
             continue
 
+    # Noms pas encore résolus: un seul passage groupé dans le profiler
+    if known_profiles is None:
+        known_profiles = {}
+    missing = list(dict.fromkeys(name for _, name in parsed if name not in known_profiles))
+    if missing:
+        known_profiles.update(zip(missing, profiler.get_profiles(missing)))
+
+    profiles = [known_profiles[name] for _, name in parsed]
+    weights = [quantity for quantity, _ in parsed]
+
     if not profiles:
         # Fallback si aucun profil obtenu
         return {
@@ -265,8 +243,11 @@ def main():
     known_hits = 0
     fallback_hits = 0
 
-    for idx, ingredient in enumerate(unique_ingredients, 1):
-        profile = profiler.get_profile(ingredient)
+    # Résolution groupée: alias, un encodage SBERT, prompts Gemini groupés
+    unique_ingredients = sorted(unique_ingredients)
+    ingredient_profiles = dict(zip(unique_ingredients, profiler.get_profiles(unique_ingredients)))
+
+    for profile in ingredient_profiles.values():
         source = profile.get('source', 'unknown')
 
         if source == 'gemini':
@@ -278,10 +259,6 @@ def main():
         elif source == 'fallback':
             fallback_hits += 1
 
-        # Afficher progression tous les 10 ingrédients
-        if idx % 10 == 0:
-            logger.info(f"  Progress: {idx}/{len(unique_ingredients)} ingredients processed...")
-
     logger.info(f"\n[STATS] Profiling statistics:")
     logger.info(f"  - Known base: {known_hits}")
     logger.info(f"  - Similarity: {similarity_hits}")
@@ -299,7 +276,7 @@ def main():
             ingredients_list = json.loads(row['ingredients'])
 
             # Calculer profil
-            taste_profile = compute_cocktail_profile(ingredients_list, profiler)
+            taste_profile = compute_cocktail_profile(ingredients_list, profiler, ingredient_profiles)
 
             # Générer colonnes manquantes
             description_semantique = generate_semantic_desc(row)
@@ -11,22 +11,18 @@ import os
 import sys
 from pathlib import Path
 import re
-import unicodedata
 
 # Ajouter le répertoire parent au path pour importer depuis src/
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.generate_data import SPIRITS, MIXERS, MODIFIERS
+from src import text_normalization
 
 
 def normalize_name(name: str) -> str:
     """Normalise un nom d'ingrédient (minuscules, sans accents, nettoyé)."""
-    # Supprimer les accents
-    name = ''.join(c for c in unicodedata.normalize('NFD', name)
-                   if unicodedata.category(c) != 'Mn')
-    # Minuscules et strip
-    name = name.lower().strip()
-    return name
+    # Ponctuation conservée: les clés gardent leurs apostrophes ("jus d'orange")
+    return text_normalization.normalize_name(name, strip_punctuation=False)
 
 
 def create_en_mappings():
@@ -9,7 +9,8 @@ import json
 from pathlib import Path
 import pandas as pd
 
-# Ajouter src/ au path
+# Ajouter src/ au path (et la racine du projet pour les imports src.*)
+sys.path.insert(0, str(Path(__file__).parent.parent))
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 def test_known_ingredients():
@@ -0,0 +1,392 @@
+"""
+L'IA Pero - Journal d'analytics en ajout seul
+===============================================
+
+Chaque génération est journalisée (requête, cocktail, durée, cache, statut)
+dans des fichiers JSON Lines en ajout seul, au lieu de relire et réécrire un
+unique analytics.json à chaque requête:
+
+    data/analytics/
+        analytics-20260116.jsonl      # un segment par jour...
+        analytics-20260116.1.jsonl    # ...et un nouveau dès ANALYTICS_MAX_BYTES
+        aggregates.json               # agrégats courants (onglet Stats)
+
+- **Écritures bufferisées**: `record()` ajoute l'entrée à un tampon en
+  mémoire (O(1), sans I/O); un thread d'arrière-plan écrit le tampon par
+  lots toutes les ANALYTICS_FLUSH_INTERVAL secondes. Un seul journal par
+  processus: les sessions concurrentes ne perdent plus d'entrées.
+- **Rotation**: par date et par taille; seuls les ANALYTICS_MAX_FILES
+  segments les plus récents sont conservés.
+- **Agrégats incrémentaux**: compteurs et requêtes fréquentes mis à jour à
+  chaque entrée et sauvegardés avec chaque lot; `summary()` et
+  `top_queries()` ne relisent jamais l'historique brut.
+
+L'ancien data/analytics.json est importé au premier démarrage puis renommé
+en analytics.json.migrated.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+ANALYTICS_DIR = Path(os.getenv("ANALYTICS_DIR", str(DATA_DIR / "analytics")))
+
+# Ancien journal (liste JSON réécrite à chaque requête), importé une fois
+LEGACY_ANALYTICS_FILE = DATA_DIR / "analytics.json"
+
+# Taille maximum d'un segment, segments conservés, délai entre deux écritures
+ANALYTICS_MAX_BYTES = int(os.getenv("ANALYTICS_MAX_BYTES", str(5 * 1024 * 1024)))
+ANALYTICS_MAX_FILES = int(os.getenv("ANALYTICS_MAX_FILES", "30"))
+ANALYTICS_FLUSH_INTERVAL = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "2"))
+
+# Requêtes distinctes suivies pour top_queries() (les moins fréquentes sont
+# oubliées au-delà)
+MAX_TRACKED_QUERIES = 1000
+
+AGGREGATES_FILE = "aggregates.json"
+_SEGMENT_PATTERN = re.compile(r"^analytics-(\d{8})(?:\.(\d+))?\.jsonl$")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Clé de regroupement d'une requête (casse et espaces ignorés)."""
+    return " ".join(query.lower().split())
+
+
+class AnalyticsAggregates:
+    """Agrégats incrémentaux des entrées du journal."""
+
+    def __init__(self):
+        self.requests = 0
+        self.ok = 0
+        self.errors = 0
+        self.cached = 0
+        self.total_duration_ms = 0.0
+        self.first_timestamp: Optional[str] = None
+        self.last_timestamp: Optional[str] = None
+        self.query_counts: Counter = Counter()
+        self.query_forms: Dict[str, str] = {}
+
+    def add(self, entry: dict) -> None:
+        self.requests += 1
+        if entry.get("status") == "ok":
+            self.ok += 1
+            query = entry.get("query")
+            if isinstance(query, str) and query.strip():
+                key = normalize_query(query)
+                self.query_counts[key] += 1
+                self.query_forms.setdefault(key, query.strip())
+                if len(self.query_counts) > 2 * MAX_TRACKED_QUERIES:
+                    self._prune()
+        else:
+            self.errors += 1
+        if entry.get("cached"):
+            self.cached += 1
+        duration = entry.get("duration_ms")
+        if isinstance(duration, (int, float)):
+            self.total_duration_ms += duration
+
+        timestamp = entry.get("timestamp")
+        if isinstance(timestamp, str):
+            if self.first_timestamp is None:
+                self.first_timestamp = timestamp
+            self.last_timestamp = timestamp
+
+    def _prune(self) -> None:
+        self.query_counts = Counter(dict(self.query_counts.most_common(MAX_TRACKED_QUERIES)))
+        self.query_forms = {key: self.query_forms[key] for key in self.query_counts}
+
+    def summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "ok": self.ok,
+            "errors": self.errors,
+            "cached": self.cached,
+            "cache_hit_rate": round(self.cached / self.requests, 3) if self.requests else 0.0,
+            "avg_duration_ms": round(self.total_duration_ms / self.requests, 2) if self.requests else 0.0,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+        }
+
+    def top_queries(self, n: int) -> List[Tuple[str, int]]:
+        return [(self.query_forms[key], count) for key, count in self.query_counts.most_common(n)]
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        data["total_duration_ms"] = self.total_duration_ms
+        data["queries"] = [[self.query_forms[key], count] for key, count in self.query_counts.most_common()]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "AnalyticsAggregates":
+        aggregates = cls()
+        for field in ("requests", "ok", "errors", "cached"):
+            setattr(aggregates, field, int(data.get(field, 0)))
+        aggregates.total_duration_ms = float(data.get("total_duration_ms", 0.0))
+        aggregates.first_timestamp = data.get("first_timestamp")
+        aggregates.last_timestamp = data.get("last_timestamp")
+        for query, count in data.get("queries", []):
+            key = normalize_query(query)
+            aggregates.query_counts[key] += int(count)
+            aggregates.query_forms.setdefault(key, query)
+        return aggregates
+
+
+class AnalyticsLog:
+    """
+    Journal d'analytics JSON Lines: écritures bufferisées, rotation, agrégats.
+
+    Usage:
+        log = get_analytics_log()
+        log.record({"timestamp": ..., "query": ..., "status": "ok", ...})
+        log.summary()           # onglet Stats
+        log.top_queries(10)     # préchauffage du cache
+    """
+
+    def __init__(
+        self,
+        directory: Path = ANALYTICS_DIR,
+        max_bytes: int = ANALYTICS_MAX_BYTES,
+        max_files: int = ANALYTICS_MAX_FILES,
+        flush_interval: Optional[float] = ANALYTICS_FLUSH_INTERVAL,
+        legacy_file: Optional[Path] = LEGACY_ANALYTICS_FILE,
+        clock: Callable[[], datetime] = datetime.now
+    ):
+        """
+        Args:
+            directory: Répertoire des segments et des agrégats
+            max_bytes: Taille maximum d'un segment
+            max_files: Segments conservés (les plus anciens sont supprimés)
+            flush_interval: Secondes entre deux écritures du tampon (None:
+                pas de thread, écriture par `flush()` uniquement)
+            legacy_file: Ancien analytics.json à importer (None: aucun)
+            clock: Horloge (date des segments, injectable pour les tests)
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.legacy_file = legacy_file
+        self._clock = clock
+
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._aggregates: Optional[AnalyticsAggregates] = None
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+    def record(self, entry: dict) -> None:
+        """Ajoute une entrée au journal (tampon mémoire, sans I/O)."""
+        aggregates = self._ensure_loaded()
+        with self._lock:
+            self._buffer.append(entry)
+            aggregates.add(entry)
+        self._ensure_flusher()
+
+    def flush(self) -> int:
+        """
+        Écrit le tampon dans le segment courant et sauvegarde les agrégats.
+
+        Returns:
+            int: Nombre d'entrées écrites
+        """
+        with self._io_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                snapshot = self._aggregates.to_dict() if self._aggregates else None
+            if not batch:
+                return 0
+
+            lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in batch)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._current_segment(len(lines.encode("utf-8"))), "a", encoding="utf-8") as f:
+                f.write(lines)
+            self._write_aggregates(snapshot)
+            self._prune_segments()
+            return len(batch)
+
+    def close(self) -> None:
+        """Arrête le thread d'écriture et écrit le reste du tampon."""
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush()
+        except OSError as e:
+            logger.warning(f"Failed to flush analytics: {e}")
+
+    def _ensure_flusher(self) -> None:
+        if self.flush_interval is None or self._thread is not None or self._closed:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name="analytics-flush", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                # Non bloquant: les entrées de ce lot sont perdues, l'app continue
+                logger.warning(f"Failed to save analytics: {e}")
+
+    # ------------------------------------------------------------------
+    # Segments
+    # ------------------------------------------------------------------
+    def segments(self) -> List[Path]:
+        """Segments existants, du plus ancien au plus récent."""
+        if not self.directory.exists():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            match = _SEGMENT_PATTERN.match(path.name)
+            if match:
+                found.append(((match.group(1), int(match.group(2) or 0)), path))
+        return [path for _, path in sorted(found)]
+
+    def _segment_path(self, day: str, index: int) -> Path:
+        suffix = f".{index}" if index else ""
+        return self.directory / f"analytics-{day}{suffix}.jsonl"
+
+    def _current_segment(self, incoming_bytes: int) -> Path:
+        """Segment du jour, ou le suivant si l'ajout dépasse max_bytes."""
+        day = self._clock().strftime("%Y%m%d")
+        index = 0
+        for path in self.segments():
+            match = _SEGMENT_PATTERN.match(path.name)
+            if match.group(1) == day:
+                index = max(index, int(match.group(2) or 0))
+
+        path = self._segment_path(day, index)
+        if path.exists() and path.stat().st_size > 0 and path.stat().st_size + incoming_bytes > self.max_bytes:
+            path = self._segment_path(day, index + 1)
+        return path
+
+    def _prune_segments(self) -> None:
+        segments = self.segments()
+        for path in segments[:max(0, len(segments) - self.max_files)]:
+            path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Agrégats
+    # ------------------------------------------------------------------
+    def _ensure_loaded(self) -> AnalyticsAggregates:
+        """Charge les agrégats (ou les reconstruit une fois depuis les segments)."""
+        if self._aggregates is not None:
+            return self._aggregates
+        with self._io_lock:
+            if self._aggregates is not None:
+                return self._aggregates
+
+            aggregates = None
+            aggregates_path = self.directory / AGGREGATES_FILE
+            if aggregates_path.exists():
+                try:
+                    aggregates = AnalyticsAggregates.from_dict(
+                        json.loads(aggregates_path.read_text(encoding="utf-8"))
+                    )
+                except (OSError, ValueError, TypeError) as e:
+                    logger.warning(f"Rebuilding analytics aggregates: {e}")
+
+            if aggregates is None:
+                aggregates = AnalyticsAggregates()
+                for entry in self.iter_entries():
+                    aggregates.add(entry)
+                self._migrate_legacy(aggregates)
+
+            self._aggregates = aggregates
+            return aggregates
+
+    def _migrate_legacy(self, aggregates: AnalyticsAggregates) -> None:
+        """Importe l'ancien analytics.json dans un segment JSON Lines."""
+        if self.legacy_file is None or not Path(self.legacy_file).exists():
+            return
+        try:
+            entries = json.loads(Path(self.legacy_file).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to import legacy analytics: {e}")
+            return
+
+        entries = [entry for entry in entries if isinstance(entry, dict)]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self._current_segment(0), "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                aggregates.add(entry)
+        self._write_aggregates(aggregates.to_dict())
+        Path(self.legacy_file).rename(Path(str(self.legacy_file) + ".migrated"))
+        logger.info(f"Imported {len(entries)} legacy analytics entries")
+
+    def _write_aggregates(self, data: Optional[dict]) -> None:
+        if data is None:
+            return
+        path = self.directory / AGGREGATES_FILE
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def summary(self) -> dict:
+        """
+        Agrégats de tout le journal (sans relire les segments).
+
+        Returns:
+            dict: requests, ok, errors, cached, cache_hit_rate,
+            avg_duration_ms, first_timestamp, last_timestamp
+        """
+        aggregates = self._ensure_loaded()
+        with self._lock:
+            return aggregates.summary()
+
+    def top_queries(self, n: int = 10) -> List[Tuple[str, int]]:
+        """Requêtes réussies les plus fréquentes: [(requête, occurrences)]."""
+        aggregates = self._ensure_loaded()
+        with self._lock:
+            return aggregates.top_queries(n)
+
+    def iter_entries(self) -> Iterator[dict]:
+        """
+        Parcourt les entrées écrites, segment par segment (analyse hors-ligne).
+
+        Les lignes illisibles (écriture interrompue) sont ignorées.
+        """
+        for path in self.segments():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue
+            except FileNotFoundError:
+                continue
+
+
+@lru_cache(maxsize=1)
+def get_analytics_log() -> AnalyticsLog:
+    """Journal partagé par toutes les sessions du processus."""
+    return AnalyticsLog()
@@ -21,7 +21,29 @@ import pandas as pd
 import numpy as np
 import random
 
-from src.backend import generate_recipe, check_relevance, get_sbert_model
+from src.backend import (
+    generate_recipe_stream,
+    check_relevance,
+    encode_query,
+    get_sbert_model,
+    get_cache_stats,
+    get_model_stats,
+    MODEL_NAME,
+)
+from src.embedding_store import EmbeddingStore
+from src.vector_index import build_index
+from src.catalog import CocktailCatalog, read_catalog_sources
+from src.catalog_snapshot import load_snapshot
+from src.analytics import get_analytics_log
+from src.instrumentation import maybe_export_metrics, span, trace
+from src.prefetch import PREFETCH_ENABLED, get_cache_warmer
+from src.queries import (
+    SURPRISE_QUERIES,
+    BUDGET_OPTIONS,
+    DEFAULT_BUDGET,
+    DEFAULT_FILTERS,
+    build_final_query,
+)
 from src.scoring import (
     calculate_weighted_coverage_score,
     enrich_short_query,
@@ -39,18 +61,6 @@ logger = logging.getLogger("ia_pero_analytics")
 # CONSTANTS
 # =============================================================================
 COCKTAILS_CSV = Path(__file__).parent.parent / "data" / "cocktails.csv"
-ANALYTICS_FILE = Path(__file__).parent.parent / "data" / "analytics.json"
-
-SURPRISE_QUERIES = [
-    "Un cocktail mysterieux et envoûtant",
-    "Quelque chose de tropical et exotique",
-    "Un classique des annees folles",
-    "Une creation audacieuse et surprenante",
-    "Un cocktail doux et romantique",
-    "Quelque chose de fort et caractere",
-    "Un rafraichissement estival",
-    "Une boisson elegante pour une soiree chic",
-]
 
 # =============================================================================
 # PAGE CONFIGURATION (must be first Streamlit command)
@@ -392,6 +402,14 @@ def init_session_state():
             - cache_hits: Number of cache hits (vs API calls)
             - total_time: Cumulative generation time in seconds
             - requests_today: Reserved for future daily tracking
+            - memory_cache: In-memory recipe LRU counters (hits, misses,
+              evictions, expirations, hit_rate) and semantic cache counters
+              (semantic_hits, semantic_entries), shared by the worker process;
+              cache warmer lookups are counted apart (prefetch_hits,
+              prefetch_misses)
+            - models: Gemini router stats per model (rpm/rpd utilization and
+              availability, circuit state, call counters), shared by the
+              worker process
 
         selected_history (dict|None): Currently displayed history item
             - Used to show previous cocktail from sidebar
@@ -415,6 +433,8 @@ def init_session_state():
             "cache_hits": 0,        # Requests served from cache
             "total_time": 0,        # Cumulative generation time (seconds)
             "requests_today": 0,    # Reserved for daily stats
+            "memory_cache": get_cache_stats(),  # In-memory LRU counters
+            "models": get_model_stats(),        # Gemini budgets and circuits
         }
 
     # Initialize history selection state (no selection on startup)
@@ -423,12 +443,7 @@ def init_session_state():
 
     # Initialize filter defaults (show all options)
     if "filters" not in st.session_state:
-        st.session_state.filters = {
-            "source": "Tous",       # No source filter
-            "alcohol": "Tous",      # No alcohol filter
-            "difficulty": "Tous",   # No difficulty filter
-            "prep_time": "Tous",    # No time filter
-        }
+        st.session_state.filters = DEFAULT_FILTERS.copy()
 
     # Initialize user taste preferences (Likert scale 1-5) - EF1.1 RNCP
     if "taste_preferences" not in st.session_state:
@@ -442,18 +457,18 @@ def init_session_state():
 # =============================================================================
 # ANALYTICS & LOGGING
 # =============================================================================
-def log_request(query: str, result: dict, duration: float, cached: bool):
+def log_request(query: str, result: dict, duration: float, cached: bool, stages: dict | None = None):
     """
     Log cocktail generation request for analytics and monitoring.
 
     This function performs dual logging:
     1. Application logger (stdout) for real-time monitoring
-    2. JSON file (data/analytics.json) for persistent analytics
+    2. Append-only JSON Lines log (data/analytics/) for persistent analytics
 
     The analytics data can be used for:
     - Performance optimization (identify slow queries)
     - Cache hit rate analysis (cost optimization)
-    - User behavior patterns (popular queries)
+    - User behavior patterns (popular queries, cache prefetch)
     - API usage tracking (Gemini quota management)
 
     Args:
@@ -462,26 +477,22 @@ def log_request(query: str, result: dict, duration: float, cached: bool):
             Expected structure: {"status": "ok"|"error", "recipe": {...}}
         duration (float): Time taken to generate (seconds)
         cached (bool): Whether result was served from cache (True = no API call)
+        stages (dict|None): Per-stage durations in ms from the request trace
+            (guardrail, cache_lookup, gemini, gemini.<model>, fallback,
+            cache_store, scoring, render, request), see src/instrumentation.py
 
     Side effects:
         - Updates st.session_state.metrics (in-memory counters)
-        - Appends entry to data/analytics.json (persistent storage)
+        - Buffers the entry in the process-wide analytics log, written to
+          data/analytics/analytics-YYYYMMDD.jsonl by a background thread
         - Writes INFO log line to application logger
 
-    File format (data/analytics.json):
-        [
-            {
-                "timestamp": "2026-01-16T14:23:45.123456",
-                "query": "tropical refreshing cocktail",
-                "cocktail_name": "Caribbean Sunset",
-                "duration_ms": 1523.45,
-                "cached": false,
-                "status": "ok"
-            },
-            ...
-        ]
-
-    Performance: ~5-10ms (file I/O is async-safe with Streamlit)
+    Entry format (one JSON object per line):
+        {"timestamp": "2026-01-16T14:23:45.123456", "query": "tropical refreshing cocktail",
+         "cocktail_name": "Caribbean Sunset", "duration_ms": 1523.45, "cached": false, "status": "ok",
+         "stages_ms": {"guardrail": 18.2, "cache_lookup": 0.4, "gemini": 1480.9, ...}}
+
+    Performance: O(1), no file I/O on the request path (see src/analytics.py)
     """
     # Build analytics entry with ISO timestamp for timezone safety
     entry = {
@@ -491,6 +502,7 @@ def log_request(query: str, result: dict, duration: float, cached: bool):
         "duration_ms": round(duration * 1000, 2),  # Convert seconds to milliseconds
         "cached": cached,
         "status": result.get("status", "unknown"),
+        "stages_ms": stages or {},
     }
 
     # Log to application logger (stdout/stderr)
@@ -501,26 +513,12 @@ def log_request(query: str, result: dict, duration: float, cached: bool):
     st.session_state.metrics["total_time"] += duration
     if cached:
         st.session_state.metrics["cache_hits"] += 1
+    st.session_state.metrics["memory_cache"] = get_cache_stats()
+    st.session_state.metrics["models"] = get_model_stats()
 
-    # Persist to JSON file for long-term analytics
+    # Persist for long-term analytics (buffered, flushed in the background)
     try:
-        # Load existing analytics (or empty list if file doesn't exist)
-        analytics = []
-        if ANALYTICS_FILE.exists():
-            with open(ANALYTICS_FILE, "r", encoding="utf-8") as f:
-                analytics = json.load(f)
-
-        # Append new entry
-        analytics.append(entry)
-
-        # Keep only last 1000 entries to prevent unbounded growth
-        # Older entries are rotated out (FIFO queue behavior)
-        analytics = analytics[-1000:]
-
-        # Write back to file with pretty formatting
-        with open(ANALYTICS_FILE, "w", encoding="utf-8") as f:
-            json.dump(analytics, f, ensure_ascii=False, indent=2)
-
+        get_analytics_log().record(entry)
     except Exception as e:
         # Non-critical error: app continues even if analytics fails
         logger.warning(f"Failed to save analytics: {e}")
@@ -597,73 +595,87 @@ def load_cocktails_csv():
 
     Performance: ~50ms first load, <1ms cached
     """
-    datasets = []
+    # Sources (generated + Kaggle) are declared in src/catalog.py
+    return read_catalog_sources()
 
-    # Load generated cocktails (600)
-    if COCKTAILS_CSV.exists():
-        generated_df = pd.read_csv(COCKTAILS_CSV)
-        generated_df['source'] = 'generated'
-        datasets.append(generated_df)
 
-    # Load Kaggle enriched cocktails
-    kaggle_path = Path(__file__).parent.parent / "data" / "kaggle_cocktails_enriched.csv"
-    if kaggle_path.exists():
-        kaggle_df = pd.read_csv(kaggle_path)
-        kaggle_df['source'] = 'kaggle'
-        datasets.append(kaggle_df)
+@st.cache_resource
+def load_cocktail_catalog() -> CocktailCatalog:
+    """
+    Load the typed, columnar cocktail catalogue (both CSV sources).
 
-    # Merge datasets
-    if datasets:
-        combined_df = pd.concat(datasets, ignore_index=True)
-        return combined_df
+    Built once per process: names, descriptions and ingredients as arrays,
+    taste_profile as an (N, 5) float32 matrix, source/category/difficulty
+    as integer codes, plus the filter masks (catalog.filters). Search
+    results are then built by indexing these arrays with the top-k rows
+    instead of per-row df.iloc lookups.
 
-    return pd.DataFrame()
+    FAST COLD START: the binary snapshot (data/snapshot/, built by
+    scripts/build_catalog_snapshot.py) is memory-mapped when it matches
+    the current CSV files. The CSV files are only parsed when the snapshot
+    is missing or stale.
 
+    Returns:
+        CocktailCatalog (empty if no CSV is available)
+    """
+    catalog = load_snapshot()
+    if catalog is not None:
+        logger.info(f"Catalog loaded from snapshot: {len(catalog)} cocktails")
+        return catalog
 
-@st.cache_data
+    logger.info("No up-to-date catalog snapshot, parsing CSV "
+                "(run scripts/build_catalog_snapshot.py to speed up cold starts)")
+    return CocktailCatalog.from_dataframe(load_cocktails_csv())
+
+
+@st.cache_resource
 def _precompute_cocktail_embeddings():
     """
-    Precompute and cache embeddings for all cocktails in the database.
+    Load (or build) the embeddings of all cocktails in the database.
 
-    CRITICAL OPTIMIZATION: This function caches the embeddings of all 600 cocktails
-    to avoid recomputing them on every search request. Without this cache,
-    each search would take ~2-3 seconds to encode all cocktails.
+    CRITICAL OPTIMIZATION: Embeddings are persisted on disk by EmbeddingStore
+    (data/embeddings/) as a memory-mapped .npy file plus a manifest holding
+    the model name and a content hash per row. On startup:
+    - Unchanged corpus: the matrix is memory-mapped, nothing is encoded
+    - Edited/added rows (generated or Kaggle CSV): only those are re-encoded
+    - Model change: the whole corpus is re-encoded once
 
-    The cache is invalidated only when:
-    - The Streamlit app restarts
-    - The CSV file changes (if we add cache_key logic)
+    Cached with st.cache_resource (not cache_data) so the memory-mapped
+    array is shared by all sessions instead of being pickled and copied.
 
     Returns:
         tuple: (descriptions list, embeddings numpy array)
         - descriptions: List of semantic descriptions for reference
-        - embeddings: numpy array of shape (600, 384) with SBERT encodings
+        - embeddings: read-only array of shape (n_cocktails, 384),
+          L2-normalized float32 rows
 
     Performance impact:
-    - First call: ~2-3s (encodes all 600 cocktails)
-    - Cached calls: <1ms (instant retrieval)
-    - Search with cache: ~50ms (only encodes user query)
-    - Search without cache: ~2-3s (encodes query + all cocktails)
+    - Cold start, store up to date: ~10ms (memory-map, no encoding)
+    - Cold start, empty store: ~2-3s (encodes all cocktails once)
+    - Search: ~50ms (only encodes user query)
     """
-    df = load_cocktails_csv()
-    if df.empty:
+    catalog = load_cocktail_catalog()
+    if len(catalog) == 0:
         return [], np.array([])
 
     try:
         model = get_sbert_model()
 
-        # Extract descriptions and encode them ALL at once
-        # This is expensive but happens only ONCE per app session
-        descriptions = df["description_semantique"].fillna("").tolist()
-        logger.info(f"Precomputing embeddings for {len(descriptions)} cocktails...")
+        # Both sources (generated + Kaggle) are merged in the catalogue,
+        # the store reuses every row whose description is unchanged
+        descriptions = catalog.descriptions.tolist()
+        store = EmbeddingStore("cocktails", model_name=MODEL_NAME)
 
-        # Batch encoding is more efficient than encoding one-by-one
-        embeddings = model.encode(
+        embeddings = store.sync(
             descriptions,
-            convert_to_numpy=True,
-            show_progress_bar=False  # Disable progress bar in web app
+            lambda texts: model.encode(
+                texts,
+                convert_to_numpy=True,
+                show_progress_bar=False  # Disable progress bar in web app
+            ),
         )
 
-        logger.info(f"Embeddings cached: shape {embeddings.shape}")
+        logger.info(f"Embeddings ready: shape {embeddings.shape}")
         return descriptions, embeddings
 
     except Exception as e:
@@ -671,7 +683,31 @@ def _precompute_cocktail_embeddings():
         return [], np.array([])
 
 
-def search_cocktails_sbert(query: str, top_k: int = 5, source_filter: str = "Tous") -> list:
+@st.cache_resource
+def _get_cocktail_index():
+    """
+    Build the vector index over the persisted cocktail embeddings.
+
+    build_index() picks an exact index for the current catalogue and an
+    approximate IVF index (k-means partitions, only `nprobe` lists scanned
+    per query) once the catalogue grows past IVF_MIN_ROWS rows. Built once
+    per process and shared by all sessions, like the embeddings themselves.
+
+    Returns:
+        VectorIndex or None if no embeddings are available
+    """
+    _, embeddings = _precompute_cocktail_embeddings()
+    if len(embeddings) == 0:
+        return None
+    return build_index(embeddings)
+
+
+def search_cocktails_sbert(
+    query: str,
+    top_k: int = 5,
+    source_filter: str = "Tous",
+    filters: dict = None
+) -> list:
     """
     Search cocktails using SBERT semantic similarity (OPTIMIZED VERSION).
 
@@ -683,12 +719,18 @@ def search_cocktails_sbert(query: str, top_k: int = 5, source_filter: str = "Tou
 
     PERFORMANCE OPTIMIZATION:
     - OLD: Encoded all 600 cocktails on every search = ~2-3s per search
-    - NEW: Uses cached embeddings, only encodes query = ~50ms per search
+    - NEW: Uses persisted embeddings, only encodes query = ~50ms per search
     - Speedup: 40-60x faster!
 
     Args:
         query (str): User's search query (e.g., "tropical refreshing cocktail")
         top_k (int): Number of top results to return (default: 5)
+        source_filter (str): "Tous" | "Generes par IA" | "Base Kaggle"
+        filters (dict): Metadata filters, same keys as
+            st.session_state.filters (source, alcohol, difficulty,
+            prep_time) plus category. Overrides source_filter.
+            Filters are applied before top-k selection, so filtered
+            searches still return top_k rows when enough rows match.
 
     Returns:
         list[dict]: List of matching cocktails, each dict contains:
@@ -715,61 +757,38 @@ def search_cocktails_sbert(query: str, top_k: int = 5, source_filter: str = "Tou
         - 95th percentile: 100ms
         - Cache miss (first run): 2-3s
     """
-    # Load the DataFrame for metadata lookup
-    df = load_cocktails_csv()
-    if df.empty:
+    # Columnar catalogue for metadata lookup and filter masks
+    catalog = load_cocktail_catalog()
+    if len(catalog) == 0:
         logger.warning("Cocktails CSV is empty, cannot search")
         return []
 
     try:
-        from sentence_transformers import util
-        import numpy as np
-
-        # Get model (cached via @lru_cache in backend.py)
-        model = get_sbert_model()
+        # OPTIMIZATION: Vector index over the precomputed embeddings
+        # (exact search at 600 rows, IVF for large catalogues)
+        index = _get_cocktail_index()
 
-        # OPTIMIZATION: Load precomputed embeddings instead of recomputing
-        # This is the KEY performance improvement
-        descriptions, desc_embeddings = _precompute_cocktail_embeddings()
-
-        if len(desc_embeddings) == 0:
+        if index is None:
             logger.error("No precomputed embeddings available")
             return []
 
         # Encode ONLY the user query (fast: ~20ms for a single sentence)
-        query_embedding = model.encode(query, convert_to_numpy=True)
-
-        # Compute cosine similarity between query and ALL cocktails
-        # This is vectorized and very fast (~10ms for 600 embeddings)
-        similarities = util.cos_sim(query_embedding, desc_embeddings).numpy().flatten()
-
-        # Get indices of top-k most similar cocktails
-        # argsort returns indices that would sort the array
-        # [::-1] reverses to get descending order (highest similarity first)
-        top_indices = np.argsort(similarities)[::-1][:top_k]
-
-        # Build results list with metadata from DataFrame
-        results = []
-        for idx in top_indices:
-            similarity_score = float(similarities[idx])
-
-            # Filter out weak matches (< 20% similarity)
-            if similarity_score > 0.2:
-                # Apply source filter if specified
-                cocktail_source = df.iloc[idx].get("source", "generated")
-                if source_filter != "Tous":
-                    if source_filter == "Generes par IA" and cocktail_source != "generated":
-                        continue
-                    elif source_filter == "Base Kaggle" and cocktail_source != "kaggle":
-                        continue
-
-                results.append({
-                    "name": df.iloc[idx]["name"],
-                    "description": df.iloc[idx]["description_semantique"],
-                    "ingredients": df.iloc[idx].get("ingredients", ""),
-                    "similarity": round(similarity_score * 100, 1),  # Convert to percentage
-                    "source": cocktail_source,
-                })
+        # Memoized: free if the guardrail or the scoring already saw this text
+        query_embedding = encode_query(query)
+
+        # Metadata filters become a boolean mask applied BEFORE top-k
+        if filters is None:
+            filters = {"source": source_filter}
+        mask = catalog.filters.build(filters)
+
+        # Top-k cosine similarities (stored rows are L2-normalized)
+        # argpartition-based selection: only the k winners get sorted
+        top_indices, top_scores = index.search(query_embedding, top_k, mask=mask)
+
+        # Filter out weak matches (< 20% similarity), then build the
+        # results by indexing the catalogue columns (O(top_k))
+        keep = top_scores > 0.2
+        results = catalog.results(top_indices[keep], top_scores[keep])
 
         logger.info(f"SBERT search returned {len(results)} results for query: {query[:50]}")
         return results
@@ -968,9 +987,8 @@ def render_control_tabs():
 
         if search_query:
             with st.spinner("Recherche..."):
-                # Apply source filter from filters state
-                current_source_filter = st.session_state.filters.get("source", "Tous")
-                results = search_cocktails_sbert(search_query, top_k=5, source_filter=current_source_filter)
+                # Apply all active filters (source, type, level, time)
+                results = search_cocktails_sbert(search_query, top_k=5, filters=st.session_state.filters)
 
             if results:
                 for r in results:
@@ -1000,6 +1018,44 @@ def render_control_tabs():
             if metrics["total_requests"] > 0:
                 cache_rate = round(metrics["cache_hits"] / metrics["total_requests"] * 100)
             st.metric("Cache Hit", f"{cache_rate}%")
+            memory_cache = metrics.get("memory_cache", {})
+            if memory_cache:
+                st.metric(
+                    "Cache Memoire",
+                    f"{round(memory_cache['hit_rate'] * 100)}%",
+                    help=f"{memory_cache['entries']} recettes en memoire, "
+                         f"{memory_cache['evictions']} evictions, {memory_cache['expirations']} expirations, "
+                         f"{memory_cache['semantic_hits']} requetes similaires reutilisees",
+                )
+
+            # Gemini budgets (RPD = daily quota, the binding limit on the free tier)
+            models = metrics.get("models", {})
+            limited = {name: entry for name, entry in models.items() if "rpd_utilization" in entry}
+            if limited:
+                available = sum(1 for entry in limited.values()
+                                if entry["state"] == "closed" and entry["rpd_available"] > 0)
+                st.metric(
+                    "Modeles Gemini",
+                    f"{available}/{len(limited)}",
+                    help=", ".join(
+                        f"{name}: {round(entry['rpd_utilization'] * 100)}% du quota jour"
+                        f"{' (circuit ouvert)' if entry['state'] == 'open' else ''}"
+                        for name, entry in limited.items()
+                    ),
+                )
+
+            # All sessions, from the analytics log aggregates (no raw history read)
+            overall = get_analytics_log().summary()
+            if overall["requests"]:
+                st.metric(
+                    "Total Bar",
+                    overall["requests"],
+                    help=f"{round(overall['cache_hit_rate'] * 100)}% servies par le cache, "
+                         f"{overall['avg_duration_ms']:.0f}ms en moyenne",
+                )
+                top = get_analytics_log().top_queries(3)
+                if top:
+                    st.caption("Populaires: " + ", ".join(query for query, _ in top))
 
 
 # =============================================================================
@@ -1086,13 +1142,8 @@ def render_cocktail_input() -> tuple[str, str, bool]:
 
         budget = st.selectbox(
             label="Budget",
-            options=[
-                "Economique (< 8€)",
-                "Modere (8-15€)",
-                "Premium (15-25€)",
-                "Luxe (> 25€)"
-            ],
-            index=1,
+            options=BUDGET_OPTIONS,
+            index=BUDGET_OPTIONS.index(DEFAULT_BUDGET),
             label_visibility="collapsed",
             key="budget_select"
         )
@@ -1129,6 +1180,72 @@ def render_error_message(message: str):
     """, unsafe_allow_html=True)
 
 
+def render_card_ingredients(ingredients: list):
+    """Render the ingredients section of the cocktail card."""
+    st.markdown("### 📜 Ingredients")
+    for ing in ingredients:
+        st.markdown(f"- ◆ {ing}")
+
+
+def render_card_instructions(instructions: str):
+    """Render the preparation section, one line per numbered step."""
+    st.markdown("### 🍸 Preparation")
+    # Format instructions with line breaks for each step
+    formatted_instructions = re.sub(r'(\d+\.)', r'\n\1', instructions).strip()
+    for line in formatted_instructions.split('\n'):
+        if line.strip():
+            st.markdown(f"*{line.strip()}*")
+
+
+def stream_cocktail_card(query: str, query_embedding: np.ndarray | None = None) -> dict:
+    """
+    Generate a recipe and fill in the card as the fields arrive.
+
+    The name is shown as soon as Gemini has written it, then the ingredients
+    and the preparation. If the generation fails midway, the partial fields
+    are cleared before the fallback recipe arrives. The preview is cleared
+    once the recipe is complete: the caller then renders the full card
+    (scoring, radar, export).
+
+    Args:
+        query (str): Final query sent to the generator
+        query_embedding (np.ndarray, optional): Embedding of the request
+            text, already computed by the caller (shared with the scoring)
+
+    Returns:
+        dict: Same result as generate_recipe()
+    """
+    preview = st.empty()
+    with preview.container():
+        status = st.empty()
+        status.caption("🍸 Le barman prepare votre creation...")
+        name_slot = st.empty()
+        ingredients_slot = st.empty()
+        instructions_slot = st.empty()
+
+    result = {"status": "error", "message": "La generation a echoue."}
+    for event in generate_recipe_stream(query, query_embedding=query_embedding):
+        if event["type"] == "done":
+            result = event["result"]
+        elif event["type"] == "reset":
+            # Fields of an interrupted generation: never mixed with the fallback
+            name_slot.empty()
+            ingredients_slot.empty()
+            instructions_slot.empty()
+            status.caption("🍸 Le barman change de recette...")
+        elif event["field"] == "name":
+            name_slot.markdown(f"## 🥃 {event['value']}")
+        elif event["field"] == "ingredients":
+            with ingredients_slot.container():
+                render_card_ingredients(event["value"])
+        elif event["field"] == "instructions":
+            with instructions_slot.container():
+                render_card_instructions(event["value"])
+
+    preview.empty()
+    return result
+
+
 def render_cocktail_card(recipe: dict, characteristics: dict, cached: bool = False, duration: float = 0):
     """Render cocktail result with radar chart, scoring, progression plan and export option."""
     name = recipe.get("name", "Cocktail Mystere")
@@ -1179,19 +1296,12 @@ def render_cocktail_card(recipe: dict, characteristics: dict, cached: bool = Fal
             st.divider()
 
         # Ingredients section
-        st.markdown("### 📜 Ingredients")
-        for ing in ingredients:
-            st.markdown(f"- ◆ {ing}")
+        render_card_ingredients(ingredients)
 
         st.divider()
 
         # Preparation section
-        st.markdown("### 🍸 Preparation")
-        # Format instructions with line breaks for each step
-        formatted_instructions = re.sub(r'(\d+\.)', r'\n\1', instructions).strip()
-        for line in formatted_instructions.split('\n'):
-            if line.strip():
-                st.markdown(f"*{line.strip()}*")
+        render_card_instructions(instructions)
 
         st.divider()
 
@@ -1254,6 +1364,21 @@ def render_empty_state():
     """, unsafe_allow_html=True)
 
 
+@st.cache_resource
+def start_cache_warmer():
+    """
+    Start the background cache warmer once per process.
+
+    Pre-generates the "Surprends-moi !" recipes and the most frequent
+    queries from analytics, within the Gemini quota (see src/prefetch.py).
+    """
+    if not PREFETCH_ENABLED:
+        return None
+    warmer = get_cache_warmer()
+    warmer.start()
+    return warmer
+
+
 # =============================================================================
 # MAIN APPLICATION
 # =============================================================================
@@ -1262,6 +1387,9 @@ def main():
     # Initialize session state
     init_session_state()
 
+    # Warm the recipe cache in the background (surprise + popular queries)
+    start_cache_warmer()
+
     # Inject CSS first
     inject_speakeasy_css()
 
@@ -1296,91 +1424,84 @@ def main():
     # Get user input
     query, budget, is_surprise = render_cocktail_input()
 
-    # Apply filters to query
-    filters = st.session_state.filters
-    filter_context = []
-
-    # Note: Source filter is applied to search results, not to generation
-    # Generation creates new cocktails, so source filter doesn't apply here
-
-    if filters["alcohol"] == "Sans Alcool":
-        filter_context.append("sans alcool, mocktail")
-    if filters["difficulty"] == "Facile":
-        filter_context.append("recette simple et rapide")
-    elif filters["difficulty"] == "Expert":
-        filter_context.append("recette elaboree pour barman experimente")
-    if filters["prep_time"] == "< 5 min":
-        filter_context.append("preparation rapide moins de 5 minutes")
-
     # Handle states
     if query:
         # EF4.1: Enrichir les requetes courtes (<5 mots) avec le contexte des preferences
         user_prefs = st.session_state.taste_preferences
         enriched_query = enrich_short_query(query, user_prefs)
 
-        # Build final query with budget and filters
-        final_query = f"{enriched_query} (budget: {budget})"
-        if filter_context:
-            final_query += f" [{', '.join(filter_context)}]"
+        # Build final query with budget and filters (same builder as the prefetch warmer)
+        final_query = build_final_query(enriched_query, budget, st.session_state.filters)
 
-        # Measure time
-        start_time = time.time()
+        # Per-stage timings (guardrail, cache, Gemini per model, scoring, rendering)
+        with trace() as request_trace, span("request"):
+            # Measure time
+            start_time = time.time()
 
-        with st.spinner("Le barman prepare votre creation..."):
-            result = generate_recipe(final_query)
+            # Encode the request once: the guardrail and the scoring share it
+            with span("guardrail"):
+                query_embedding = encode_query(enriched_query)
 
-        duration = time.time() - start_time
-        cached = result.get("cached", False)
+            # Stream the generation: the card fills in as the fields arrive
+            result = stream_cocktail_card(final_query, query_embedding)
 
-        # Log for analytics
-        log_request(query, result, duration, cached)
+            duration = time.time() - start_time
+            cached = result.get("cached", False)
 
-        # Error state
-        if result["status"] == "error":
-            render_error_message(result["message"])
+            # Error state
+            if result["status"] == "error":
+                with span("render"):
+                    render_error_message(result["message"])
 
-        # Success state
-        else:
-            recipe = result["recipe"]
-
-            # EF3.1: Calculer le Coverage Score pondere
-            try:
-                model = get_sbert_model()
-                scoring_result = calculate_weighted_coverage_score(
-                    enriched_query,
-                    user_prefs,
-                    model
-                )
-                st.session_state.last_scoring = scoring_result
-            except Exception as e:
-                logger.warning(f"Scoring calculation failed: {e}")
-                st.session_state.last_scoring = None
-
-            # Add to history
-            add_to_history(recipe, query)
-
-            # Get characteristics
-            if "taste_profile" in recipe and recipe["taste_profile"]:
-                characteristics = recipe["taste_profile"]
-            else:
-                characteristics = generate_cocktail_characteristics(recipe["name"])
-
-            # Render cocktail card with scoring
-            render_cocktail_card(recipe, characteristics, cached, duration)
-
-            # Show query used
-            if is_surprise:
-                st.markdown(f"""
-                    <p style="text-align: center; color: #A89968; font-size: 0.9rem; margin-top: 2rem;">
-                        <em>🎲 Inspiration aleatoire: "{query}"</em>
-                    </p>
-                """, unsafe_allow_html=True)
+            # Success state
             else:
-                st.markdown(f"""
-                    <p style="text-align: center; color: #A89968; font-size: 0.9rem; margin-top: 2rem;">
-                        <em>Inspire par: "{recipe.get('query', query)}"</em>
-                    </p>
-                """, unsafe_allow_html=True)
+                recipe = result["recipe"]
+
+                # EF3.1: Calculer le Coverage Score pondere
+                with span("scoring"):
+                    try:
+                        model = get_sbert_model()
+                        scoring_result = calculate_weighted_coverage_score(
+                            enriched_query,
+                            user_prefs,
+                            model,
+                            query_embedding=query_embedding
+                        )
+                        st.session_state.last_scoring = scoring_result
+                    except Exception as e:
+                        logger.warning(f"Scoring calculation failed: {e}")
+                        st.session_state.last_scoring = None
+
+                # Add to history
+                add_to_history(recipe, query)
+
+                # Get characteristics
+                if "taste_profile" in recipe and recipe["taste_profile"]:
+                    characteristics = recipe["taste_profile"]
+                else:
+                    characteristics = generate_cocktail_characteristics(recipe["name"])
+
+                # Render cocktail card with scoring
+                with span("render"):
+                    render_cocktail_card(recipe, characteristics, cached, duration)
+
+                # Show query used
+                if is_surprise:
+                    st.markdown(f"""
+                        <p style="text-align: center; color: #A89968; font-size: 0.9rem; margin-top: 2rem;">
+                            <em>🎲 Inspiration aleatoire: "{query}"</em>
+                        </p>
+                    """, unsafe_allow_html=True)
+                else:
+                    st.markdown(f"""
+                        <p style="text-align: center; color: #A89968; font-size: 0.9rem; margin-top: 2rem;">
+                            <em>Inspire par: "{recipe.get('query', query)}"</em>
+                        </p>
+                    """, unsafe_allow_html=True)
+
+        # Log for analytics, with the per-stage durations
+        log_request(query, result, duration, cached, stages=request_trace.stages)
+        maybe_export_metrics()
     else:
         render_empty_state()
 
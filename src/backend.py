@@ -18,14 +18,32 @@ Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
 """
 from functools import lru_cache
 from pathlib import Path
+from typing import Iterator
 import hashlib
 import json
 import logging
 import os
 import re
+import time
 
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
+
+from src.embeddings import encode_query as encode_query_memoized, normalize_embeddings
+from src.gemini_client import get_client_pool
+from src.generation_service import GeminiTransport, GenerationService
+from src.instrumentation import observe, register_collector, span
+from src.model_registry import get_model_registry
+from src.model_router import ModelLimits, ModelRouter
+from src.queries import request_text, split_final_query
+from src.recipe_stream import IncrementalRecipeParser
+from src.recipe_cache import (
+    MemoryRecipeCache,
+    SemanticRecipeIndex,
+    TieredRecipeCache,
+    create_recipe_cache,
+    migrate_json_cache,
+)
 
 # Tentative de chargement des variables d'environnement (.env file)
 # Si python-dotenv n'est pas installé, on continue sans (pas critique)
@@ -57,14 +75,55 @@ COCKTAIL_KEYWORDS = [
 # Calibré empiriquement sur 100+ requêtes réelles
 RELEVANCE_THRESHOLD = 0.30
 
-# Fichier de cache JSON pour stocker les recettes déjà générées
-# Permet d'éviter les appels API redondants (économie + rapidité)
+# Cache des recettes déjà générées (économie d'appels API + rapidité)
+# Backend "sqlite" (défaut) ou "json" (ancien format, fichier unique)
+RECIPE_CACHE_BACKEND = os.getenv("RECIPE_CACHE_BACKEND", "sqlite")
+CACHE_DB_FILE = Path("data/recipe_cache.db")
+
+# Ancien cache JSON: migré automatiquement vers SQLite au premier démarrage
 CACHE_FILE = Path("data/recipe_cache.json")
 
+# Cache LRU en mémoire devant le cache disque (requêtes chaudes sans I/O)
+# Limites: nombre d'entrées, taille cumulée et durée de vie (secondes)
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "256"))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+MEMORY_CACHE_TTL = float(os.getenv("MEMORY_CACHE_TTL", "3600"))
+
+# Cache sémantique: une requête quasi identique à une requête déjà en cache
+# ("mojito frais" / "un mojito bien frais") réutilise sa recette.
+# Seuil de similarité cosinus entre les textes saisis par l'utilisateur (sans
+# le contexte des préférences, commun à toutes ses requêtes courtes); seules
+# les requêtes de mêmes préférences, budget et filtres sont comparées
+# (query_bucket). 1.0 = uniquement les doublons exacts
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Nombre maximum de requêtes indexées (les plus anciennes sont évincées)
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+
 # Clé API Google Gemini (chargée depuis variable d'environnement)
 # Si absente, l'app fonctionne quand même en mode fallback
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "")
 
+# Modèles Gemini par ordre de préférence (le plus rapide/économique d'abord)
+# et leurs budgets (offre gratuite Google AI Studio), appliqués par le
+# routeur avant chaque appel
+GEMINI_MODEL_LIMITS = {
+    "gemini-2.5-flash-lite": ModelLimits(rpm=10, rpd=20),
+    "gemini-2.5-flash": ModelLimits(rpm=5, rpd=20),
+    "gemini-3-flash": ModelLimits(rpm=5, rpd=20),
+    "gemini-1.5-flash-latest": ModelLimits(),  # Fallback (limites inconnues)
+    "gemini-pro": ModelLimits(),               # Legacy fallback
+}
+GEMINI_MODELS = list(GEMINI_MODEL_LIMITS)
+
+# Part de chaque budget (RPM, RPD) réservée aux requêtes des utilisateurs:
+# le préchauffage du cache ne génère que sur les modèles à quota connu, tant
+# qu'il leur reste plus que cette part (0.5 = la moitié du quota journalier)
+PREFETCH_QUOTA_RESERVE = float(os.getenv("PREFETCH_QUOTA_RESERVE", "0.5"))
+
+# Appels simultanés maximum par modèle, et délai maximum d'un appel (s)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "2"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+
 # Configuration du logging (affiche les infos dans la console)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -73,19 +132,16 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 # SBERT MODEL (CACHED)
 # =============================================================================
-@lru_cache(maxsize=1)
-def get_sbert_model() -> SentenceTransformer:
+def get_sbert_model(model_name: str = MODEL_NAME) -> SentenceTransformer:
     """
-    Charge le modèle SBERT en mémoire (une seule fois).
+    Retourne le modèle SBERT partagé `model_name` (chargé une seule fois).
 
-    Pourquoi le cache est important:
+    Pourquoi le registre est important:
     - Charger un modèle SBERT prend ~1-2 secondes et ~100 Mo de RAM
     - Sans cache, on rechargerait le modèle à chaque requête → très lent!
-    - Avec @lru_cache, le modèle est chargé UNE FOIS puis réutilisé
-
-    Le décorateur @lru_cache(maxsize=1) garde en mémoire le résultat de
-    la première exécution. Les appels suivants retournent directement
-    le modèle sans le recharger.
+    - Le registre `src.model_registry` charge le modèle UNE FOIS par
+      processus et le partage avec l'IngredientProfiler, le module
+      embeddings et les scripts (une seule copie en mémoire)
 
     Returns:
         SentenceTransformer: Modèle SBERT prêt à encoder du texte
@@ -95,19 +151,59 @@ def get_sbert_model() -> SentenceTransformer:
 
     Performance:
         - Premier appel: ~1-2s (téléchargement + chargement)
-        - Appels suivants: <1ms (récupération du cache)
+        - Appels suivants: <1ms (récupération depuis le registre)
 
     Note technique:
-        Le cache Python functools.lru_cache est thread-safe, donc
-        compatible avec Streamlit qui peut avoir plusieurs threads.
+        Le registre est thread-safe (verrou par modèle), donc compatible
+        avec Streamlit qui peut avoir plusieurs threads. Il permet aussi de
+        libérer la mémoire: `get_model_registry().unload(MODEL_NAME)`.
+    """
+    return get_model_registry().get(model_name)
+
+
+@lru_cache(maxsize=4)
+def _get_keyword_embeddings(model_name: str, keywords: tuple[str, ...]) -> np.ndarray:
+    """
+    Encode les mots-clés du guardrail une seule fois par (modèle, liste).
+
+    Le cache est indexé par le nom du modèle et le tuple de mots-clés:
+    modifier `MODEL_NAME` ou `COCKTAIL_KEYWORDS` produit une nouvelle clé,
+    donc les embeddings sont automatiquement recalculés.
+
+    Args:
+        model_name: Nom du modèle SBERT utilisé pour l'encodage
+        keywords: Mots-clés cocktails (tuple pour être hashable)
+
+    Returns:
+        np.ndarray: Matrice [n_keywords × 384] normalisée, float32 contiguë,
+            en lecture seule (partagée entre toutes les requêtes)
     """
-    return SentenceTransformer(MODEL_NAME)
+    model = get_sbert_model(model_name)
+    embeddings = normalize_embeddings(model.encode(list(keywords), convert_to_numpy=True))
+    embeddings.setflags(write=False)
+    logger.info(f"Guardrail keyword embeddings cached: shape {embeddings.shape} ({model_name})")
+    return embeddings
 
 
 # =============================================================================
 # GUARDRAIL: RELEVANCE CHECK
 # =============================================================================
-def check_relevance(text: str) -> dict:
+def encode_query(text: str) -> np.ndarray:
+    """
+    Encode une requête en embedding L2-normalisé (float32).
+
+    Mémoïsé par `embeddings.encode_query` (LRU borné, clé = texte exact):
+    le guardrail, le scoring et la recherche partagent le même embedding,
+    chaque requête ne passe qu'une fois dans le transformer.
+
+    Returns:
+        np.ndarray: Vecteur 384D de norme 1 (cosinus = produit scalaire),
+            en lecture seule
+    """
+    return encode_query_memoized(get_sbert_model(), text)
+
+
+def check_relevance(text: str, query_embedding: np.ndarray | None = None) -> dict:
     """
     Vérifie si la demande de l'utilisateur concerne bien les cocktails.
 
@@ -116,7 +212,7 @@ def check_relevance(text: str) -> dict:
 
     Comment ça marche:
     1. On encode la demande de l'utilisateur en vecteur (embedding SBERT)
-    2. On encode notre liste de mots-clés cocktails
+    2. On récupère les embeddings des mots-clés cocktails (calculés une fois)
     3. On calcule la similarité cosinus entre la demande et chaque mot-clé
     4. On prend la similarité maximale
     5. Si c'est trop faible (< 0.30), on rejette la demande
@@ -129,6 +225,9 @@ def check_relevance(text: str) -> dict:
     Args:
         text (str): Texte de l'utilisateur à vérifier
             Ex: "Je veux un mojito", "Quelle heure est-il?"
+        query_embedding (np.ndarray, optionnel): Embedding normalisé de `text`
+            déjà calculé par l'appelant (via `encode_query`), pour ne pas
+            encoder deux fois la même requête
 
     Returns:
         dict: Résultat de la vérification
@@ -137,7 +236,8 @@ def check_relevance(text: str) -> dict:
             Si hors-sujet:
                 {"status": "error", "message": "Desole, le barman..."}
 
-    Performance: ~50ms par requête (encoding + calcul de similarités)
+    Performance: ~50ms par requête, dominée par l'encodage de la requête
+        (les mots-clés ne sont encodés qu'au premier appel)
 
     Calibrage du seuil (0.30):
         - Testé sur 100+ requêtes réelles
@@ -145,21 +245,21 @@ def check_relevance(text: str) -> dict:
         - Seuil 0.30: ✅ Optimal, meilleure tolérance créative
         - Seuil 0.50: Trop strict, rejette "quelque chose de frais"
     """
-    # Récupérer le modèle SBERT (chargé depuis le cache, donc rapide)
-    model = get_sbert_model()
-
     # Étape 1: Encoder le texte de l'utilisateur en vecteur 384D
     # "mojito frais" → [0.23, -0.45, 0.12, ..., 0.67]
-    text_embedding = model.encode(text, convert_to_numpy=True)
+    # (sauf si l'appelant l'a déjà encodé)
+    text_embedding = query_embedding if query_embedding is not None else encode_query(text)
 
-    # Étape 2: Encoder tous les mots-clés cocktails
-    # On obtient une matrice: [23 mots-clés × 384 dimensions]
-    keywords_embeddings = model.encode(COCKTAIL_KEYWORDS, convert_to_numpy=True)
+    # Étape 2: Récupérer les embeddings des mots-clés cocktails
+    # Matrice [22 mots-clés × 384 dimensions] encodée une seule fois
+    # puis réutilisée (seule la requête passe dans le transformer)
+    keywords_embeddings = _get_keyword_embeddings(MODEL_NAME, tuple(COCKTAIL_KEYWORDS))
 
     # Étape 3: Calculer la similarité cosinus entre le texte et chaque mot-clé
-    # Résultat: un tableau de 23 valeurs entre -1 et 1
+    # Vecteurs normalisés → cosinus = produit scalaire
+    # Résultat: un tableau de 22 valeurs entre -1 et 1
     # Plus la valeur est proche de 1, plus c'est similaire
-    similarities = util.cos_sim(text_embedding, keywords_embeddings).numpy().flatten()
+    similarities = keywords_embeddings @ text_embedding
 
     # Étape 4: Prendre la meilleure similarité (= mot-clé le plus proche)
     max_similarity = float(np.max(similarities))
@@ -201,15 +301,86 @@ Les valeurs de taste_profile doivent etre entre 1.5 et 5.0.
 Sois creatif avec le nom, inspire-toi de l'epoque des annees folles."""
 
 
-def _call_gemini_api(query: str) -> dict | None:
+@lru_cache(maxsize=1)
+def get_model_router() -> ModelRouter:
+    """
+    Retourne le routeur des modèles Gemini partagé par le processus.
+
+    Un token bucket par budget (RPM, RPD) de chaque modèle et un circuit
+    breaker: les requêtes vont au premier modèle ayant du quota.
+    """
+    return ModelRouter(GEMINI_MODEL_LIMITS)
+
+
+def get_model_stats() -> dict:
+    """Utilisation des budgets et état du circuit de chaque modèle Gemini."""
+    return get_model_router().stats()
+
+
+def model_stats_prometheus() -> str:
+    """
+    Utilisation des modèles Gemini au format texte Prometheus (jointe à
+    l'export de src.instrumentation).
+    """
+    stats = get_model_stats()
+    series = {
+        "ia_pero_model_budget_utilization": ("gauge", "Share of the Gemini model budget in use (0-1).", []),
+        "ia_pero_model_circuit_open": ("gauge", "1 while the model circuit breaker is open.", []),
+        "ia_pero_model_calls_total": ("counter", "Gemini calls routed to the model, by outcome.", []),
+    }
+    for model, entry in stats.items():
+        for budget in ("rpm", "rpd"):
+            if f"{budget}_utilization" in entry:
+                series["ia_pero_model_budget_utilization"][2].append(
+                    (f'model="{model}",budget="{budget}"', entry[f"{budget}_utilization"]))
+        series["ia_pero_model_circuit_open"][2].append((f'model="{model}"', int(entry["state"] == "open")))
+        for outcome in ("requests", "successes", "failures", "rate_limited", "skipped"):
+            series["ia_pero_model_calls_total"][2].append(
+                (f'model="{model}",outcome="{outcome}"', entry.get(outcome, 0)))
+
+    lines = []
+    for name, (kind, description, samples) in series.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+register_collector(model_stats_prometheus)
+
+
+@lru_cache(maxsize=1)
+def get_generation_service() -> GenerationService:
+    """
+    Retourne le service de génération partagé par toutes les sessions.
+
+    Boucle asyncio d'arrière-plan: les requêtes identiques en cours sont
+    coalescées, chaque modèle a son sémaphore et chaque appel son timeout.
+    Les modèles Gemini viennent du pool partagé (configuré une seule fois,
+    instances réutilisées d'une requête à l'autre).
+    """
+    return GenerationService(
+        GeminiTransport(get_client_pool()),
+        get_model_router(),
+        max_concurrency=GEMINI_MAX_CONCURRENCY,
+        timeout=GEMINI_TIMEOUT,
+    )
+
+
+def _call_gemini_api(query: str, reserve: float = 0.0) -> dict | None:
     """
     Call Google Gemini API to generate a cocktail recipe.
 
-    Automatically switches between models if rate limit (429) is reached.
-    Models are tried in order of preference with automatic failover.
+    The call runs on the shared GenerationService: the model router picks
+    the first model in GEMINI_MODEL_LIMITS with quota left (models out of
+    quota or in cooldown are skipped without a round trip), failing over
+    on errors and timeouts. Concurrent identical queries share one
+    generation.
 
     Args:
         query: User's cocktail request
+        reserve: Share of each model budget left untouched (background
+            generations, see ModelRouter.acquire)
 
     Returns:
         dict with recipe data or None if all models fail
@@ -217,100 +388,145 @@ def _call_gemini_api(query: str) -> dict | None:
     if not GOOGLE_API_KEY:
         logger.warning("GOOGLE_API_KEY not configured - using fallback mode")
         return None
+    if not get_client_pool().available:
+        logger.error("google-generativeai package not installed")
+        return None
 
     try:
-        import google.generativeai as genai
+        prompt = SPEAKEASY_PROMPT.format(query=query)
+        result = get_generation_service().generate_sync(_get_cache_key(query), prompt, reserve=reserve)
+        if result is None:
+            return None
+        _, response_text = result
+        return _parse_recipe_response(response_text, query)
 
-        genai.configure(api_key=GOOGLE_API_KEY)
+    except ImportError:
+        logger.error("google-generativeai package not installed")
+        return None
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse Gemini response as JSON: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Gemini API error: {e}")
+        return None
 
-        # Models ordered by preference (fastest/cheapest first)
-        # Based on Google AI Studio free tier limits
-        model_names = [
-            "gemini-2.5-flash-lite",  # 10 RPM, 20 RPD
-            "gemini-2.5-flash",        # 5 RPM, 20 RPD
-            "gemini-3-flash",          # 5 RPM, 20 RPD
-            "gemini-1.5-flash-latest", # Fallback
-            "gemini-pro",              # Legacy fallback
-        ]
 
-        prompt = SPEAKEASY_PROMPT.format(query=query)
-        response = None
-        last_error = None
+def _parse_recipe_response(response_text: str, query: str) -> dict | None:
+    """
+    Parse a complete Gemini answer into a recipe (see _finalize_recipe).
 
-        # Try each model until one succeeds
-        for model_name in model_names:
-            try:
-                logger.info(f"Trying model: {model_name}")
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(prompt)
-
-                if response and response.text:
-                    logger.info(f"Success with model: {model_name}")
-                    break
-                else:
-                    logger.warning(f"Empty response from {model_name}, trying next...")
-                    response = None
-
-            except Exception as e:
-                error_str = str(e)
-                last_error = e
-
-                # Check for rate limit (429) or quota exceeded
-                if "429" in error_str or "quota" in error_str.lower() or "rate" in error_str.lower():
-                    logger.warning(f"Rate limit on {model_name}, switching to next model...")
-                    continue
-                # Check for model not found (404)
-                elif "404" in error_str or "not found" in error_str.lower():
-                    logger.warning(f"Model {model_name} not available, trying next...")
-                    continue
-                else:
-                    # Other error, still try next model
-                    logger.warning(f"Error with {model_name}: {e}, trying next...")
-                    continue
-
-        if not response or not response.text:
-            if last_error:
-                logger.error(f"All models failed. Last error: {last_error}")
-            else:
-                logger.error("All models returned empty responses")
-            return None
+    Raises:
+        json.JSONDecodeError: if the answer is not a JSON object
+    """
+    # Extract JSON from response (handle markdown code blocks)
+    response_text = response_text.strip()
+    if response_text.startswith("```"):
+        # Remove markdown code block markers
+        response_text = re.sub(r"^```(?:json)?\s*", "", response_text)
+        response_text = re.sub(r"\s*```$", "", response_text)
 
-        # Extract JSON from response (handle markdown code blocks)
-        response_text = response.text.strip()
-        if response_text.startswith("```"):
-            # Remove markdown code block markers
-            response_text = re.sub(r"^```(?:json)?\s*", "", response_text)
-            response_text = re.sub(r"\s*```$", "", response_text)
+    return _finalize_recipe(json.loads(response_text), query)
 
-        recipe_data = json.loads(response_text)
 
-        # Validate required fields
-        required_fields = ["name", "ingredients", "instructions", "taste_profile"]
-        if not all(field in recipe_data for field in required_fields):
-            logger.error(f"Missing required fields in Gemini response")
-            return None
+def _finalize_recipe(recipe_data: dict, query: str) -> dict | None:
+    """
+    Validate a parsed Gemini recipe and fill in defaults.
 
-        # Ensure taste_profile has all required dimensions
-        taste_required = ["Douceur", "Acidite", "Amertume", "Force", "Fraicheur", "Prix", "Qualite"]
-        taste_profile = recipe_data.get("taste_profile", {})
-        for dim in taste_required:
-            if dim not in taste_profile:
-                taste_profile[dim] = 3.0  # Default value
+    Args:
+        recipe_data: JSON object returned by the model
+        query: User's cocktail request
 
-        recipe_data["taste_profile"] = taste_profile
-        recipe_data["query"] = query
+    Returns:
+        The recipe (taste_profile completed, query attached) or None if a
+        required field is missing
+    """
+    # Validate required fields
+    required_fields = ["name", "ingredients", "instructions", "taste_profile"]
+    if not all(field in recipe_data for field in required_fields):
+        logger.error(f"Missing required fields in Gemini response")
+        return None
 
-        return recipe_data
+    # Ensure taste_profile has all required dimensions
+    taste_required = ["Douceur", "Acidite", "Amertume", "Force", "Fraicheur", "Prix", "Qualite"]
+    taste_profile = recipe_data.get("taste_profile", {})
+    for dim in taste_required:
+        if dim not in taste_profile:
+            taste_profile[dim] = 3.0  # Default value
 
-    except ImportError:
-        logger.error("google-generativeai package not installed")
-        return None
+    recipe_data["taste_profile"] = taste_profile
+    recipe_data["query"] = query
+
+    return recipe_data
+
+
+def _stream_gemini_api(query: str) -> Iterator[dict]:
+    """
+    Stream a recipe from Gemini, parsing the JSON as it arrives.
+
+    The call runs on the shared GenerationService, like _call_gemini_api:
+    same router, per-model semaphore and timeout, and the same in-flight
+    table keyed by the cache key. A concurrent call for the same query
+    (streamed or not) waits for this stream's final answer instead of
+    starting a second generation; it then receives the recipe without
+    intermediate fields. A model that fails before sending any text is
+    skipped for the next one; once text has been sent, a failure ends the
+    stream (two half-recipes are never mixed).
+
+    Yields:
+        {"type": "field", "field": str, "value": Any} for each top-level
+        field as soon as it is complete (name, ingredients, instructions...)
+        then exactly one {"type": "recipe", "recipe": dict | None}
+    """
+    pool = get_client_pool()
+    if not GOOGLE_API_KEY or not pool.available:
+        logger.warning("Gemini not available - using fallback mode")
+        yield {"type": "recipe", "recipe": None}
+        return
+
+    prompt = SPEAKEASY_PROMPT.format(query=query)
+    parser = IncrementalRecipeParser()
+    emitted = False
+    start = time.perf_counter()
+    result = None
+
+    try:
+        for event in get_generation_service().stream_sync(_get_cache_key(query), prompt):
+            if event["type"] == "result":
+                result = event["result"]
+                continue
+            if parser is None:
+                continue
+            try:
+                fields = parser.feed(event["text"])
+            except json.JSONDecodeError as e:
+                # Stop the preview; the complete answer is validated below
+                logger.warning(f"Unparsable streamed field from {event['model']}: {e}")
+                parser = None
+                continue
+            for field, value in fields:
+                if not emitted:
+                    observe("gemini.first_field", time.perf_counter() - start)
+                emitted = True
+                yield {"type": "field", "field": field, "value": value}
+
+        recipe = _parse_recipe_response(result[1], query) if result is not None else None
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse Gemini response as JSON: {e}")
-        return None
+        recipe = None
     except Exception as e:
         logger.error(f"Gemini API error: {e}")
-        return None
+        recipe = None
+
+    yield {"type": "recipe", "recipe": recipe}
+
+
+# Name of the generic fallback recipe (never served as a semantic match)
+FALLBACK_RECIPE_NAME = "Le Secret du Speakeasy"
+
+
+def _is_fallback_recipe(recipe: dict) -> bool:
+    """True for a recipe built by _generate_fallback_recipe."""
+    return recipe.get("name") == FALLBACK_RECIPE_NAME
 
 
 def _generate_fallback_recipe(query: str) -> dict:
@@ -345,7 +561,7 @@ def _generate_fallback_recipe(query: str) -> dict:
         profile = {"Douceur": 3.0, "Acidite": 3.0, "Amertume": 2.5, "Force": 3.5, "Fraicheur": 3.5, "Prix": 3.0, "Qualite": 3.5}
 
     return {
-        "name": f"Le Secret du Speakeasy",
+        "name": FALLBACK_RECIPE_NAME,
         "ingredients": [
             f"50ml {base_spirit}",
             "25ml Jus de citron frais",
@@ -366,71 +582,356 @@ def _get_cache_key(query: str) -> str:
     return hashlib.md5(query.lower().strip().encode()).hexdigest()
 
 
-def _load_cache() -> dict:
-    """Load recipe cache from JSON file."""
-    if CACHE_FILE.exists():
-        try:
-            with open(CACHE_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            logger.warning("Cache file corrupted, starting fresh")
-            return {}
-    return {}
+@lru_cache(maxsize=1)
+def get_recipe_cache() -> TieredRecipeCache:
+    """
+    Retourne le cache de recettes partagé par toutes les sessions.
+
+    Deux niveaux: un LRU en mémoire (partagé par le processus) devant le
+    cache persistant. Au premier appel avec le backend SQLite, l'ancien
+    `recipe_cache.json` (s'il existe) est importé en une transaction puis renommé.
+    """
+    if RECIPE_CACHE_BACKEND == "json":
+        persistent = create_recipe_cache("json", CACHE_FILE)
+    else:
+        persistent = create_recipe_cache(RECIPE_CACHE_BACKEND, CACHE_DB_FILE)
+        migrate_json_cache(CACHE_FILE, persistent)
+
+    memory = MemoryRecipeCache(
+        max_entries=MEMORY_CACHE_MAX_ENTRIES,
+        max_bytes=MEMORY_CACHE_MAX_BYTES,
+        ttl=MEMORY_CACHE_TTL,
+    )
+    return TieredRecipeCache(memory, persistent)
 
 
-def _save_cache(cache: dict) -> None:
-    """Save recipe cache to JSON file."""
-    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(CACHE_FILE, "w", encoding="utf-8") as f:
-        json.dump(cache, f, ensure_ascii=False, indent=2)
+@lru_cache(maxsize=1)
+def get_semantic_index() -> SemanticRecipeIndex:
+    """
+    Retourne l'index sémantique des requêtes en cache.
+
+    Persisté dans la base SQLite du cache (rechargé au démarrage); en mémoire
+    seulement avec le backend JSON. Un index vide est reconstruit à partir
+    du cache de recettes (backend JSON, recettes migrées depuis
+    `recipe_cache.json`, index d'une version précédente).
+    """
+    cache = get_recipe_cache()
+    path = None if RECIPE_CACHE_BACKEND == "json" else CACHE_DB_FILE
+    index = SemanticRecipeIndex(
+        SEMANTIC_CACHE_THRESHOLD,
+        model_name=MODEL_NAME,
+        path=path,
+        max_entries=SEMANTIC_CACHE_MAX_ENTRIES,
+    )
+    if len(index) == 0 and len(cache) > 0:
+        _backfill_semantic_index(index, cache)
+    return index
+
+
+def _backfill_semantic_index(index: SemanticRecipeIndex, cache: TieredRecipeCache) -> int:
+    """
+    Index the queries of cached recipes (newest first kept within the cap).
+
+    Fallback recipes and entries whose stored query does not hash to their
+    key are skipped. Queries are encoded in one batch.
+
+    Returns:
+        int: number of indexed queries
+    """
+    entries = [
+        (key, recipe["query"])
+        for key, recipe in cache.items()
+        if isinstance(recipe.get("query"), str)
+        and not _is_fallback_recipe(recipe)
+        and _get_cache_key(recipe["query"]) == key
+    ][-index.max_entries:]
+    if not entries:
+        return 0
+
+    keys = [split_final_query(query) for _, query in entries]
+    free_texts = [free_text for free_text, _ in keys]
+    embeddings = normalize_embeddings(get_sbert_model().encode(free_texts, convert_to_numpy=True))
+    count = index.add_many(
+        (key, embedding, constraints.lower())
+        for (key, _), (_, constraints), embedding in zip(entries, keys, embeddings)
+    )
+    logger.info(f"Semantic cache index rebuilt from the recipe cache: {count} queries")
+    return count
+
+
+# Recherches du préchauffage dans le cache, comptées à part: les compteurs
+# du cache mémoire et du cache sémantique ne décrivent que les utilisateurs
+_prefetch_lookups = {"hits": 0, "misses": 0}
+
+
+def get_cache_stats() -> dict:
+    """
+    Compteurs du cache mémoire (hits, misses, évictions, expirations),
+    du cache sémantique (semantic_hits, semantic_entries) et des recherches
+    du préchauffage (prefetch_hits, prefetch_misses).
+
+    Les compteurs sont globaux au processus: ils incluent les requêtes de
+    toutes les sessions servies par ce worker. Les recherches du
+    préchauffage ne comptent pas dans hits, misses et semantic_hits.
+    """
+    stats = get_recipe_cache().stats()
+    semantic = get_semantic_index().stats()
+    stats["semantic_hits"] = semantic["hits"]
+    stats["semantic_entries"] = semantic["entries"]
+    stats["prefetch_hits"] = _prefetch_lookups["hits"]
+    stats["prefetch_misses"] = _prefetch_lookups["misses"]
+    return stats
 
 
 # =============================================================================
 # MAIN RECIPE GENERATION
 # =============================================================================
-def generate_recipe(query: str) -> dict:
+def _check_request(query: str, query_embedding: np.ndarray | None = None) -> dict:
+    """
+    Guardrail of a final query, run on its request text (user text and
+    preference context, without budget and filters).
+
+    The UI scores the same text: it encodes it once and passes the
+    embedding to both (see app.main).
+    """
+    text = request_text(query)
+    if query_embedding is None:
+        query_embedding = encode_query(text)
+    return check_relevance(text, query_embedding=query_embedding)
+
+
+def generate_recipe(query: str, query_embedding: np.ndarray | None = None) -> dict:
     """
     Generate or retrieve a cocktail recipe.
 
     Pipeline:
     1. Validate query using semantic guardrail
-    2. Check JSON cache for existing recipe (cost optimization)
+    2. Check recipe cache for existing recipe (cost optimization)
+       a. Exact match on the query hash
+       b. Near-duplicate match on the query embedding (semantic cache)
     3. Call Gemini API for new generation
     4. Fallback to basic recipe if API unavailable
     5. Cache result for future requests
 
+    The guardrail checks the request text (query without budget and
+    filters); the semantic cache compares the user's free text only
+    (preferences, budget and filters must match exactly). Embeddings are
+    memoized: a text is encoded once per request.
+
     Args:
         query: User query for cocktail recipe
+        query_embedding: Embedding of the request text, when the caller has
+            already encoded it (the UI shares it with the scoring)
 
     Returns:
         dict with recipe information:
         - {"status": "ok", "recipe": {...}, "cached": bool} on success
+          (plus "semantic_similarity": float on a near-duplicate hit)
         - {"status": "error", "message": "..."} if off-topic
     """
     # Step 1: Guardrail - Check relevance
-    relevance = check_relevance(query)
+    with span("guardrail"):
+        relevance = _check_request(query, query_embedding)
     if relevance["status"] == "error":
         return relevance
 
     # Step 2: Check cache (cost optimization - avoids redundant API calls)
-    cache_key = _get_cache_key(query)
-    cache = _load_cache()
-
-    if cache_key in cache:
-        logger.info(f"Cache hit for query: {query[:50]}...")
-        return {"status": "ok", "recipe": cache[cache_key], "cached": True}
+    cached = _lookup_cached_recipe(query)
+    if cached is not None:
+        return cached
 
     # Step 3: Generate with Gemini API
     logger.info(f"Generating new recipe for: {query[:50]}...")
-    recipe = _call_gemini_api(query)
+    with span("gemini"):
+        recipe = _call_gemini_api(query)
 
     # Step 4: Fallback if API fails
     if recipe is None:
         logger.info("Using fallback recipe generation")
-        recipe = _generate_fallback_recipe(query)
+        with span("fallback"):
+            recipe = _generate_fallback_recipe(query)
 
-    # Step 5: Cache the result
-    cache[cache_key] = recipe
-    _save_cache(cache)
+    # Step 5: Cache the result (single-row insert) and index its query
+    _store_recipe(query, recipe)
 
     return {"status": "ok", "recipe": recipe, "cached": False}
+
+
+def generate_recipe_stream(query: str, query_embedding: np.ndarray | None = None) -> Iterator[dict]:
+    """
+    Streaming variant of generate_recipe for progressive rendering.
+
+    Same pipeline (guardrail, exact and semantic cache, Gemini, fallback),
+    but a new generation is streamed: each top-level recipe field is
+    yielded as soon as its JSON value is complete, so the UI can show the
+    name within a few hundred milliseconds. The recipe is written to the
+    cache only once the whole object has arrived and been validated.
+
+    Args:
+        query: User query for cocktail recipe
+        query_embedding: Embedding of the request text (see generate_recipe)
+
+    If the generation fails after fields were sent, a {"type": "reset"}
+    event tells the UI to clear them before the fallback recipe arrives.
+
+    Yields:
+        {"type": "field", "field": "name" | "ingredients" | ..., "value": ...}
+        while generating, {"type": "reset"} if those fields must be
+        discarded, then one {"type": "done", "result": dict} where result
+        has the same format as generate_recipe's return value
+    """
+    with span("guardrail"):
+        relevance = _check_request(query, query_embedding)
+    if relevance["status"] == "error":
+        yield {"type": "done", "result": relevance}
+        return
+
+    cached = _lookup_cached_recipe(query)
+    if cached is not None:
+        yield {"type": "done", "result": cached}
+        return
+
+    logger.info(f"Streaming new recipe for: {query[:50]}...")
+    recipe = None
+    shown = False
+    with span("gemini"):
+        for event in _stream_gemini_api(query):
+            if event["type"] == "field":
+                shown = True
+                yield event
+            else:
+                recipe = event["recipe"]
+
+    if recipe is None:
+        if shown:
+            yield {"type": "reset"}
+        logger.info("Using fallback recipe generation")
+        with span("fallback"):
+            recipe = _generate_fallback_recipe(query)
+
+    _store_recipe(query, recipe)
+    yield {"type": "done", "result": {"status": "ok", "recipe": recipe, "cached": False}}
+
+
+def prefetch_recipe(query: str) -> str:
+    """
+    Pre-generate and cache a recipe off the request path (cache warming).
+
+    Unlike generate_recipe, a failed generation is not replaced by the
+    fallback recipe: caching it would serve the fallback to users even once
+    Gemini is available again. Warming only uses models with known quotas,
+    and only while they keep more than PREFETCH_QUOTA_RESERVE of each budget:
+    that share stays for user requests. Its cache lookups are counted
+    separately (prefetch_hits / prefetch_misses in get_cache_stats).
+
+    Args:
+        query: Final query (same form as the one sent by the UI)
+
+    Returns:
+        str: "cached" (already in cache), "warmed" (generated and cached),
+        "rejected" (guardrail), "no_capacity" or "failed"
+    """
+    if _check_request(query)["status"] == "error":
+        return "rejected"
+
+    cached = _lookup_cached_recipe(query, background=True)
+    _prefetch_lookups["hits" if cached is not None else "misses"] += 1
+    if cached is not None:
+        return "cached"
+
+    if not get_model_router().has_capacity(reserve=PREFETCH_QUOTA_RESERVE):
+        return "no_capacity"
+
+    recipe = _call_gemini_api(query, reserve=PREFETCH_QUOTA_RESERVE)
+    if recipe is None:
+        return "failed"
+
+    _store_recipe(query, recipe)
+    return "warmed"
+
+
+def _lookup_cached_recipe(query: str, background: bool = False) -> dict | None:
+    """
+    Look a query up in the recipe cache (timed as the "cache_lookup" stage).
+
+    a. Exact match on the query hash (single indexed lookup, the cache is
+       never loaded as a whole)
+    b. Near-duplicate match on the embedding of the user's free text, among
+       queries with the same preferences, budget and filters (semantic cache)
+
+    Args:
+        query: User's cocktail request
+        background: Lookup made by the cache warmer: timed as the
+            "prefetch.cache_lookup" stage and left out of the hit/miss
+            counters of both caches
+
+    Returns:
+        generate_recipe result dict on a hit, None on a miss
+    """
+    with span("prefetch.cache_lookup" if background else "cache_lookup"):
+        return _lookup_recipe_cache(query, background)
+
+
+def _lookup_recipe_cache(query: str, background: bool = False) -> dict | None:
+    """Exact then semantic cache lookup (see _lookup_cached_recipe)."""
+    cache_key = _get_cache_key(query)
+    cache = get_recipe_cache()
+    record_stats = not background
+
+    cached_recipe = cache.get(cache_key, record_stats=record_stats)
+    if cached_recipe is not None:
+        logger.info(f"Cache hit for query: {query[:50]}...")
+        return {"status": "ok", "recipe": cached_recipe, "cached": True}
+
+    # Semantic cache - reuse the recipe of a near-duplicate query with the
+    # same preferences, budget and filters
+    index = get_semantic_index()
+    match = index.lookup(*_semantic_key(query))
+    if match is not None:
+        matched_key, similarity = match
+        cached_recipe = cache.get(matched_key, record_stats=record_stats)
+        if cached_recipe is not None:
+            if record_stats:
+                index.record_lookup(hit=True)
+            logger.info(f"Semantic cache hit ({similarity:.2f}) for query: {query[:50]}...")
+            # Alias in memory so the exact same query skips the lookup next time
+            cache.memory.set(cache_key, cached_recipe)
+            return {
+                "status": "ok",
+                "recipe": cached_recipe,
+                "cached": True,
+                "semantic_similarity": round(similarity, 3),
+            }
+        # Recipe gone from the cache: drop its stale index entry
+        index.remove(matched_key)
+
+    if record_stats:
+        index.record_lookup(hit=False)
+    return None
+
+
+def _semantic_key(query: str) -> tuple[np.ndarray, str]:
+    """
+    Semantic cache key of a final query: embedding of the user's free text
+    and bucket (preferences added by enrich_short_query, budget, filters).
+
+    The free text alone is compared: the preference context is shared by
+    all short queries of a user and would pull "mojito" and "daiquiri"
+    toward each other.
+    """
+    free_text, constraints = split_final_query(query)
+    return encode_query(free_text), constraints.lower()
+
+
+def _store_recipe(query: str, recipe: dict) -> None:
+    """
+    Cache a complete recipe and index its query for the semantic cache.
+
+    A fallback recipe is cached for its exact query only: it is generic and
+    must not be served to near-duplicate queries.
+    """
+    cache_key = _get_cache_key(query)
+    with span("cache_store"):
+        get_recipe_cache().set(cache_key, recipe)
+        if not _is_fallback_recipe(recipe):
+            get_semantic_index().add(cache_key, *_semantic_key(query))
@@ -0,0 +1,208 @@
+"""
+L'IA Pero - Catalogue de cocktails en colonnes
+================================================
+
+Représentation typée et en mémoire du catalogue (cocktails générés + Kaggle),
+chargée une seule fois par processus:
+
+    names, descriptions, instructions → tableaux de chaînes (N,)
+    ingredients                        → tableau (N,) de tuples d'ingrédients
+    taste                              → matrice (N, 5) float32 (NaN si absent)
+    prep_time                          → (N,) float32 en minutes (NaN si absent)
+    codes[source|category|difficulty]  → codes entiers (N,) + modalités
+    alcoholic                          → (N,) bool
+
+Les colonnes JSON du CSV (ingredients, taste_profile) sont décodées une fois
+au chargement (ou pas du tout si le snapshot binaire est à jour, voir
+catalog_snapshot). Construire les résultats d'une recherche se fait alors par
+indexation de tableaux sur les top_k lignes, sans `df.iloc` ligne par ligne.
+Les masques de filtres (voir search_filters) sont construits à partir des
+codes du catalogue.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+import json
+
+import numpy as np
+import pandas as pd
+
+from src.search_filters import FilterMasks, is_alcoholic
+
+# CSV sources du catalogue: (valeur de la colonne source, chemin)
+DATA_DIR = Path(__file__).parent.parent / "data"
+CATALOG_SOURCES = (
+    ("generated", DATA_DIR / "cocktails.csv"),
+    ("kaggle", DATA_DIR / "kaggle_cocktails_enriched.csv"),
+)
+
+# Dimensions de taste_profile (ordre des colonnes de la matrice `taste`)
+TASTE_DIMENSIONS = ("Douceur", "Acidite", "Amertume", "Force", "Fraicheur")
+
+# Colonnes catégorielles stockées en codes entiers
+CATEGORICAL_COLUMNS = ("source", "category", "difficulty")
+
+
+def read_catalog_sources(sources: Sequence[Tuple[str, Path]] = CATALOG_SOURCES) -> pd.DataFrame:
+    """
+    Lit et fusionne les CSV du catalogue (colonne `source` ajoutée).
+
+    Returns:
+        pd.DataFrame: Lignes de tous les CSV existants, DataFrame vide sinon
+    """
+    datasets = []
+    for source, path in sources:
+        if Path(path).exists():
+            df = pd.read_csv(path)
+            df["source"] = source
+            datasets.append(df)
+
+    if datasets:
+        return pd.concat(datasets, ignore_index=True)
+    return pd.DataFrame()
+
+
+def _parse_ingredients(value) -> Tuple[str, ...]:
+    """Liste JSON du CSV → tuple d'ingrédients (texte brut en repli)."""
+    if not isinstance(value, str) or not value:
+        return ()
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return tuple(part.strip() for part in value.split(",") if part.strip())
+    if isinstance(parsed, list):
+        return tuple(str(item) for item in parsed)
+    return (str(parsed),)
+
+
+def _parse_taste(values: Sequence) -> np.ndarray:
+    """Profils JSON du CSV → matrice (N, 5) float32, NaN si absent."""
+    taste = np.full((len(values), len(TASTE_DIMENSIONS)), np.nan, dtype=np.float32)
+    for i, value in enumerate(values):
+        if not isinstance(value, str) or not value:
+            continue
+        try:
+            profile = json.loads(value)
+        except ValueError:
+            continue
+        if isinstance(profile, dict):
+            for j, dim in enumerate(TASTE_DIMENSIONS):
+                if isinstance(profile.get(dim), (int, float)):
+                    taste[i, j] = profile[dim]
+    return taste
+
+
+class CocktailCatalog:
+    """
+    Catalogue de cocktails en colonnes typées.
+
+    Usage:
+        catalog = CocktailCatalog.from_dataframe(load_cocktails_csv())
+        mask = catalog.filters.build({"source": "Base Kaggle"})
+        results = catalog.results(indices, scores)
+    """
+
+    def __init__(
+        self,
+        names: np.ndarray,
+        descriptions: np.ndarray,
+        ingredients: np.ndarray,
+        instructions: np.ndarray,
+        taste: np.ndarray,
+        prep_time: np.ndarray,
+        codes: Dict[str, np.ndarray],
+        categories: Dict[str, Tuple[str, ...]],
+        alcoholic: np.ndarray
+    ):
+        self.names = names
+        self.descriptions = descriptions
+        self.ingredients = ingredients
+        self.instructions = instructions
+        self.taste = taste
+        self.prep_time = prep_time
+        self.codes = codes
+        self.categories = categories
+        self.alcoholic = alcoholic
+        self.filters = FilterMasks(self)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "CocktailCatalog":
+        """
+        Construit le catalogue depuis le DataFrame fusionné des CSV.
+
+        Args:
+            df: Sortie de load_cocktails_csv() (colonnes name,
+                description_semantique, ingredients, instructions, category,
+                difficulty, prep_time, taste_profile, source)
+        """
+        n_rows = len(df)
+
+        def text_column(column: str) -> np.ndarray:
+            if column not in df:
+                return np.full(n_rows, "", dtype=object)
+            return df[column].fillna("").astype(str).to_numpy(dtype=object)
+
+        ingredients = np.empty(n_rows, dtype=object)
+        if "ingredients" in df:
+            ingredients[:] = [_parse_ingredients(value) for value in df["ingredients"]]
+        else:
+            ingredients[:] = [()] * n_rows
+
+        codes, categories = {}, {}
+        for column in CATEGORICAL_COLUMNS:
+            values = df[column].fillna("").astype(str) if column in df else pd.Series([""] * n_rows)
+            categorical = pd.Categorical(values)
+            codes[column] = categorical.codes.astype(np.int32)
+            categories[column] = tuple(categorical.categories)
+
+        if "prep_time" in df:
+            prep_time = pd.to_numeric(df["prep_time"], errors="coerce").to_numpy(dtype=np.float32)
+        else:
+            prep_time = np.full(n_rows, np.nan, dtype=np.float32)
+
+        return cls(
+            names=text_column("name"),
+            descriptions=text_column("description_semantique"),
+            ingredients=ingredients,
+            instructions=text_column("instructions"),
+            taste=_parse_taste(df["taste_profile"].tolist() if "taste_profile" in df else [None] * n_rows),
+            prep_time=prep_time,
+            codes=codes,
+            categories=categories,
+            alcoholic=is_alcoholic(df),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def column(self, name: str) -> np.ndarray:
+        """Valeurs (chaînes) d'une colonne catégorielle."""
+        return np.asarray(self.categories[name], dtype=object)[self.codes[name]]
+
+    def results(self, indices: np.ndarray, scores: np.ndarray) -> List[dict]:
+        """
+        Construit les résultats de recherche (O(top_k) indexations).
+
+        Args:
+            indices: Lignes retenues
+            scores: Similarités cosinus correspondantes (0-1)
+
+        Returns:
+            list[dict]: name, description, ingredients, similarity (%), source
+        """
+        sources = np.asarray(self.categories["source"], dtype=object)[self.codes["source"][indices]]
+        return [
+            {
+                "name": name,
+                "description": description,
+                "ingredients": ", ".join(ingredients),
+                "similarity": round(float(score) * 100, 1),
+                "source": source,
+            }
+            for name, description, ingredients, score, source in zip(
+                self.names[indices], self.descriptions[indices],
+                self.ingredients[indices], scores, sources,
+            )
+        ]
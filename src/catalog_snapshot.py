@@ -0,0 +1,306 @@
+"""
+L'IA Pero - Snapshot binaire du catalogue de cocktails
+========================================================
+
+Compile les CSV du catalogue (cocktails générés + Kaggle) en un snapshot
+binaire versionné, chargé en memory-map au démarrage d'un worker au lieu de
+relancer `pd.read_csv` et `json.loads` sur chaque cellule:
+
+    data/snapshot/
+        catalog.manifest.json        → version, empreinte des CSV sources,
+                                       modalités des colonnes catégorielles
+        catalog-<digest>/
+            names.data.npy           → chaînes UTF-8 concaténées (uint8)
+            names.offsets.npy        → bornes de chaque chaîne (int64, N+1)
+            descriptions.*, instructions.*
+            ingredients.data/.offsets/.rows.npy → listes d'ingrédients
+            taste.npy                → matrice (N, 5) float32
+            prep_time.npy, alcoholic.npy, codes.<colonne>.npy
+
+Chaque fichier est un .npy ouvert avec `mmap_mode="r"`: rien n'est décodé
+avant d'être lu (les chaînes ne sont décodées que pour les lignes demandées).
+
+Le snapshot est périmé dès qu'un CSV source change (taille + hash SHA-1,
+mtime utilisé comme raccourci): l'application repasse alors par les CSV.
+Construction: `python scripts/build_catalog_snapshot.py`.
+
+Comme pour EmbeddingStore, le manifeste est écrit en dernier (remplacement
+atomique) et "publie" le répertoire de données.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+from src.catalog import CATALOG_SOURCES, CocktailCatalog
+
+# Répertoire par défaut du snapshot
+SNAPSHOT_DIR = Path(__file__).parent.parent / "data" / "snapshot"
+
+# Version du format (à incrémenter si la structure change)
+SNAPSHOT_VERSION = 1
+
+# Colonnes texte stockées en buffer UTF-8 + offsets
+STRING_COLUMNS = ("names", "descriptions", "instructions")
+
+logger = logging.getLogger(__name__)
+
+
+class StringColumn:
+    """
+    Colonne de chaînes stockée en un buffer UTF-8 + offsets (memory-map).
+
+    S'indexe comme un tableau numpy: un entier donne une chaîne, une liste
+    d'indices ou une tranche donne un tableau d'objets.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "StringColumn":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _get(self, i: int) -> str:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._get(int(key) % len(self))
+        rows = np.arange(len(self))[key]
+        values = np.empty(len(rows), dtype=object)
+        values[:] = [self._get(i) for i in rows]
+        return values
+
+    def tolist(self) -> List[str]:
+        return [self._get(i) for i in range(len(self))]
+
+
+class ListColumn:
+    """Colonne de listes de chaînes (ingrédients): éléments + bornes par ligne."""
+
+    def __init__(self, items: StringColumn, rows: np.ndarray):
+        self.items = items
+        self.rows = rows
+
+    @classmethod
+    def from_lists(cls, lists: Sequence[Sequence[str]]) -> "ListColumn":
+        rows = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in lists], out=rows[1:])
+        return cls(StringColumn.from_strings(item for items in lists for item in items), rows)
+
+    def __len__(self) -> int:
+        return len(self.rows) - 1
+
+    def _get(self, i: int) -> Tuple[str, ...]:
+        return tuple(self.items._get(j) for j in range(self.rows[i], self.rows[i + 1]))
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self._get(int(key) % len(self))
+        rows = np.arange(len(self))[key]
+        values = np.empty(len(rows), dtype=object)
+        values[:] = [self._get(i) for i in rows]
+        return values
+
+
+def _file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprints(sources: Sequence[Tuple[str, Path]] = CATALOG_SOURCES) -> List[dict]:
+    """Empreinte de chaque CSV source (absent, ou taille + mtime + SHA-1)."""
+    fingerprints = []
+    for source, path in sources:
+        path = Path(path)
+        entry = {"source": source, "file": path.name, "exists": path.exists()}
+        if entry["exists"]:
+            stat = path.stat()
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha1=_file_sha1(path))
+        fingerprints.append(entry)
+    return fingerprints
+
+
+def _is_fresh(recorded: List[dict], sources: Sequence[Tuple[str, Path]]) -> bool:
+    """Les CSV sources correspondent-ils à ceux du snapshot ?"""
+    if len(recorded) != len(sources):
+        return False
+    for entry, (source, path) in zip(recorded, sources):
+        path = Path(path)
+        if entry["source"] != source or entry["file"] != path.name or entry["exists"] != path.exists():
+            return False
+        if not entry["exists"]:
+            continue
+        stat = path.stat()
+        if stat.st_size != entry["size"]:
+            return False
+        # mtime inchangé: pas besoin de relire le fichier
+        if stat.st_mtime_ns != entry["mtime_ns"] and _file_sha1(path) != entry["sha1"]:
+            return False
+    return True
+
+
+def build_snapshot(
+    catalog: CocktailCatalog,
+    sources: Sequence[Tuple[str, Path]] = CATALOG_SOURCES,
+    directory: Optional[Path] = None
+) -> Path:
+    """
+    Écrit le snapshot d'un catalogue puis publie son manifeste.
+
+    Args:
+        catalog: Catalogue construit depuis les CSV `sources`
+        sources: CSV sources (source, chemin), pour l'empreinte
+        directory: Répertoire du snapshot (défaut: data/snapshot)
+
+    Returns:
+        Path: Chemin du manifeste publié
+    """
+    directory = Path(directory) if directory is not None else SNAPSHOT_DIR
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / "catalog.manifest.json"
+
+    fingerprints = source_fingerprints(sources)
+    digest = hashlib.sha1(
+        json.dumps([f.get("sha1") for f in fingerprints] + [SNAPSHOT_VERSION]).encode("utf-8")
+    ).hexdigest()[:16]
+    data_dir_name = f"catalog-{digest}"
+    tmp_dir = directory / f".{data_dir_name}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    arrays = {
+        "taste": catalog.taste,
+        "prep_time": catalog.prep_time,
+        "alcoholic": catalog.alcoholic,
+    }
+    for column in STRING_COLUMNS:
+        strings = StringColumn.from_strings(getattr(catalog, column).tolist())
+        arrays[f"{column}.data"] = strings.data
+        arrays[f"{column}.offsets"] = strings.offsets
+    ingredients = ListColumn.from_lists([catalog.ingredients[i] for i in range(len(catalog))])
+    arrays["ingredients.data"] = ingredients.items.data
+    arrays["ingredients.offsets"] = ingredients.items.offsets
+    arrays["ingredients.rows"] = ingredients.rows
+    for column, codes in catalog.codes.items():
+        arrays[f"codes.{column}"] = codes
+
+    for name, array in arrays.items():
+        np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array))
+
+    data_dir = directory / data_dir_name
+    shutil.rmtree(data_dir, ignore_errors=True)
+    os.replace(tmp_dir, data_dir)
+
+    previous = None
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f).get("data_dir")
+        except (OSError, ValueError):
+            pass
+
+    manifest = {
+        "version": SNAPSHOT_VERSION,
+        "data_dir": data_dir_name,
+        "n_rows": len(catalog),
+        "sources": fingerprints,
+        "categories": {column: list(values) for column, values in catalog.categories.items()},
+    }
+    tmp_manifest = manifest_path.with_suffix(".tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_manifest, manifest_path)
+
+    if previous and previous != data_dir_name:
+        shutil.rmtree(directory / previous, ignore_errors=True)
+
+    logger.info(f"Catalog snapshot saved: {len(catalog)} rows in {data_dir}")
+    return manifest_path
+
+
+def load_snapshot(
+    sources: Sequence[Tuple[str, Path]] = CATALOG_SOURCES,
+    directory: Optional[Path] = None
+) -> Optional[CocktailCatalog]:
+    """
+    Charge le snapshot en memory-map s'il est à jour.
+
+    Args:
+        sources: CSV sources attendus (le snapshot doit en provenir)
+        directory: Répertoire du snapshot (défaut: data/snapshot)
+
+    Returns:
+        CocktailCatalog ou None si absent, périmé, corrompu ou d'une
+        autre version (l'appelant repasse alors par les CSV)
+    """
+    directory = Path(directory) if directory is not None else SNAPSHOT_DIR
+    manifest_path = directory / "catalog.manifest.json"
+    if not manifest_path.exists():
+        return None
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            logger.info("Catalog snapshot built with another format version, ignoring it")
+            return None
+        if not _is_fresh(manifest["sources"], sources):
+            logger.info("Catalog snapshot is stale (CSV sources changed), loading CSV")
+            return None
+
+        data_dir = directory / manifest["data_dir"]
+
+        def load(name: str) -> np.ndarray:
+            return np.load(data_dir / f"{name}.npy", mmap_mode="r")
+
+        strings = {
+            column: StringColumn(load(f"{column}.data"), load(f"{column}.offsets"))
+            for column in STRING_COLUMNS
+        }
+        ingredients = ListColumn(
+            StringColumn(load("ingredients.data"), load("ingredients.offsets")),
+            load("ingredients.rows"),
+        )
+        categories = {column: tuple(values) for column, values in manifest["categories"].items()}
+
+        catalog = CocktailCatalog(
+            names=strings["names"],
+            descriptions=strings["descriptions"],
+            ingredients=ingredients,
+            instructions=strings["instructions"],
+            taste=load("taste"),
+            prep_time=load("prep_time"),
+            codes={column: load(f"codes.{column}") for column in categories},
+            categories=categories,
+            alcoholic=load("alcoholic"),
+        )
+        if len(catalog) != manifest["n_rows"]:
+            logger.warning("Catalog snapshot inconsistent with manifest, loading CSV")
+            return None
+
+        return catalog
+
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Catalog snapshot unreadable ({e}), loading CSV")
+        return None
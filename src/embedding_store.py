@@ -0,0 +1,187 @@
+"""
+L'IA Pero - Stockage persistant des embeddings
+================================================
+
+Évite de ré-encoder tout le corpus de cocktails à chaque démarrage d'un
+worker Streamlit. Les embeddings sont stockés sur disque dans un fichier
+`.npy` ouvert en memory-map (chargement zero-copy), accompagné d'un
+manifeste JSON:
+
+    data/embeddings/
+        cocktails.manifest.json      → modèle, dimension, hash de chaque ligne
+        cocktails-<digest>.npy       → matrice [N × 384] float32 normalisée
+
+Au démarrage, on compare le hash du texte de chaque ligne avec le manifeste:
+seules les lignes nouvelles ou modifiées passent dans le modèle SBERT.
+Changer de modèle invalide tout le stockage.
+
+Le manifeste est écrit en dernier (remplacement atomique): c'est lui qui
+"publie" une nouvelle version de la matrice. Un lecteur concurrent voit donc
+toujours une paire manifeste/matrice cohérente.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from src.embeddings import normalize_embeddings
+
+# Répertoire par défaut des embeddings persistés
+STORE_DIR = Path(__file__).parent.parent / "data" / "embeddings"
+
+# Version du format (à incrémenter si la structure du manifeste change)
+STORE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Hash SHA-1 du texte d'une ligne (identifie son embedding)."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    Stockage d'embeddings indexé par le contenu des textes.
+
+    Usage:
+        store = EmbeddingStore("cocktails", model_name="all-MiniLM-L6-v2")
+        embeddings = store.sync(descriptions, encode_fn)
+        # embeddings: np.memmap en lecture seule, lignes normalisées (L2)
+    """
+
+    def __init__(self, name: str, model_name: str, directory: Optional[Path] = None):
+        """
+        Args:
+            name: Nom du corpus (préfixe des fichiers)
+            model_name: Modèle SBERT ayant produit les embeddings
+            directory: Répertoire de stockage (défaut: data/embeddings)
+        """
+        self.name = name
+        self.model_name = model_name
+        self.directory = Path(directory) if directory is not None else STORE_DIR
+        self.manifest_path = self.directory / f"{name}.manifest.json"
+
+    def load(self) -> Tuple[Optional[dict], Optional[np.ndarray]]:
+        """
+        Charge le manifeste et la matrice (memory-map) s'ils sont valides.
+
+        Returns:
+            (manifest, embeddings) ou (None, None) si absent, corrompu,
+            produit par un autre modèle ou dans un autre format
+        """
+        if not self.manifest_path.exists():
+            return None, None
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") != STORE_VERSION or manifest.get("model_name") != self.model_name:
+                logger.info(f"Embedding store '{self.name}' built for another model/version, rebuilding")
+                return None, None
+
+            embeddings = np.load(self.directory / manifest["matrix_file"], mmap_mode="r")
+            if embeddings.shape[0] != len(manifest["hashes"]):
+                logger.warning(f"Embedding store '{self.name}' inconsistent with manifest, rebuilding")
+                return None, None
+
+            return manifest, embeddings
+
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Embedding store '{self.name}' unreadable ({e}), rebuilding")
+            return None, None
+
+    def sync(self, texts: List[str], encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        Retourne les embeddings de `texts`, en ré-encodant uniquement le nécessaire.
+
+        Args:
+            texts: Textes du corpus, dans l'ordre des lignes
+            encode: Fonction d'encodage (liste de textes → matrice numpy)
+
+        Returns:
+            np.ndarray: Matrice [len(texts) × dim] float32 normalisée, en
+                lecture seule (memory-map dès qu'elle est sur disque)
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        hashes = [content_hash(text) for text in texts]
+        manifest, stored = self.load()
+
+        # Cas nominal: rien n'a changé → zero-copy, aucun encodage
+        if manifest is not None and manifest["hashes"] == hashes:
+            logger.info(f"Embedding store '{self.name}' up to date ({len(hashes)} rows)")
+            return stored
+
+        # Lignes réutilisables: hash déjà présent dans le stockage
+        stored_rows = {}
+        if manifest is not None:
+            stored_rows = {h: i for i, h in enumerate(manifest["hashes"])}
+
+        # Textes à encoder (dédupliqués par hash)
+        missing = {}
+        for text, h in zip(texts, hashes):
+            if h not in stored_rows and h not in missing:
+                missing[h] = text
+
+        new_rows = {}
+        if missing:
+            logger.info(f"Encoding {len(missing)}/{len(texts)} changed rows for '{self.name}'...")
+            encoded = normalize_embeddings(encode(list(missing.values())))
+            new_rows = {h: encoded[i] for i, h in enumerate(missing)}
+
+        dimension = next(iter(new_rows.values())).shape[0] if new_rows else stored.shape[1]
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for i, h in enumerate(hashes):
+            embeddings[i] = new_rows[h] if h in new_rows else stored[stored_rows[h]]
+
+        try:
+            return self._write(embeddings, hashes, previous=manifest)
+        except OSError as e:
+            # Disque en lecture seule, quota... on garde les embeddings en mémoire
+            logger.warning(f"Could not persist embedding store '{self.name}': {e}")
+            embeddings.setflags(write=False)
+            return embeddings
+
+    def _write(self, embeddings: np.ndarray, hashes: List[str], previous: Optional[dict]) -> np.ndarray:
+        """Écrit la matrice puis publie le manifeste (remplacement atomique)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        digest = content_hash(self.model_name + "".join(hashes))[:16]
+        matrix_file = f"{self.name}-{digest}.npy"
+        tmp_matrix = self.directory / f".{matrix_file}.tmp"
+        with open(tmp_matrix, "wb") as f:
+            np.save(f, embeddings)
+        os.replace(tmp_matrix, self.directory / matrix_file)
+
+        manifest = {
+            "version": STORE_VERSION,
+            "model_name": self.model_name,
+            "dimension": int(embeddings.shape[1]),
+            "matrix_file": matrix_file,
+            "hashes": hashes,
+        }
+        tmp_manifest = self.manifest_path.with_suffix(".tmp")
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # L'ancienne matrice n'est plus référencée (les memory-maps déjà
+        # ouverts restent valides tant qu'ils ne sont pas fermés)
+        if previous is not None and previous.get("matrix_file") != matrix_file:
+            try:
+                (self.directory / previous["matrix_file"]).unlink()
+            except OSError:
+                pass
+
+        logger.info(f"Embedding store '{self.name}' saved: shape {embeddings.shape}")
+        return np.load(self.directory / matrix_file, mmap_mode="r")
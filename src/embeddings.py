@@ -2,14 +2,31 @@
 L'IA Pero - Embeddings module
 Handles SBERT model loading and similarity computation
 """
+from collections import OrderedDict
+import threading
+import weakref
+
 import numpy as np
 from sentence_transformers import SentenceTransformer, util
 
+from src.model_registry import get_model_registry
+
+# Max number of memoized query embeddings per model
+QUERY_CACHE_SIZE = 1024
+
+# model -> OrderedDict(text -> embedding); entries vanish with the model
+_query_caches = weakref.WeakKeyDictionary()
+_query_cache_lock = threading.Lock()
+
 
 def load_sbert_model(model_name: str = "all-MiniLM-L6-v2") -> SentenceTransformer:
     """
     Load a pre-trained Sentence Transformer model.
 
+    Models come from the shared registry (`src.model_registry`): each model
+    is loaded once per process and shared with the backend and the
+    ingredient profiler.
+
     Args:
         model_name: Name of the model from HuggingFace Hub
 
@@ -21,7 +38,7 @@ def load_sbert_model(model_name: str = "all-MiniLM-L6-v2") -> SentenceTransforme
         - all-mpnet-base-v2: Best quality (768 dim)
         - paraphrase-multilingual-MiniLM-L12-v2: Multilingual support
     """
-    return SentenceTransformer(model_name)
+    return get_model_registry().get(model_name)
 
 
 def compute_embeddings(model: SentenceTransformer, texts: list[str]) -> np.ndarray:
@@ -38,6 +55,58 @@ def compute_embeddings(model: SentenceTransformer, texts: list[str]) -> np.ndarr
     return model.encode(texts, convert_to_numpy=True)
 
 
+def normalize_embeddings(embeddings: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize embeddings into a contiguous float32 array.
+
+    Once normalized, cosine similarity is a plain dot product. Zero vectors
+    use the same epsilon as `util.cos_sim`.
+
+    Args:
+        embeddings: numpy array of shape (dim,) or (n, dim)
+
+    Returns:
+        numpy array of the same shape with unit-norm rows
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return np.ascontiguousarray(embeddings / np.maximum(norms, 1e-12))
+
+
+def encode_query(model, text: str) -> np.ndarray:
+    """
+    Encode a query once and memoize its normalized embedding.
+
+    The guardrail, the coverage scoring and the semantic search all need the
+    embedding of the same user text during a request. This bounded LRU
+    (QUERY_CACHE_SIZE entries per model, keyed on the exact text) makes sure
+    each text reaches the transformer at most once.
+
+    Args:
+        model: SentenceTransformer model instance (or any object with encode())
+        text: Query text
+
+    Returns:
+        Read-only L2-normalized float32 array of shape (dim,)
+    """
+    with _query_cache_lock:
+        cache = _query_caches.setdefault(model, OrderedDict())
+        embedding = cache.get(text)
+        if embedding is not None:
+            cache.move_to_end(text)
+            return embedding
+
+    # Encode outside the lock: other threads keep hitting the cache meanwhile
+    embedding = normalize_embeddings(model.encode(text, convert_to_numpy=True))
+    embedding.setflags(write=False)
+
+    with _query_cache_lock:
+        cache[text] = embedding
+        while len(cache) > QUERY_CACHE_SIZE:
+            cache.popitem(last=False)
+    return embedding
+
+
 def compute_similarity_matrix(embeddings: np.ndarray) -> np.ndarray:
     """
     Compute cosine similarity matrix between all embeddings.
@@ -0,0 +1,124 @@
+"""
+L'IA Pero - Pool de clients Google Gemini
+===========================================
+
+Point d'accès unique à google.generativeai, partagé par le backend (recettes)
+et l'IngredientProfiler (profils d'ingrédients):
+
+- `genai.configure()` n'est appelé qu'une fois, avec GOOGLE_API_KEY;
+- un `GenerativeModel` par nom de modèle est construit au premier usage puis
+  réutilisé (client et connexions HTTP restent chauds);
+- thread-safe: sessions Streamlit, boucle du GenerationService et scripts
+  d'enrichissement partagent les mêmes instances.
+
+La fabrique de modèles est injectable: les tests remplacent le pool global
+(`set_client_pool`) par un pool dont les modèles sont des objets factices
+exposant `generate_content(prompt)`.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Any, Callable, Dict, Optional
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClientPool:
+    """
+    Pool thread-safe de modèles Gemini configurés une seule fois.
+
+    Usage:
+        pool = get_client_pool()
+        if pool.available:
+            text = pool.generate("gemini-2.5-flash-lite", prompt)
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_factory: Optional[Callable[[str], Any]] = None
+    ):
+        """
+        Args:
+            api_key: Clé API (défaut: variable d'environnement GOOGLE_API_KEY)
+            model_factory: Construit un modèle à partir de son nom (défaut:
+                genai.GenerativeModel après genai.configure)
+        """
+        self.api_key = os.getenv("GOOGLE_API_KEY", "") if api_key is None else api_key
+        self._model_factory = model_factory
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._configured = model_factory is not None
+
+    @property
+    def available(self) -> bool:
+        """Le pool peut-il appeler Gemini (clé présente, package installé) ?"""
+        if self._model_factory is not None:
+            return True
+        if not self.api_key:
+            return False
+        try:
+            import google.generativeai  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def _configure(self) -> None:
+        """Configure google.generativeai (une seule fois, sous le verrou)."""
+        import google.generativeai as genai
+
+        genai.configure(api_key=self.api_key)
+        self._model_factory = genai.GenerativeModel
+        self._configured = True
+        logger.info("Gemini client configured")
+
+    def get_model(self, model_name: str) -> Any:
+        """
+        Retourne le modèle `model_name`, construit au premier appel.
+
+        Raises:
+            ImportError: si google-generativeai n'est pas installé
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._lock:
+            if not self._configured:
+                self._configure()
+            if model_name not in self._models:
+                self._models[model_name] = self._model_factory(model_name)
+            return self._models[model_name]
+
+    def generate(self, model_name: str, prompt: str) -> Optional[str]:
+        """Appel synchrone: texte de la réponse (None si vide)."""
+        response = self.get_model(model_name).generate_content(prompt)
+        return response.text if response else None
+
+    def stats(self) -> dict:
+        """Modèles instanciés."""
+        return {"configured": self._configured, "models": sorted(self._models)}
+
+
+_pool: Optional[GeminiClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> GeminiClientPool:
+    """Retourne le pool global (créé au premier appel depuis GOOGLE_API_KEY)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = GeminiClientPool()
+    return _pool
+
+
+def set_client_pool(pool: Optional[GeminiClientPool]) -> None:
+    """Remplace le pool global (tests); None le fera recréer au prochain accès."""
+    global _pool
+    with _pool_lock:
+        _pool = pool
@@ -0,0 +1,371 @@
+"""
+L'IA Pero - Service de génération asynchrone (Gemini)
+=======================================================
+
+Service asyncio qui exécute les appels au LLM sur une boucle d'événements
+dédiée (thread d'arrière-plan), partagée par toutes les sessions Streamlit
+du processus:
+
+    generate_recipe() (thread Streamlit)
+        → GenerationService.generate_sync(cache_key, prompt)
+            → boucle asyncio: coalescing → sémaphore du modèle → timeout
+                → transport.generate(model_name, prompt)
+
+- **Single-flight**: deux requêtes identiques (même clé de cache) arrivant
+  pendant qu'une génération est en cours attendent le même résultat au lieu
+  de payer deux générations.
+- **Concurrence bornée**: un sémaphore par modèle limite les appels
+  simultanés (quotas RPM des offres gratuites).
+- **Timeout par appel**: un modèle trop lent est abandonné au profit du
+  suivant dans la liste de préférence.
+- **Streaming**: `stream_sync(cache_key, prompt)` transmet les morceaux de
+  texte au fur et à mesure, avec la même clé de coalescing, le même
+  sémaphore et le même timeout; les autres appelants de la même clé
+  attendent la réponse complète du premier flux.
+- **Routage par quota**: le ModelRouter choisit le premier modèle ayant
+  encore du quota (token buckets RPM/RPD, circuit breaker): un modèle
+  épuisé n'est pas appelé, il n'y a pas d'aller-retour perdu sur un 429.
+
+Le transport est injectable: GeminiTransport en production, un stub local
+dans les tests (aucune dépendance à google.generativeai).
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Sequence, Tuple, Union
+import asyncio
+import logging
+import queue
+import threading
+
+from src.gemini_client import GeminiClientPool
+from src.instrumentation import current_trace, span, use_trace
+from src.model_router import ModelLimits, ModelRouter
+
+logger = logging.getLogger(__name__)
+
+
+class Transport:
+    """
+    Interface d'un transport vers le LLM.
+
+    `generate` retourne le texte de la réponse (ou None si vide) et lève
+    une exception en cas d'erreur (quota, modèle indisponible...).
+    """
+
+    async def generate(self, model_name: str, prompt: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        """
+        Réponse morceau par morceau (défaut: la réponse de `generate` en un
+        seul morceau).
+        """
+        text = await self.generate(model_name, prompt)
+        if text:
+            yield text
+
+
+class GeminiTransport(Transport):
+    """Transport Google Gemini, via le pool de clients partagé (gemini_client)."""
+
+    def __init__(self, pool: GeminiClientPool):
+        self.pool = pool
+
+    async def generate(self, model_name: str, prompt: str) -> Optional[str]:
+        model = self.pool.get_model(model_name)
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(prompt)
+        else:
+            response = await asyncio.to_thread(model.generate_content, prompt)
+        return response.text if response else None
+
+    async def stream(self, model_name: str, prompt: str) -> AsyncIterator[str]:
+        model = self.pool.get_model(model_name)
+        if hasattr(model, "generate_content_async"):
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                yield chunk.text or ""
+            return
+
+        # Client synchrone: chaque morceau est lu dans un thread
+        chunks = iter(await asyncio.to_thread(model.generate_content, prompt, stream=True))
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk.text or ""
+
+
+def describe_error(error: Exception) -> str:
+    """Catégorie d'une erreur de génération (pour les logs)."""
+    message = str(error).lower()
+    if "429" in message or "quota" in message or "rate" in message:
+        return "rate limit"
+    if "404" in message or "not found" in message:
+        return "model not available"
+    return "error"
+
+
+class GenerationService:
+    """
+    Service de génération avec coalescing, concurrence bornée et timeouts.
+
+    Usage:
+        service = GenerationService(GeminiTransport(get_client_pool()), router)
+        result = service.generate_sync(cache_key, prompt)
+        # result: (model_name, texte) ou None si tous les modèles échouent
+
+        for event in service.stream_sync(cache_key, prompt):
+            ...  # {"type": "text", ...} puis {"type": "result", "result": ...}
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        models: Union[ModelRouter, Sequence[str]],
+        max_concurrency: int = 2,
+        timeout: float = 30.0
+    ):
+        """
+        Args:
+            transport: Transport vers le LLM
+            models: Routeur des modèles, ou liste de modèles par ordre de
+                préférence (sans limite de quota)
+            max_concurrency: Appels simultanés maximum par modèle
+            timeout: Délai maximum d'un appel (attente du sémaphore comprise)
+        """
+        self.transport = transport
+        if not isinstance(models, ModelRouter):
+            models = ModelRouter({name: ModelLimits() for name in models})
+        self.router = models
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._inflight_reserve: Dict[str, float] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "streams": 0, "calls": 0, "timeouts": 0, "failures": 0}
+
+    # ------------------------------------------------------------------
+    # Boucle d'événements d'arrière-plan
+    # ------------------------------------------------------------------
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="generation-service", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def close(self) -> None:
+        """Arrête la boucle d'événements (les appels en cours sont abandonnés)."""
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+    async def generate(
+        self,
+        key: str,
+        prompt: str,
+        on_text: Optional[Callable[[str, str], None]] = None,
+        reserve: float = 0.0
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Génère une réponse, en partageant les générations en cours par clé.
+
+        Args:
+            key: Clé de coalescing (clé de cache de la requête)
+            prompt: Prompt complet
+            on_text: Si fourni, la réponse est streamée et chaque morceau est
+                transmis à on_text(model_name, texte). Un appelant qui rejoint
+                une génération en cours ne reçoit pas de morceaux, seulement
+                le résultat final.
+            reserve: Part de chaque budget des modèles à laisser intacte
+                (appels de fond, voir ModelRouter.acquire)
+
+        Returns:
+            (model_name, texte) ou None si tous les modèles ont échoué
+        """
+        self._stats["requests"] += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._stats["coalesced"] += 1
+            logger.info(f"Joining in-flight generation for key {key[:8]}")
+            inflight_reserve = self._inflight_reserve.get(key, 0.0)
+            result = await asyncio.shield(inflight)
+            if result is not None or inflight_reserve <= reserve:
+                return result
+            # Génération de fond sans quota hors réserve: l'appelant a droit
+            # à une plus grande part des budgets, il réessaie
+            logger.info(f"Background generation failed for key {key[:8]}, retrying")
+
+        if on_text is not None:
+            self._stats["streams"] += 1
+        # La génération est une tâche indépendante de l'appelant: elle se
+        # termine (et sert les appelants coalescés) même s'il abandonne
+        task = asyncio.ensure_future(self._generate_with_failover(prompt, on_text, reserve))
+        self._inflight[key] = task
+        self._inflight_reserve[key] = reserve
+
+        def release(_) -> None:
+            self._inflight.pop(key, None)
+            self._inflight_reserve.pop(key, None)
+
+        task.add_done_callback(release)
+        return await asyncio.shield(task)
+
+    def generate_sync(self, key: str, prompt: str, reserve: float = 0.0) -> Optional[Tuple[str, str]]:
+        """
+        Version bloquante de `generate`, appelable depuis n'importe quel thread.
+
+        Les durées des appels sont rattachées à la trace de l'appelant
+        (voir instrumentation).
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(
+            self._generate_traced(current_trace(), key, prompt, reserve=reserve), loop
+        )
+        return future.result()
+
+    def stream_sync(self, key: str, prompt: str) -> Iterator[dict]:
+        """
+        Version streamée et bloquante de `generate`.
+
+        Yields:
+            {"type": "text", "model": str, "text": str} pour chaque morceau
+            (le modèle qui a commencé à répondre n'est jamais remplacé par un
+            autre: une erreur en cours de flux termine la génération), puis
+            exactement un {"type": "result", "result": (model_name, texte) | None}
+        """
+        loop = self._ensure_loop()
+        events: queue.Queue = queue.Queue()
+
+        def on_text(model_name: str, text: str) -> None:
+            events.put({"type": "text", "model": model_name, "text": text})
+
+        future = asyncio.run_coroutine_threadsafe(
+            self._generate_traced(current_trace(), key, prompt, on_text), loop
+        )
+        future.add_done_callback(lambda _: events.put(None))
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            yield event
+        yield {"type": "result", "result": future.result()}
+
+    async def _generate_traced(
+        self,
+        trace,
+        key: str,
+        prompt: str,
+        on_text: Optional[Callable[[str, str], None]] = None,
+        reserve: float = 0.0
+    ) -> Optional[Tuple[str, str]]:
+        with use_trace(trace):
+            return await self.generate(key, prompt, on_text, reserve)
+
+    def stats(self) -> dict:
+        """Compteurs: requests, coalesced, streams, calls, timeouts, failures."""
+        return dict(self._stats)
+
+    # ------------------------------------------------------------------
+    # Appels
+    # ------------------------------------------------------------------
+    def _semaphore(self, model_name: str) -> asyncio.Semaphore:
+        if model_name not in self._semaphores:
+            self._semaphores[model_name] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[model_name]
+
+    async def _call(
+        self,
+        model_name: str,
+        prompt: str,
+        on_text: Optional[Callable[[str, str], None]] = None
+    ) -> Optional[str]:
+        async with self._semaphore(model_name):
+            self._stats["calls"] += 1
+            with span(f"gemini.{model_name}"):
+                if on_text is None:
+                    return await self.transport.generate(model_name, prompt)
+
+                parts = []
+                async for chunk in self.transport.stream(model_name, prompt):
+                    if chunk:
+                        parts.append(chunk)
+                        on_text(model_name, chunk)
+                return "".join(parts)
+
+    async def _generate_with_failover(
+        self,
+        prompt: str,
+        on_text: Optional[Callable[[str, str], None]] = None,
+        reserve: float = 0.0
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Essaie les modèles proposés par le routeur jusqu'à obtenir une réponse.
+
+        En streaming, un modèle qui échoue après avoir transmis du texte
+        termine la génération: deux réponses partielles ne sont jamais
+        mélangées.
+        """
+        tried = []
+        streamed = []
+
+        def forward(model_name: str, text: str) -> None:
+            streamed.append(model_name)
+            on_text(model_name, text)
+
+        while True:
+            model_name = self.router.acquire(exclude=tried, reserve=reserve)
+            if model_name is None:
+                break
+            tried.append(model_name)
+
+            try:
+                logger.info(f"Trying model: {model_name}")
+                call = self._call(model_name, prompt, forward if on_text is not None else None)
+                text = await asyncio.wait_for(call, self.timeout)
+            except asyncio.TimeoutError:
+                self._stats["timeouts"] += 1
+                self.router.record_failure(model_name, "timeout")
+                if streamed:
+                    logger.warning(f"Timeout after {self.timeout}s on {model_name} while streaming")
+                    break
+                logger.warning(f"Timeout after {self.timeout}s on {model_name}, trying next...")
+                continue
+            except Exception as e:
+                kind = describe_error(e)
+                self.router.record_failure(model_name, kind)
+                if streamed:
+                    logger.warning(f"{kind.capitalize()} on {model_name} while streaming: {e}")
+                    break
+                logger.warning(f"{kind.capitalize()} on {model_name}: {e}, trying next...")
+                continue
+
+            if text:
+                self.router.record_success(model_name)
+                logger.info(f"Success with model: {model_name}")
+                return model_name, text
+            self.router.record_failure(model_name, "empty")
+            logger.warning(f"Empty response from {model_name}, trying next...")
+
+        self._stats["failures"] += 1
+        if tried:
+            logger.error("All models failed")
+        else:
+            logger.warning("No model has capacity left (quota or cooldown)")
+        return None
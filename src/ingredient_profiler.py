@@ -5,7 +5,8 @@ Ce module implémente un système hybride à 4 niveaux pour déterminer
 les profils de saveurs d'ingrédients de cocktails:
 
 Niveau 1: Base connue (61 ingrédients hardcodés)
-Niveau 2: Similarité sémantique (SBERT)
+Niveau 2: Similarité sémantique (SBERT, embeddings des ingrédients connus
+          précalculés et persistés à côté de known_ingredients.json)
 Niveau 3: Inférence LLM (Gemini)
 Niveau 4: Fallback par catégorie
 
@@ -16,24 +17,29 @@ Usage:
 """
 
 import json
-import os
-import re
-import unicodedata
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple
 from datetime import datetime
 import logging
 
+import numpy as np
+
+# Pool de clients Gemini partagé avec le backend (configuré une seule fois)
+from src.gemini_client import get_client_pool
+# Registre des modèles SBERT partagé avec le backend (chargé une seule fois)
+from src.model_registry import DEFAULT_MODEL_NAME, get_model_registry
+from src.text_normalization import normalize_many, normalize_name
+
 # Imports conditionnels
 try:
-    from sentence_transformers import SentenceTransformer, util
+    import sentence_transformers  # noqa: F401
     SBERT_AVAILABLE = True
 except ImportError:
     SBERT_AVAILABLE = False
     print("[WARN] sentence-transformers not available. Similarity search disabled.")
 
 try:
-    import google.generativeai as genai
+    import google.generativeai  # noqa: F401
     GEMINI_AVAILABLE = True
 except ImportError:
     GEMINI_AVAILABLE = False
@@ -43,6 +49,18 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Modèles Gemini essayés dans l'ordre pour l'inférence (niveau 3)
+GEMINI_MODELS = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash-latest"]
+
+# Ingrédients par prompt Gemini dans get_profiles()
+GEMINI_BATCH_SIZE = 20
+
+# Seuil de similarité cosinus du niveau 2
+SIMILARITY_THRESHOLD = 0.75
+
+# Dimensions d'un profil renvoyé par Gemini (bornées à [1.5, 5.0])
+PROFILE_DIMENSIONS = ["sweetness", "acidity", "bitterness", "strength", "freshness"]
+
 
 class IngredientProfiler:
     """
@@ -73,28 +91,47 @@ class IngredientProfiler:
         self.known_base = self._load_known_ingredients()
         self.profiles_cache = self._load_cache()
 
-        # Charger modèle SBERT si disponible
-        self.sbert_model = None
-        if SBERT_AVAILABLE:
-            try:
-                self.sbert_model = SentenceTransformer('all-MiniLM-L6-v2')
-                logger.info("[OK] SBERT model loaded")
-            except Exception as e:
-                logger.warning(f"[WARN] Failed to load SBERT: {e}")
-
-        # Configurer Gemini si disponible
-        self.gemini_available = False
-        if GEMINI_AVAILABLE:
-            api_key = os.getenv("GOOGLE_API_KEY", "")
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.gemini_available = True
-                logger.info("[OK] Gemini API configured")
-            else:
-                logger.warning("[WARN] GOOGLE_API_KEY not found. LLM inference disabled.")
+        # Index des noms normalisés (niveau 1 en O(1))
+        self.alias_index = self._build_alias_index()
+
+        # Modèle SBERT via le registre partagé (même instance que le backend)
+        self.sbert_model_name = DEFAULT_MODEL_NAME
+        self._sbert_failed = not SBERT_AVAILABLE
+        if self.sbert_model is not None:
+            logger.info("[OK] SBERT model loaded")
+
+        # Index de similarité: une ligne par nom connu (clé + alias anglais)
+        self.similarity_keys: List[str] = []
+        self.similarity_matrix: Optional[np.ndarray] = None
+        self._build_similarity_index()
+
+        # Gemini via le pool partagé (configuration et modèles réutilisés)
+        self.gemini_pool = get_client_pool()
+        self.gemini_available = self.gemini_pool.available
+        if self.gemini_available:
+            logger.info("[OK] Gemini API configured")
+        elif GEMINI_AVAILABLE:
+            logger.warning("[WARN] GOOGLE_API_KEY not found. LLM inference disabled.")
 
         logger.info(f"[OK] IngredientProfiler initialized with {len(self.known_base)} known ingredients")
 
+    @property
+    def sbert_model(self):
+        """
+        Modèle SBERT du registre partagé (None si indisponible).
+
+        Aucune référence n'est gardée: `get_model_registry().unload()` libère
+        bien la mémoire, le modèle est rechargé au prochain accès.
+        """
+        if self._sbert_failed:
+            return None
+        try:
+            return get_model_registry().get(self.sbert_model_name)
+        except Exception as e:
+            logger.warning(f"[WARN] Failed to load SBERT: {e}")
+            self._sbert_failed = True
+            return None
+
     def _load_known_ingredients(self) -> Dict:
         """Charge la base de connaissance depuis JSON."""
         if not self.known_ingredients_path.exists():
@@ -113,6 +150,67 @@ class IngredientProfiler:
 
         return known_base
 
+    def _build_alias_index(self) -> Dict[str, Tuple[str, str]]:
+        """
+        Index nom normalisé → (source, clé) pour la recherche de niveau 1.
+
+        Couvre les clés de la base connue, puis leurs noms FR et alias
+        name_en, puis les clés du cache: à nom égal, la première entrée
+        gagne (même priorité que l'ancien parcours séquentiel).
+        """
+        entries = [(key, ('known', key)) for key in self.known_base]
+        for key, data in self.known_base.items():
+            for name in [data.get('name_fr')] + list(data.get('name_en') or []):
+                if name:
+                    entries.append((name, ('known', key)))
+        entries += [(key, ('cache', key)) for key in self.profiles_cache]
+
+        index = {}
+        for normalized, target in zip(normalize_many(name for name, _ in entries), entries):
+            index.setdefault(normalized, target[1])
+        return index
+
+    def _similarity_texts(self) -> List[Tuple[str, str]]:
+        """Couples (texte à encoder, clé canonique): clés et alias name_en."""
+        pairs = []
+        seen = set()
+        for key, data in self.known_base.items():
+            for text in [key] + list(data.get('name_en') or []):
+                if (text, key) not in seen:
+                    seen.add((text, key))
+                    pairs.append((text, key))
+        return pairs
+
+    def _build_similarity_index(self) -> None:
+        """
+        Encode une seule fois les noms connus (niveau 2).
+
+        Les embeddings sont persistés à côté de known_ingredients.json
+        (EmbeddingStore indexé par hash du contenu): un redémarrage ne
+        ré-encode que les noms ajoutés ou modifiés.
+        """
+        model = self.sbert_model
+        pairs = self._similarity_texts()
+        if model is None or not pairs:
+            return
+
+        from src.embedding_store import EmbeddingStore
+
+        try:
+            store = EmbeddingStore(
+                self.known_ingredients_path.stem,
+                model_name=self.sbert_model_name,
+                directory=self.known_ingredients_path.parent,
+            )
+            self.similarity_matrix = store.sync(
+                [text for text, _ in pairs],
+                lambda texts: model.encode(texts, convert_to_numpy=True),
+            )
+            self.similarity_keys = [key for _, key in pairs]
+            logger.info(f"[OK] Similarity index ready: {len(pairs)} known names")
+        except Exception as e:
+            logger.warning(f"[WARN] Failed to build similarity index: {e}")
+
     def _load_cache(self) -> Dict:
         """Charge le cache des profils inférés."""
         if not self.cache_path.exists():
@@ -133,13 +231,8 @@ class IngredientProfiler:
             json.dump(self.profiles_cache, f, indent=2, ensure_ascii=False)
 
     def _normalize_name(self, name: str) -> str:
-        """Normalise un nom d'ingrédient."""
-        # Supprimer accents
-        name = ''.join(c for c in unicodedata.normalize('NFD', name)
-                       if unicodedata.category(c) != 'Mn')
-        # Minuscules, strip, supprimer caractères spéciaux
-        name = re.sub(r'[^\w\s-]', '', name.lower().strip())
-        return name
+        """Normalise un nom d'ingrédient (sans accents, minuscules, sans ponctuation)."""
+        return normalize_name(name)
 
     def get_profile(self, ingredient_name: str) -> Dict:
         """
@@ -166,7 +259,7 @@ class IngredientProfiler:
 
         # Niveau 2: Similarité SBERT
         if self.sbert_model is not None:
-            if profile := self._find_similar(ingredient_name, threshold=0.75):
+            if profile := self._find_similar(ingredient_name, threshold=SIMILARITY_THRESHOLD):
                 return profile
 
         # Niveau 3: Gemini inference
@@ -178,65 +271,130 @@ class IngredientProfiler:
         # Niveau 4: Fallback par catégorie
         return self._fallback_profile(ingredient_name)
 
-    def _lookup_known(self, normalized: str, original: str) -> Optional[Dict]:
-        """Niveau 1: Recherche dans la base connue."""
-        # Recherche directe
-        if normalized in self.known_base:
-            profile = self.known_base[normalized].copy()
-            profile['source'] = 'known'
-            return profile
+    def get_profiles(self, ingredient_names: List[str]) -> List[Dict]:
+        """
+        Obtient les profils d'une liste d'ingrédients (même ordre).
+
+        Même résultat que `[get_profile(n) for n in ingredient_names]`, avec
+        un coût groupé par niveau:
+        1. Base connue et cache: index des alias, O(1) par nom
+        2. SBERT: un seul encodage pour tous les noms restants
+        3. Gemini: prompts groupés (GEMINI_BATCH_SIZE ingrédients par appel),
+           cache écrit une seule fois
+        4. Fallback par catégorie
 
-        # Recherche dans les mappings EN->FR
-        for key, data in self.known_base.items():
-            if 'name_en' in data and data['name_en']:
-                for en_name in data['name_en']:
-                    if self._normalize_name(en_name) == normalized:
-                        profile = data.copy()
-                        profile['source'] = 'known'
-                        return profile
+        Args:
+            ingredient_names: Noms des ingrédients (FR ou EN, doublons permis)
 
-        # Recherche dans le cache
-        if normalized in self.profiles_cache:
-            profile = self.profiles_cache[normalized].copy()
-            logger.info(f"[CACHE] Found {original} in cache")
-            return profile
+        Returns:
+            List[Dict]: Un profil par nom (copies indépendantes)
+        """
+        names = list(ingredient_names)
+        normalized = normalize_many(names)
+        profiles: List[Optional[Dict]] = [None] * len(names)
+
+        # Niveau 1: Base connue et cache
+        pending = []
+        for i, (name, norm) in enumerate(zip(names, normalized)):
+            profiles[i] = self._lookup_known(norm, name)
+            if profiles[i] is None:
+                pending.append(i)
+
+        # Niveau 2: Similarité SBERT (un encodage par nom distinct)
+        if pending and self.sbert_model is not None:
+            distinct = list(dict.fromkeys(names[i] for i in pending))
+            similar = dict(zip(distinct, self._find_similar_many(distinct, threshold=SIMILARITY_THRESHOLD)))
+            for i in pending:
+                if similar[names[i]] is not None:
+                    profiles[i] = similar[names[i]].copy()
+            pending = [i for i in pending if profiles[i] is None]
+
+        # Niveau 3: Gemini. Comme en appels successifs, le premier nom d'un
+        # nom normalisé est inféré puis mis en cache: les occurrences
+        # suivantes (même sans échec SBERT) reçoivent le profil en cache
+        if pending and self.gemini_available:
+            first = {}
+            for i in pending:
+                first.setdefault(normalized[i], i)
+            inferred = self._infer_many_with_gemini([names[i] for i in first.values()])
+
+            for norm, i in first.items():
+                if profile := inferred.get(names[i]):
+                    self._cache_profile(norm, profile, save=False)
+                    profiles[i] = profile.copy()
+                    for j in range(i + 1, len(names)):
+                        if normalized[j] == norm:
+                            profiles[j] = self.profiles_cache[norm].copy()
+            if inferred:
+                self._save_cache()
 
-        return None
+        # Niveau 4: Fallback par catégorie
+        return [profile if profile is not None else self._fallback_profile(name)
+                for name, profile in zip(names, profiles)]
 
-    def _find_similar(self, ingredient_name: str, threshold: float = 0.75) -> Optional[Dict]:
-        """Niveau 2: Recherche par similarité sémantique."""
-        if not self.sbert_model:
+    def _lookup_known(self, normalized: str, original: str) -> Optional[Dict]:
+        """Niveau 1: Recherche dans la base connue puis dans le cache (index O(1))."""
+        match = self.alias_index.get(normalized)
+        if match is None:
             return None
 
-        try:
-            # Encoder l'ingrédient recherché
-            query_embedding = self.sbert_model.encode(ingredient_name, convert_to_numpy=True)
-
-            # Encoder tous les ingrédients connus
-            known_names = list(self.known_base.keys())
-            known_embeddings = self.sbert_model.encode(known_names, convert_to_numpy=True)
-
-            # Calculer similarités
-            similarities = util.cos_sim(query_embedding, known_embeddings).numpy().flatten()
+        source, key = match
+        if source == 'known':
+            profile = self.known_base[key].copy()
+            profile['source'] = 'known'
+            return profile
 
-            # Trouver le plus similaire
-            max_idx = similarities.argmax()
-            max_sim = similarities[max_idx]
+        profile = self.profiles_cache[key].copy()
+        logger.info(f"[CACHE] Found {original} in cache")
+        return profile
 
-            if max_sim >= threshold:
-                similar_key = known_names[max_idx]
-                profile = self.known_base[similar_key].copy()
-                profile['source'] = 'similarity'
-                profile['similarity_score'] = float(max_sim)
-                profile['similar_to'] = self.known_base[similar_key]['name_fr']
+    def _find_similar(self, ingredient_name: str, threshold: float = SIMILARITY_THRESHOLD) -> Optional[Dict]:
+        """Niveau 2: Recherche par similarité sémantique."""
+        return self._find_similar_many([ingredient_name], threshold)[0]
 
-                logger.info(f"[SIMILARITY] {ingredient_name} similar to {profile['similar_to']} (score: {max_sim:.2f})")
-                return profile
+    def _find_similar_many(self, ingredient_names: List[str],
+                           threshold: float = SIMILARITY_THRESHOLD) -> List[Optional[Dict]]:
+        """
+        Niveau 2 par lot: un encodage SBERT pour tous les noms, puis un seul
+        produit matriciel avec les embeddings des noms connus.
+        """
+        model = self.sbert_model
+        if model is None or self.similarity_matrix is None or not ingredient_names:
+            return [None] * len(ingredient_names)
 
+        try:
+            # Encoder les ingrédients recherchés (L2-normalisés)
+            query_embeddings = np.asarray(model.encode(list(ingredient_names), convert_to_numpy=True),
+                                          dtype=np.float32)
+            norms = np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+            query_embeddings = query_embeddings / np.maximum(norms, 1e-12)
+
+            # Similarités cosinus avec tous les noms connus: un seul produit
+            similarities = query_embeddings @ self.similarity_matrix.T
+
+            # Trouver le plus similaire pour chaque ingrédient
+            max_indices = similarities.argmax(axis=1)
+            max_sims = similarities[np.arange(len(ingredient_names)), max_indices]
         except Exception as e:
             logger.warning(f"[WARN] Similarity search failed: {e}")
+            return [None] * len(ingredient_names)
 
-        return None
+        results = []
+        for ingredient_name, max_idx, max_sim in zip(ingredient_names, max_indices, max_sims):
+            if max_sim < threshold:
+                results.append(None)
+                continue
+
+            similar_key = self.similarity_keys[int(max_idx)]
+            profile = self.known_base[similar_key].copy()
+            profile['source'] = 'similarity'
+            profile['similarity_score'] = float(max_sim)
+            profile['similar_to'] = self.known_base[similar_key]['name_fr']
+
+            logger.info(f"[SIMILARITY] {ingredient_name} similar to {profile['similar_to']} (score: {max_sim:.2f})")
+            results.append(profile)
+
+        return results
 
     def _infer_with_gemini(self, ingredient: str) -> Optional[Dict]:
         """Niveau 3: Inférence avec Gemini."""
@@ -264,36 +422,12 @@ Exemples de reference:
 Reponds UNIQUEMENT avec le JSON, rien d'autre."""
 
             # Essayer plusieurs modèles
-            models = ["gemini-2.5-flash-lite", "gemini-2.5-flash", "gemini-1.5-flash-latest"]
-
-            for model_name in models:
+            for model_name in GEMINI_MODELS:
                 try:
-                    model = genai.GenerativeModel(model_name)
-                    response = model.generate_content(prompt)
-
-                    # Parser JSON
-                    text = response.text.strip()
-                    # Extraire JSON si entouré de backticks
-                    if "```json" in text:
-                        text = text.split("```json")[1].split("```")[0].strip()
-                    elif "```" in text:
-                        text = text.split("```")[1].split("```")[0].strip()
-
-                    profile = json.loads(text)
-
-                    # Valider le profil
-                    required_keys = ["sweetness", "acidity", "bitterness", "strength", "freshness", "category"]
-                    if all(k in profile for k in required_keys):
-                        # Validation des ranges
-                        for key in ["sweetness", "acidity", "bitterness", "strength", "freshness"]:
-                            if not (1.5 <= profile[key] <= 5.0):
-                                logger.warning(f"[WARN] Invalid range for {key}: {profile[key]}")
-                                profile[key] = max(1.5, min(5.0, profile[key]))
-
-                        profile['source'] = 'gemini'
-                        profile['model'] = model_name
-                        profile['timestamp'] = datetime.now().isoformat()
-
+                    # Modèle réutilisé depuis le pool (pas de reconstruction par appel)
+                    text = self.gemini_pool.generate(model_name, prompt)
+                    profile = self._validate_gemini_profile(json.loads(self._extract_json(text)), model_name)
+                    if profile is not None:
                         logger.info(f"[GEMINI] Inferred profile for {ingredient} using {model_name}")
                         return profile
 
@@ -306,6 +440,106 @@ Reponds UNIQUEMENT avec le JSON, rien d'autre."""
 
         return None
 
+    def _infer_many_with_gemini(self, ingredients: List[str]) -> Dict[str, Dict]:
+        """
+        Niveau 3 par lot: un prompt pour GEMINI_BATCH_SIZE ingrédients.
+
+        Les ingrédients absents ou invalides dans la réponse groupée (et les
+        groupes d'un seul ingrédient) passent par `_infer_with_gemini`.
+
+        Returns:
+            Dict[str, Dict]: nom → profil, pour les ingrédients inférés
+        """
+        if not self.gemini_available:
+            return {}
+
+        profiles = {}
+        for start in range(0, len(ingredients), GEMINI_BATCH_SIZE):
+            batch = ingredients[start:start + GEMINI_BATCH_SIZE]
+            if len(batch) > 1:
+                profiles.update(self._infer_batch_with_gemini(batch))
+            for ingredient in batch:
+                if ingredient not in profiles:
+                    if profile := self._infer_with_gemini(ingredient):
+                        profiles[ingredient] = profile
+        return profiles
+
+    def _infer_batch_with_gemini(self, ingredients: List[str]) -> Dict[str, Dict]:
+        """Un appel Gemini pour plusieurs ingrédients (réponse: objet JSON nom → profil)."""
+        listing = "\n".join(f"- {json.dumps(ingredient, ensure_ascii=False)}" for ingredient in ingredients)
+        prompt = f"""Analyse ces ingredients de cocktail:
+{listing}
+
+Retourne UNIQUEMENT un objet JSON valide (pas de texte avant ou apres), avec
+pour cle le nom exact de chaque ingredient:
+{{
+  "<ingredient>": {{
+    "sweetness": <float entre 1.5 et 5.0>,
+    "acidity": <float entre 1.5 et 5.0>,
+    "bitterness": <float entre 1.5 et 5.0>,
+    "strength": <float entre 1.5 et 5.0, niveau alcoolique, 1.5 si non-alcoolise>,
+    "freshness": <float entre 1.5 et 5.0>,
+    "category": "<spirit|mixer|modifier|garnish>"
+  }}
+}}
+
+Exemples de reference:
+- Vodka: sweetness=1.5, acidity=1.0, bitterness=2.0, strength=4.5, freshness=2.0
+- Jus d'orange: sweetness=3.5, acidity=2.5, bitterness=1.5, strength=1.5, freshness=3.5
+- Triple Sec: sweetness=4.0, acidity=2.5, bitterness=1.5, strength=2.5, freshness=3.0
+
+Reponds UNIQUEMENT avec le JSON, rien d'autre."""
+
+        for model_name in GEMINI_MODELS:
+            try:
+                response = json.loads(self._extract_json(self.gemini_pool.generate(model_name, prompt)))
+                if not isinstance(response, dict):
+                    raise ValueError("expected a JSON object")
+
+                profiles = {}
+                for ingredient in ingredients:
+                    if isinstance(response.get(ingredient), dict):
+                        profile = self._validate_gemini_profile(response[ingredient], model_name)
+                        if profile is not None:
+                            profiles[ingredient] = profile
+
+                logger.info(f"[GEMINI] Inferred {len(profiles)}/{len(ingredients)} profiles using {model_name}")
+                return profiles
+
+            except Exception as e:
+                logger.warning(f"[WARN] Model {model_name} failed: {e}")
+                continue
+
+        return {}
+
+    @staticmethod
+    def _extract_json(text: Optional[str]) -> str:
+        """Extrait le JSON d'une réponse Gemini (éventuellement entre backticks)."""
+        text = (text or "").strip()
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0].strip()
+        elif "```" in text:
+            text = text.split("```")[1].split("```")[0].strip()
+        return text
+
+    @staticmethod
+    def _validate_gemini_profile(profile: Dict, model_name: str) -> Optional[Dict]:
+        """Valide un profil Gemini (clés requises, bornes) et ajoute sa provenance."""
+        required_keys = PROFILE_DIMENSIONS + ["category"]
+        if not all(k in profile for k in required_keys):
+            return None
+
+        # Validation des ranges
+        for key in PROFILE_DIMENSIONS:
+            if not (1.5 <= profile[key] <= 5.0):
+                logger.warning(f"[WARN] Invalid range for {key}: {profile[key]}")
+                profile[key] = max(1.5, min(5.0, profile[key]))
+
+        profile['source'] = 'gemini'
+        profile['model'] = model_name
+        profile['timestamp'] = datetime.now().isoformat()
+        return profile
+
     def _fallback_profile(self, ingredient: str) -> Dict:
         """Niveau 4: Profil fallback par catégorie."""
         ingredient_lower = ingredient.lower()
@@ -364,10 +598,12 @@ Reponds UNIQUEMENT avec le JSON, rien d'autre."""
 
         return profile
 
-    def _cache_profile(self, normalized_name: str, profile: Dict):
-        """Sauvegarde un profil dans le cache."""
+    def _cache_profile(self, normalized_name: str, profile: Dict, save: bool = True):
+        """Sauvegarde un profil dans le cache (`save=False`: fichier écrit plus tard)."""
         self.profiles_cache[normalized_name] = profile
-        self._save_cache()
+        self.alias_index.setdefault(self._normalize_name(normalized_name), ('cache', normalized_name))
+        if save:
+            self._save_cache()
         logger.info(f"[CACHE] Saved profile for {normalized_name}")
 
     def get_top_ingredients(self, n: int = 20) -> Dict[str, Dict]:
@@ -381,7 +617,7 @@ Reponds UNIQUEMENT avec le JSON, rien d'autre."""
         stats = {
             "known_ingredients": len(self.known_base),
             "cached_profiles": len(self.profiles_cache),
-            "sbert_available": self.sbert_model is not None,
+            "sbert_available": not self._sbert_failed,
             "gemini_available": self.gemini_available,
         }
 
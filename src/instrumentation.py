@@ -0,0 +1,228 @@
+"""
+L'IA Pero - Instrumentation des étapes du pipeline
+====================================================
+
+Mesure de la durée de chaque étape d'une requête (guardrail, cache, appels
+Gemini par modèle, repli, scoring, rendu):
+
+    with trace() as current:                 # une requête utilisateur
+        with span("guardrail"):
+            ...
+        with span("gemini.gemini-2.5-flash"):
+            ...
+    current.stages   # {"guardrail": 12.3, "gemini.gemini-2.5-flash": 850.1} (ms)
+
+- La trace courante est portée par une `contextvars.ContextVar`: les spans
+  imbriqués dans les fonctions appelées s'y rattachent sans passer d'argument.
+  Les threads et tâches asyncio qui doivent s'y rattacher (service de
+  génération) la reçoivent avec `use_trace()`.
+- Hors trace, un span alimente seulement les métriques globales.
+- Chaque étape alimente un réservoir borné de durées (quantiles p50, p95,
+  p99) et des compteurs, exportés au format texte Prometheus dans
+  data/metrics.prom (collecteur "textfile" de node_exporter, ou tout
+  scraper local), au plus toutes les METRICS_EXPORT_INTERVAL secondes.
+- D'autres modules ajoutent leurs propres séries à l'export avec
+  `register_collector()` (ex: utilisation des budgets des modèles Gemini).
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+METRICS_FILE = Path(os.getenv("METRICS_FILE", str(Path(__file__).parent.parent / "data" / "metrics.prom")))
+METRICS_EXPORT_INTERVAL = float(os.getenv("METRICS_EXPORT_INTERVAL", "15"))
+
+# Durées conservées par étape pour le calcul des quantiles
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRIC_NAME = "ia_pero_stage_duration_seconds"
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """Durées cumulées (ms) des étapes d'une requête."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds * 1000, 2)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("ia_pero_trace", default=None)
+
+
+class StageMetrics:
+    """Réservoirs de durées et compteurs par étape (thread-safe)."""
+
+    def __init__(self, reservoir_size: int = RESERVOIR_SIZE):
+        self.reservoir_size = reservoir_size
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.reservoir_size)
+                self._counts[stage] = 0
+                self._sums[stage] = 0.0
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+            self._sums[stage] += seconds
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Returns:
+            {étape: {"count", "sum", "p50", "p95", "p99"}} (secondes)
+        """
+        with self._lock:
+            samples = {stage: np.fromiter(values, dtype=np.float64) for stage, values in self._samples.items()}
+            counts, sums = dict(self._counts), dict(self._sums)
+
+        snapshot = {}
+        for stage in sorted(samples):
+            values = np.quantile(samples[stage], QUANTILES)
+            entry = {"count": counts[stage], "sum": sums[stage]}
+            entry.update({f"p{round(q * 100)}": float(v) for q, v in zip(QUANTILES, values)})
+            snapshot[stage] = entry
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+            self._sums.clear()
+
+    def to_prometheus(self) -> str:
+        """Métriques au format texte Prometheus (type summary)."""
+        lines = [
+            f"# HELP {METRIC_NAME} Duration of the recipe pipeline stages.",
+            f"# TYPE {METRIC_NAME} summary",
+        ]
+        for stage, entry in self.snapshot().items():
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{METRIC_NAME}{{stage="{label}",quantile="{q}"}} {entry[f"p{round(q * 100)}"]:.6f}')
+            lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {entry["sum"]:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {entry["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = StageMetrics()
+_export_lock = threading.Lock()
+_last_export: Optional[float] = None
+
+# Fonctions retournant des séries supplémentaires (texte Prometheus)
+_collectors: List[Callable[[], str]] = []
+
+
+def get_stage_metrics() -> StageMetrics:
+    """Métriques globales du processus."""
+    return _metrics
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Enregistre une durée mesurée ailleurs (ex: délai avant le premier champ)."""
+    _metrics.observe(stage, seconds)
+    current = _current_trace.get()
+    if current is not None:
+        current.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Mesure la durée du bloc (exceptions comprises) sous le nom `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+@contextmanager
+def trace() -> Iterator[Trace]:
+    """Ouvre une trace: les spans du bloc y ajoutent leurs durées."""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace active dans le contexte courant (None hors trace)."""
+    return _current_trace.get()
+
+
+@contextmanager
+def use_trace(current: Optional[Trace]) -> Iterator[None]:
+    """Rattache le bloc à une trace ouverte dans un autre thread ou une autre tâche."""
+    token = _current_trace.set(current)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+def register_collector(collect: Callable[[], str]) -> None:
+    """Ajoute une fonction dont le texte Prometheus est joint à chaque export."""
+    if collect not in _collectors:
+        _collectors.append(collect)
+
+
+def render_metrics() -> str:
+    """Métriques des étapes puis séries des collecteurs (texte Prometheus)."""
+    parts = [_metrics.to_prometheus()]
+    for collect in list(_collectors):
+        try:
+            parts.append(collect())
+        except Exception as e:
+            logger.warning(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+    return "".join(parts)
+
+
+def export_metrics(path: Path = METRICS_FILE) -> None:
+    """Écrit les métriques au format Prometheus (remplacement atomique)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(render_metrics(), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def maybe_export_metrics(path: Path = METRICS_FILE, interval: float = METRICS_EXPORT_INTERVAL) -> bool:
+    """
+    Exporte les métriques si le dernier export date de plus de `interval` s.
+
+    Returns:
+        bool: True si le fichier a été écrit
+    """
+    global _last_export
+    now = time.monotonic()
+    with _export_lock:
+        if _last_export is not None and now - _last_export < interval:
+            return False
+        _last_export = now
+    try:
+        export_metrics(path)
+    except OSError as e:
+        logger.warning(f"Failed to export metrics: {e}")
+        return False
+    return True
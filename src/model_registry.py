@@ -0,0 +1,159 @@
+"""
+L'IA Pero - Registre des modèles SBERT
+========================================
+
+Point d'accès unique aux modèles SentenceTransformer, partagé par le backend
+(guardrail, scoring, cache sémantique), l'IngredientProfiler, le module
+embeddings et les scripts:
+
+- un modèle par nom, chargé au premier usage puis réutilisé (~90 Mo et 1-2 s
+  de chargement pour all-MiniLM-L6-v2: un seul exemplaire par processus);
+- thread-safe: un verrou par nom de modèle, deux threads qui demandent le
+  même modèle ne le chargent qu'une fois, deux modèles différents se
+  chargent en parallèle;
+- `unload()` libère explicitement un modèle (ou tous); il sera rechargé au
+  prochain `get()`.
+
+Le chargeur est injectable: les tests remplacent le registre global
+(`set_model_registry`) ou y enregistrent un modèle factice (`register`).
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Any, Callable, Dict, List, Optional
+import gc
+import logging
+import threading
+import time
+
+# Modèle par défaut: rapide, léger (384 dimensions)
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+logger = logging.getLogger(__name__)
+
+
+def _load_sentence_transformer(model_name: str) -> Any:
+    """Chargeur par défaut (import différé de sentence-transformers)."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+class ModelRegistry:
+    """
+    Registre thread-safe de modèles chargés à la demande.
+
+    Usage:
+        model = get_model_registry().get("all-MiniLM-L6-v2")
+        embeddings = model.encode(["gin", "tonic"])
+        get_model_registry().unload()   # libère la mémoire
+    """
+
+    def __init__(self, loader: Optional[Callable[[str], Any]] = None):
+        """
+        Args:
+            loader: Construit un modèle à partir de son nom (défaut:
+                SentenceTransformer(model_name))
+        """
+        self._loader = loader or _load_sentence_transformer
+        self._models: Dict[str, Any] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._name_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _name_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            return self._name_locks.setdefault(model_name, threading.Lock())
+
+    def get(self, model_name: str = DEFAULT_MODEL_NAME) -> Any:
+        """
+        Retourne le modèle `model_name`, chargé au premier appel.
+
+        Raises:
+            Exception: erreur du chargeur (rien n'est mis en cache, le
+                prochain appel réessaie)
+        """
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._name_lock(model_name):
+            model = self._models.get(model_name)
+            if model is None:
+                start = time.perf_counter()
+                model = self._loader(model_name)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._models[model_name] = model
+                    self._load_seconds[model_name] = elapsed
+                logger.info(f"Model loaded: {model_name} ({elapsed:.2f}s)")
+            return model
+
+    def register(self, model_name: str, model: Any) -> None:
+        """Enregistre un modèle déjà construit (remplace l'éventuel existant)."""
+        with self._name_lock(model_name):
+            with self._lock:
+                self._models[model_name] = model
+                self._load_seconds[model_name] = 0.0
+
+    def unload(self, model_name: Optional[str] = None) -> List[str]:
+        """
+        Libère `model_name` (tous les modèles si None).
+
+        La mémoire n'est rendue que si aucun autre objet ne garde de
+        référence vers le modèle.
+
+        Returns:
+            List[str]: noms des modèles déchargés
+        """
+        names = [model_name] if model_name is not None else self.loaded()
+        unloaded = []
+        for name in names:
+            with self._name_lock(name):
+                with self._lock:
+                    if self._models.pop(name, None) is not None:
+                        self._load_seconds.pop(name, None)
+                        unloaded.append(name)
+        if unloaded:
+            gc.collect()
+            logger.info(f"Models unloaded: {', '.join(unloaded)}")
+        return unloaded
+
+    def loaded(self) -> List[str]:
+        """Noms des modèles actuellement en mémoire."""
+        with self._lock:
+            return sorted(self._models)
+
+    def __contains__(self, model_name: str) -> bool:
+        return model_name in self._models
+
+    def stats(self) -> dict:
+        """Modèles chargés et durée de leur chargement (s)."""
+        with self._lock:
+            return {"models": sorted(self._models), "load_seconds": dict(self._load_seconds)}
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Retourne le registre global (créé au premier appel)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+def set_model_registry(registry: Optional[ModelRegistry]) -> None:
+    """Remplace le registre global (tests); None le fera recréer au prochain accès."""
+    global _registry
+    with _registry_lock:
+        _registry = registry
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME) -> Any:
+    """Raccourci: `get_model_registry().get(model_name)`."""
+    return get_model_registry().get(model_name)
@@ -0,0 +1,251 @@
+"""
+L'IA Pero - Routage des requêtes entre modèles Gemini
+=======================================================
+
+Choisit, pour chaque génération, le premier modèle (par ordre de préférence)
+qui a encore du quota, AVANT de l'appeler:
+
+- **Token buckets**: un seau par budget connu de chaque modèle (RPM et RPD
+  de l'offre gratuite Google AI Studio). Un modèle dont le seau est vide est
+  sauté sans aller-retour réseau, au lieu d'attendre une erreur 429.
+- **Circuit breaker**: après un 429, un modèle indisponible ou des erreurs
+  répétées, le modèle est mis en pause (cooldown croissant) puis réessayé.
+- **Réserve**: un appel de fond (préchauffage du cache) passe `reserve`,
+  la part de chaque budget qu'il doit laisser aux utilisateurs; les modèles
+  sans budget connu ne lui sont jamais attribués.
+- **Métriques**: utilisation de chaque budget, état du circuit, compteurs.
+
+Usage:
+    router = ModelRouter({"gemini-2.5-flash-lite": ModelLimits(rpm=10, rpd=20)})
+    model_name = router.acquire()        # None si aucun modèle disponible
+    ... appel ...
+    router.record_success(model_name)    # ou record_failure(model_name, "rate limit")
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from dataclasses import dataclass
+from typing import Callable, Collection, Dict, Optional
+import logging
+import threading
+import time
+
+# Fenêtres des budgets (secondes)
+MINUTE = 60.0
+DAY = 86400.0
+
+# Cooldown après un 429 (la fenêtre RPM se vide en une minute)
+RATE_LIMIT_COOLDOWN = MINUTE
+
+# Cooldown après un modèle introuvable (404): il ne reviendra pas de sitôt
+UNAVAILABLE_COOLDOWN = 3600.0
+
+# Erreurs consécutives avant ouverture du circuit, cooldown initial et maximum
+FAILURE_THRESHOLD = 3
+ERROR_COOLDOWN = 30.0
+MAX_COOLDOWN = 600.0
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ModelLimits:
+    """Budgets d'un modèle (None = pas de limite connue)."""
+    rpm: Optional[int] = None
+    rpd: Optional[int] = None
+
+
+class TokenBucket:
+    """
+    Seau à jetons: `capacity` jetons, remplis en continu sur `period` secondes.
+
+    Un seau RPM de capacité 10 autorise une rafale de 10 requêtes puis une
+    requête toutes les 6 secondes.
+    """
+
+    def __init__(self, capacity: int, period: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = capacity / period
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Jetons disponibles."""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> bool:
+        """Consomme un jeton s'il y en a un."""
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    def drain(self) -> None:
+        """Vide le seau (quota réellement épuisé côté serveur)."""
+        self._refill()
+        self._tokens = 0.0
+
+    def utilization(self) -> float:
+        """Part du budget consommée (0-1)."""
+        return 1.0 - self.available() / self.capacity
+
+
+class _ModelState:
+    """Seaux, circuit et compteurs d'un modèle."""
+
+    def __init__(self, limits: ModelLimits, clock: Callable[[], float]):
+        self.buckets: Dict[str, TokenBucket] = {}
+        if limits.rpm:
+            self.buckets["rpm"] = TokenBucket(limits.rpm, MINUTE, clock)
+        if limits.rpd:
+            self.buckets["rpd"] = TokenBucket(limits.rpd, DAY, clock)
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.error_cooldown = ERROR_COOLDOWN
+        self.counters = {"requests": 0, "successes": 0, "failures": 0, "rate_limited": 0, "skipped": 0}
+
+
+class ModelRouter:
+    """
+    Routeur thread-safe entre modèles, par ordre de préférence.
+
+    Chaque appel à `acquire()` consomme un jeton de chaque budget du modèle
+    retenu; l'appelant rapporte ensuite le résultat avec `record_success()`
+    ou `record_failure()`.
+    """
+
+    def __init__(self, limits: Dict[str, ModelLimits], clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            limits: {nom du modèle: budgets}, dans l'ordre de préférence
+            clock: Horloge (injectable pour les tests)
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._models = {name: _ModelState(model_limits, clock) for name, model_limits in limits.items()}
+
+    @property
+    def model_names(self):
+        """Modèles routés, par ordre de préférence."""
+        return list(self._models)
+
+    def _is_open(self, state: _ModelState) -> bool:
+        return self._clock() < state.open_until
+
+    def _can_take(self, state: _ModelState, reserve: float) -> bool:
+        """
+        Le modèle peut-il recevoir un appel en laissant `reserve` (part de
+        chaque budget) intacte ? (verrou tenu)
+        """
+        if self._is_open(state):
+            return False
+        if reserve > 0 and not state.buckets:
+            return False  # Quota inconnu: impossible de garantir la réserve
+        return all(b.available() >= 1.0 + reserve * b.capacity for b in state.buckets.values())
+
+    def acquire(self, exclude: Collection[str] = (), reserve: float = 0.0) -> Optional[str]:
+        """
+        Réserve un appel sur le premier modèle disponible.
+
+        Args:
+            exclude: Modèles déjà essayés pour cette requête
+            reserve: Part de chaque budget (0-1) à laisser intacte
+                (appels de fond; 0 = requêtes utilisateur)
+
+        Returns:
+            Nom du modèle retenu, ou None si aucun n'a de capacité
+        """
+        with self._lock:
+            for name, state in self._models.items():
+                if name in exclude:
+                    continue
+                if not self._can_take(state, reserve):
+                    state.counters["skipped"] += 1
+                    continue
+                for bucket in state.buckets.values():
+                    bucket.try_acquire()
+                state.counters["requests"] += 1
+                return name
+        return None
+
+    def has_capacity(self, reserve: float = 0.0) -> bool:
+        """
+        Au moins un modèle peut-il recevoir une requête maintenant ?
+
+        Args:
+            reserve: Part de chaque budget à laisser intacte (voir acquire)
+        """
+        with self._lock:
+            return any(self._can_take(state, reserve) for state in self._models.values())
+
+    def record_success(self, model_name: str) -> None:
+        with self._lock:
+            state = self._models[model_name]
+            state.counters["successes"] += 1
+            state.consecutive_failures = 0
+            state.error_cooldown = ERROR_COOLDOWN
+
+    def record_failure(self, model_name: str, kind: str = "error") -> None:
+        """
+        Rapporte l'échec d'un appel.
+
+        Args:
+            model_name: Modèle appelé
+            kind: "rate limit" (429), "model not available" (404),
+                "timeout", "empty" (réponse vide) ou "error"
+                (voir generation_service.describe_error)
+        """
+        with self._lock:
+            state = self._models[model_name]
+            state.counters["failures"] += 1
+            state.consecutive_failures += 1
+
+            if kind == "rate limit":
+                # Quota réel plus bas que prévu: on vide le seau RPM
+                state.counters["rate_limited"] += 1
+                cooldown = RATE_LIMIT_COOLDOWN
+                if "rpm" in state.buckets:
+                    state.buckets["rpm"].drain()
+            elif kind == "model not available":
+                cooldown = UNAVAILABLE_COOLDOWN
+            elif state.consecutive_failures >= FAILURE_THRESHOLD:
+                cooldown = state.error_cooldown
+                state.error_cooldown = min(state.error_cooldown * 2, MAX_COOLDOWN)
+            else:
+                return
+
+            state.open_until = self._clock() + cooldown
+            logger.warning(f"Circuit open for {model_name} ({kind}), cooldown {cooldown:.0f}s")
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Métriques par modèle.
+
+        Returns:
+            {modèle: {state ("closed"/"open"), cooldown_remaining,
+                      rpm_available, rpm_utilization, rpd_available,
+                      rpd_utilization, requests, successes, failures,
+                      rate_limited, skipped}}
+        """
+        with self._lock:
+            now = self._clock()
+            stats = {}
+            for name, state in self._models.items():
+                entry = {
+                    "state": "open" if now < state.open_until else "closed",
+                    "cooldown_remaining": round(max(0.0, state.open_until - now), 1),
+                }
+                for budget, bucket in state.buckets.items():
+                    entry[f"{budget}_available"] = int(bucket.available())
+                    entry[f"{budget}_utilization"] = round(bucket.utilization(), 3)
+                entry.update(state.counters)
+                stats[name] = entry
+            return stats
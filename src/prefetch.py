@@ -0,0 +1,179 @@
+"""
+L'IA Pero - Préchauffage du cache de recettes
+===============================================
+
+Un thread d'arrière-plan pré-génère les recettes des requêtes les plus
+probables, hors du chemin des requêtes utilisateur:
+
+1. les requêtes du bouton "Surprends-moi !" (SURPRISE_QUERIES): le bouton
+   est alors toujours servi depuis le cache;
+2. les N requêtes les plus fréquentes du journal d'analytics (agrégats).
+
+Chaque requête est mise sous la forme exacte envoyée par l'interface avec
+les réglages par défaut (préférences, budget, filtres: voir queries), pour
+que la clé de cache corresponde. Le préchauffage garde une réserve de
+quota pour les utilisateurs: il n'utilise que les modèles à quota connu,
+s'arrête dès qu'aucun ne dispose de plus de PREFETCH_QUOTA_RESERVE de
+chacun de ses budgets (RPM, RPD) et n'effectue pas plus de
+PREFETCH_MAX_PER_RUN générations par passage. Ses recherches dans le cache
+sont comptées à part (prefetch_hits, prefetch_misses).
+Une génération en échec n'est pas remplacée par la recette de secours
+(voir backend.prefetch_recipe).
+
+Configuration (variables d'environnement):
+    PREFETCH_ENABLED        1 (défaut) / 0
+    PREFETCH_INTERVAL       secondes entre deux passages (défaut 3600)
+    PREFETCH_INITIAL_DELAY  délai avant le premier passage (défaut 30)
+    PREFETCH_MAX_PER_RUN    générations maximum par passage (défaut 4)
+    PREFETCH_TOP_N          requêtes fréquentes retenues (défaut 10)
+    PREFETCH_QUOTA_RESERVE  part de chaque budget laissée aux utilisateurs
+                            (défaut 0.5, voir backend)
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+import logging
+import os
+import threading
+
+from src.analytics import AnalyticsLog, get_analytics_log
+from src.queries import SURPRISE_QUERIES, build_default_query
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+PREFETCH_INTERVAL = float(os.getenv("PREFETCH_INTERVAL", "3600"))
+PREFETCH_INITIAL_DELAY = float(os.getenv("PREFETCH_INITIAL_DELAY", "30"))
+PREFETCH_MAX_PER_RUN = int(os.getenv("PREFETCH_MAX_PER_RUN", "4"))
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "10"))
+
+logger = logging.getLogger(__name__)
+
+
+def popular_queries(analytics: AnalyticsLog, top_n: int = PREFETCH_TOP_N) -> List[str]:
+    """
+    Requêtes les plus fréquentes des générations réussies.
+
+    Lues dans les agrégats du journal d'analytics (sans relire l'historique).
+
+    Returns:
+        list[str]: Au plus top_n requêtes, de la plus fréquente à la moins
+    """
+    if top_n <= 0:
+        return []
+    return [query for query, _ in analytics.top_queries(top_n)]
+
+
+class CacheWarmer:
+    """
+    Préchauffage périodique du cache de recettes, dans un thread démon.
+
+    Usage:
+        warmer = CacheWarmer()
+        warmer.start()          # passages toutes les PREFETCH_INTERVAL secondes
+        warmer.run_once()       # ou un passage immédiat (scripts, tests)
+    """
+
+    def __init__(
+        self,
+        prefetch: Optional[Callable[[str], str]] = None,
+        analytics: Optional[AnalyticsLog] = None,
+        top_n: int = PREFETCH_TOP_N,
+        max_per_run: int = PREFETCH_MAX_PER_RUN,
+        interval: float = PREFETCH_INTERVAL,
+        initial_delay: float = PREFETCH_INITIAL_DELAY
+    ):
+        """
+        Args:
+            prefetch: Préchauffe une requête et retourne son statut (défaut:
+                backend.prefetch_recipe)
+            analytics: Journal des requêtes, pour les requêtes fréquentes
+                (défaut: journal du processus)
+            top_n: Nombre de requêtes fréquentes retenues
+            max_per_run: Générations (appels Gemini) maximum par passage
+            interval: Secondes entre deux passages
+            initial_delay: Délai avant le premier passage (démarrage de l'app)
+        """
+        if prefetch is None:
+            from src.backend import prefetch_recipe as prefetch
+        self._prefetch = prefetch
+        self.analytics = analytics if analytics is not None else get_analytics_log()
+        self.top_n = top_n
+        self.max_per_run = max_per_run
+        self.interval = interval
+        self.initial_delay = initial_delay
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = Counter()
+
+    def candidates(self) -> List[str]:
+        """Requêtes à préchauffer (forme finale, sans doublon): surprise d'abord."""
+        queries = SURPRISE_QUERIES + popular_queries(self.analytics, self.top_n)
+        return list(dict.fromkeys(build_default_query(query) for query in queries))
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Un passage de préchauffage.
+
+        Returns:
+            dict: Nombre de requêtes par statut (cached, warmed, failed,
+            rejected, no_capacity)
+        """
+        counts = Counter()
+        generations = 0
+        for query in self.candidates():
+            if generations >= self.max_per_run:
+                break
+            status = self._prefetch(query)
+            counts[status] += 1
+            if status in ("warmed", "failed"):
+                generations += 1
+            elif status == "no_capacity":
+                logger.info("Prefetch paused: no model capacity left")
+                break
+
+        self._stats.update(counts)
+        self._stats["runs"] += 1
+        logger.info(f"Prefetch run: {dict(counts)}")
+        return dict(counts)
+
+    def _loop(self) -> None:
+        delay = self.initial_delay
+        while not self._stop.wait(delay):
+            try:
+                self.run_once()
+            except Exception as e:
+                # Le préchauffage ne doit jamais arrêter l'application
+                logger.warning(f"Prefetch run failed: {e}")
+            delay = self.interval
+
+    def start(self) -> None:
+        """Démarre le thread de préchauffage (sans effet s'il tourne déjà)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Arrête le thread après le passage en cours."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs cumulés: runs et nombre de requêtes par statut."""
+        return dict(self._stats)
+
+
+@lru_cache(maxsize=1)
+def get_cache_warmer() -> CacheWarmer:
+    """Préchauffeur partagé par le processus (configuration par défaut)."""
+    return CacheWarmer()
@@ -0,0 +1,142 @@
+"""
+L'IA Pero - Construction des requêtes de génération
+=====================================================
+
+La requête envoyée au générateur (et qui sert de clé de cache) n'est pas le
+texte saisi tel quel: elle est enrichie des préférences gustatives (EF4.1),
+puis du budget et des filtres actifs:
+
+    "mojito"  →  "mojito (budget: Modere (8-15€)) [sans alcool, mocktail]"
+
+Le cache sémantique compare le texte saisi (`query_free_text`), uniquement
+entre requêtes de même "bucket" (`query_bucket`: préférences ajoutées,
+budget et filtres).
+
+L'interface et le préchauffage du cache (prefetch) utilisent la même
+construction: une recette préchauffée pour une requête est servie depuis le
+cache quand un utilisateur la demande avec les réglages par défaut.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Dict, List, Optional, Tuple
+
+from src.scoring import DEFAULT_USER_WEIGHTS, enrich_short_query, split_enriched_query
+
+# Requêtes du bouton "Surprends-moi !"
+SURPRISE_QUERIES = [
+    "Un cocktail mysterieux et envoûtant",
+    "Quelque chose de tropical et exotique",
+    "Un classique des annees folles",
+    "Une creation audacieuse et surprenante",
+    "Un cocktail doux et romantique",
+    "Quelque chose de fort et caractere",
+    "Un rafraichissement estival",
+    "Une boisson elegante pour une soiree chic",
+]
+
+# Budgets proposés dans le questionnaire, et budget présélectionné
+BUDGET_OPTIONS = [
+    "Economique (< 8€)",
+    "Modere (8-15€)",
+    "Premium (15-25€)",
+    "Luxe (> 25€)",
+]
+DEFAULT_BUDGET = BUDGET_OPTIONS[1]
+
+# Début du suffixe ajouté par build_final_query (budget puis filtres)
+BUDGET_MARKER = " (budget: "
+
+# Filtres par défaut d'une session (aucun filtre actif)
+DEFAULT_FILTERS = {
+    "source": "Tous",
+    "alcohol": "Tous",
+    "difficulty": "Tous",
+    "prep_time": "Tous",
+}
+
+
+def build_filter_context(filters: Dict[str, str]) -> List[str]:
+    """
+    Traduit les filtres actifs en indications pour le générateur.
+
+    Le filtre de source ne s'applique qu'aux résultats de recherche: une
+    génération crée un nouveau cocktail.
+    """
+    context = []
+    if filters.get("alcohol") == "Sans Alcool":
+        context.append("sans alcool, mocktail")
+    if filters.get("difficulty") == "Facile":
+        context.append("recette simple et rapide")
+    elif filters.get("difficulty") == "Expert":
+        context.append("recette elaboree pour barman experimente")
+    if filters.get("prep_time") == "< 5 min":
+        context.append("preparation rapide moins de 5 minutes")
+    return context
+
+
+def build_final_query(
+    enriched_query: str,
+    budget: str = DEFAULT_BUDGET,
+    filters: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Construit la requête complète envoyée à generate_recipe().
+
+    Args:
+        enriched_query: Requête enrichie des préférences (enrich_short_query)
+        budget: Budget choisi
+        filters: Filtres actifs (défaut: aucun)
+
+    Returns:
+        Requête complète, budget et filtres compris
+    """
+    final_query = f"{enriched_query}{BUDGET_MARKER}{budget})"
+
+    filter_context = build_filter_context(filters or DEFAULT_FILTERS)
+    if filter_context:
+        final_query += f" [{', '.join(filter_context)}]"
+    return final_query
+
+
+def request_text(final_query: str) -> str:
+    """
+    Requête enrichie, sans le suffixe budget et filtres: le texte que
+    vérifie le guardrail et que l'interface score (même embedding).
+    """
+    position = final_query.rfind(BUDGET_MARKER)
+    return final_query if position < 0 else final_query[:position]
+
+
+def split_final_query(final_query: str) -> Tuple[str, str]:
+    """
+    Sépare une requête complète en texte saisi et contraintes.
+
+        "mojito, rafraichissant (budget: Modere (8-15€)) [sans alcool, mocktail]"
+            →  ("mojito", "rafraichissant (budget: Modere (8-15€)) [sans alcool, mocktail]")
+
+    Returns:
+        Tuple (texte saisi par l'utilisateur, préférences ajoutées + budget
+        et filtres)
+    """
+    request = request_text(final_query)
+    free_text, context = split_enriched_query(request)
+    return free_text, f"{context}{final_query[len(request):]}".strip()
+
+
+def query_free_text(final_query: str) -> str:
+    """Texte saisi par l'utilisateur, sans préférences, budget ni filtres."""
+    return split_final_query(final_query)[0]
+
+
+def query_bucket(final_query: str) -> str:
+    """
+    Contraintes strictes d'une requête complète, en minuscules: préférences
+    ajoutées par enrich_short_query, budget et filtres ("" si aucune).
+    """
+    return split_final_query(final_query)[1].lower()
+
+
+def build_default_query(query: str) -> str:
+    """Requête complète avec les réglages par défaut d'une nouvelle session."""
+    return build_final_query(enrich_short_query(query, DEFAULT_USER_WEIGHTS))
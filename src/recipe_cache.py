@@ -0,0 +1,641 @@
+"""
+L'IA Pero - Cache des recettes générées
+=========================================
+
+Stocke les recettes déjà générées par Gemini pour éviter les appels API
+redondants. Le cache est "pluggable": `generate_recipe` ne connaît que
+l'interface `RecipeCache` (get / set), l'implémentation est choisie par
+`create_recipe_cache()`.
+
+Implémentations disponibles:
+- `SQLiteRecipeCache` (défaut): base SQLite en mode WAL, clé primaire sur le
+  hash de la requête → lecture/écriture d'UNE entrée, sans relire tout le
+  cache. Plusieurs sessions Streamlit (threads ou processus) peuvent lire
+  pendant qu'une autre écrit.
+- `JsonRecipeCache` (historique): un seul fichier JSON relu et réécrit
+  entièrement à chaque écriture. Conservé pour la migration et le debug.
+- `MemoryRecipeCache`: LRU en mémoire (taille bornée, TTL, compteurs),
+  placé devant le cache persistant par `TieredRecipeCache`.
+
+`SemanticRecipeIndex` complète la clé exacte: il retrouve une requête déjà
+en cache dont l'embedding est assez proche (quasi-doublon).
+
+Migration: `migrate_json_cache()` importe l'ancien `recipe_cache.json` en une
+seule transaction puis le renomme en `.migrated` (exécutée une seule fois).
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeCache:
+    """Interface commune des backends de cache (clé = hash de la requête)."""
+
+    def get(self, key: str) -> Optional[dict]:
+        """Retourne la recette associée à `key`, ou None si absente."""
+        raise NotImplementedError
+
+    def set(self, key: str, recipe: dict) -> None:
+        """Enregistre (ou remplace) la recette associée à `key`."""
+        raise NotImplementedError
+
+    def set_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        """Enregistre plusieurs recettes. Retourne le nombre d'entrées écrites."""
+        count = 0
+        for key, recipe in items:
+            self.set(key, recipe)
+            count += 1
+        return count
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """Parcourt les entrées (clé, recette), des plus anciennes aux plus récentes."""
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def close(self) -> None:
+        """Libère les ressources (connexions, fichiers)."""
+
+
+class JsonRecipeCache(RecipeCache):
+    """
+    Cache historique: un dictionnaire {clé: recette} dans un fichier JSON.
+
+    Chaque écriture relit et réécrit tout le fichier (coût O(N)) et deux
+    sessions concurrentes peuvent s'écraser mutuellement.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> dict:
+        """Charge tout le fichier (dictionnaire vide si absent ou corrompu)."""
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                logger.warning("Cache file corrupted, starting fresh")
+                return {}
+        return {}
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.load().get(key)
+
+    def set(self, key: str, recipe: dict) -> None:
+        cache = self.load()
+        cache[key] = recipe
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        return iter(self.load().items())
+
+    def __len__(self) -> int:
+        return len(self.load())
+
+
+class SQLiteRecipeCache(RecipeCache):
+    """
+    Cache SQLite: une ligne par recette, indexée par la clé de cache.
+
+    - Mode WAL: les lectures ne bloquent pas pendant une écriture
+    - Une connexion par thread (Streamlit exécute chaque session dans un thread)
+    - `timeout` de connexion pour absorber les écritures concurrentes entre processus
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS recipes (
+            cache_key  TEXT PRIMARY KEY,
+            recipe     TEXT NOT NULL,
+            created_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: Path, timeout: float = 5.0):
+        """
+        Args:
+            path: Fichier de base SQLite (créé si absent)
+            timeout: Attente maximale (secondes) si la base est verrouillée
+        """
+        self.path = Path(path)
+        self.timeout = timeout
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(self.SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion propre au thread courant (créée à la demande)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT recipe FROM recipes WHERE cache_key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0])
+        except json.JSONDecodeError:
+            logger.warning(f"Corrupted cache entry {key}, ignoring")
+            return None
+
+    def set(self, key: str, recipe: dict) -> None:
+        self.set_many([(key, recipe)])
+
+    def set_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        rows = [
+            (key, json.dumps(recipe, ensure_ascii=False), time.time())
+            for key, recipe in items
+        ]
+        conn = self._connection()
+        with conn:  # Une seule transaction pour tout le lot
+            conn.executemany(
+                "INSERT OR REPLACE INTO recipes (cache_key, recipe, created_at) VALUES (?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        rows = self._connection().execute("SELECT cache_key, recipe FROM recipes ORDER BY created_at")
+        for key, recipe in rows:
+            try:
+                yield key, json.loads(recipe)
+            except json.JSONDecodeError:
+                logger.warning(f"Corrupted cache entry {key}, ignoring")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class MemoryRecipeCache(RecipeCache):
+    """
+    Cache LRU en mémoire, borné en nombre d'entrées et en taille, avec TTL.
+
+    Sert les requêtes "chaudes" (ex: SURPRISE_QUERIES) sans toucher au disque.
+    Thread-safe: toutes les sessions Streamlit d'un processus le partagent.
+
+    Compteurs exposés par `stats()`:
+        hits, misses, evictions (LRU ou taille), expirations (TTL)
+
+    Les lectures avec `record_stats=False` (tâches de fond, ex: préchauffage)
+    ne touchent pas hits/misses: le taux de hit décrit les utilisateurs.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 8 * 1024 * 1024,
+                 ttl: Optional[float] = 3600.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            max_entries: Nombre maximal de recettes gardées en mémoire
+            max_bytes: Taille maximale cumulée (recettes sérialisées en JSON)
+            ttl: Durée de vie d'une entrée en secondes (None = illimitée)
+            clock: Horloge monotone (injectable pour les tests)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[float, int, dict]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, record_stats: bool = True) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record_stats:
+                    self.misses += 1
+                return None
+
+            expires_at, _, recipe = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                if record_stats:
+                    self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)  # Plus récemment utilisée
+            if record_stats:
+                self.hits += 1
+            return copy.deepcopy(recipe)
+
+    def set(self, key: str, recipe: dict) -> None:
+        size = len(json.dumps(recipe, ensure_ascii=False).encode("utf-8"))
+        if size > self.max_bytes:
+            return  # Trop volumineuse pour le cache mémoire, reste sur disque
+
+        expires_at = self._clock() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, copy.deepcopy(recipe))
+            self._bytes += size
+
+            # Éviction LRU tant qu'une limite est dépassée
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Retire une entrée (appelé avec le verrou tenu)."""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Compteurs du cache mémoire (pour les métriques de l'application)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+class TieredRecipeCache(RecipeCache):
+    """
+    Cache à deux niveaux: LRU mémoire devant un cache persistant.
+
+    - Lecture: mémoire, puis disque (une entrée trouvée sur disque est
+      promue en mémoire pour les requêtes suivantes)
+    - Écriture: disque puis mémoire (write-through)
+    """
+
+    def __init__(self, memory: MemoryRecipeCache, persistent: RecipeCache):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key: str, record_stats: bool = True) -> Optional[dict]:
+        recipe = self.memory.get(key, record_stats=record_stats)
+        if recipe is not None:
+            return recipe
+
+        recipe = self.persistent.get(key)
+        if recipe is not None:
+            self.memory.set(key, recipe)
+        return recipe
+
+    def set(self, key: str, recipe: dict) -> None:
+        self.persistent.set(key, recipe)
+        self.memory.set(key, recipe)
+
+    def set_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        items = list(items)
+        count = self.persistent.set_many(items)
+        for key, recipe in items:
+            self.memory.set(key, recipe)
+        return count
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        return self.persistent.items()
+
+    def __len__(self) -> int:
+        return len(self.persistent)
+
+    def close(self) -> None:
+        self.persistent.close()
+
+    def stats(self) -> dict:
+        """Compteurs du niveau mémoire."""
+        return self.memory.stats()
+
+
+class SemanticRecipeIndex:
+    """
+    Index des embeddings des requêtes déjà mises en cache (cache sémantique).
+
+    La clé MD5 ne reconnaît que les requêtes identiques: "mojito frais" et
+    "un mojito bien frais" sont deux entrées différentes. Cet index retrouve
+    la requête en cache la plus proche (similarité cosinus) et la réutilise
+    si elle dépasse le seuil.
+
+    - Embeddings normalisés (L2) dans une matrice float32 contiguë:
+      recherche du plus proche voisin = un produit matrice-vecteur
+    - Chaque requête appartient à un "bucket" (contraintes strictes: budget,
+      filtres): seules les requêtes du même bucket peuvent correspondre, une
+      requête "sans alcool" ne reçoit jamais la recette d'une requête sans
+      ce filtre, même très proche
+    - Au plus `max_entries` requêtes: les plus anciennes sont évincées
+    - Persistance optionnelle dans la base SQLite du cache (table
+      `semantic_queries`), rechargée au démarrage pour le modèle courant
+    - Thread-safe (verrou autour de la matrice)
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS semantic_queries (
+            cache_key  TEXT PRIMARY KEY,
+            model_name TEXT NOT NULL,
+            bucket     TEXT NOT NULL,
+            added_at   REAL NOT NULL,
+            embedding  BLOB NOT NULL
+        ) WITHOUT ROWID
+    """
+
+    # Ancienne table (sans bucket): supprimée, l'index est reconstruit
+    # depuis le cache de recettes
+    LEGACY_TABLE = "query_embeddings"
+
+    def __init__(self, threshold: float, model_name: str, path: Optional[Path] = None,
+                 max_entries: int = 10000):
+        """
+        Args:
+            threshold: Similarité cosinus minimale pour réutiliser une recette
+            model_name: Modèle SBERT des embeddings (les autres sont ignorés)
+            path: Base SQLite de persistance (None = index en mémoire seulement)
+            max_entries: Nombre maximum de requêtes indexées
+        """
+        self.threshold = threshold
+        self.model_name = model_name
+        self.path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys: list = []
+        self._positions: Dict[str, int] = {}
+        self._order: "OrderedDict[str, None]" = OrderedDict()  # Du plus ancien au plus récent
+        self._matrix: Optional[np.ndarray] = None
+        self._buckets: Optional[np.ndarray] = None  # Identifiant de bucket par ligne
+        self._bucket_ids: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.path is not None:
+            self._local = threading.local()
+            conn = self._connection()
+            with conn:
+                conn.execute(f"DROP TABLE IF EXISTS {self.LEGACY_TABLE}")
+                conn.execute(self.SCHEMA)
+            rows = conn.execute(
+                "SELECT cache_key, bucket, embedding FROM semantic_queries WHERE model_name = ? "
+                "ORDER BY added_at",
+                (model_name,),
+            ).fetchall()
+            with self._lock:
+                for key, bucket, blob in rows:
+                    self._append(key, np.frombuffer(blob, dtype=np.float32), bucket)
+                evicted = self._evict()
+            self._delete(evicted)
+            if rows:
+                logger.info(f"Semantic cache index loaded: {len(self._keys)} queries")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Connexion SQLite propre au thread courant."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=5.0)
+            self._local.conn = conn
+        return conn
+
+    def _append(self, key: str, embedding: np.ndarray, bucket: str) -> None:
+        """Ajoute (ou remplace) une ligne; capacité doublée si nécessaire (verrou tenu)."""
+        bucket_id = self._bucket_ids.setdefault(bucket, len(self._bucket_ids))
+        if key in self._positions:
+            position = self._positions[key]
+            self._matrix[position] = embedding
+            self._buckets[position] = bucket_id
+            self._order.move_to_end(key)
+            return
+
+        n = len(self._keys)
+        if self._matrix is None:
+            self._matrix = np.empty((64, embedding.shape[0]), dtype=np.float32)
+            self._buckets = np.empty(64, dtype=np.int32)
+        elif n == self._matrix.shape[0]:
+            grown = np.empty((n * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:n] = self._matrix
+            self._matrix = grown
+            grown_buckets = np.empty(n * 2, dtype=np.int32)
+            grown_buckets[:n] = self._buckets
+            self._buckets = grown_buckets
+
+        self._matrix[n] = embedding
+        self._buckets[n] = bucket_id
+        self._positions[key] = n
+        self._keys.append(key)
+        self._order[key] = None
+
+    def _remove(self, key: str) -> bool:
+        """Retire une ligne (la dernière ligne prend sa place), verrou tenu."""
+        position = self._positions.pop(key, None)
+        if position is None:
+            return False
+        del self._order[key]
+        last = len(self._keys) - 1
+        if position != last:
+            moved = self._keys[last]
+            self._matrix[position] = self._matrix[last]
+            self._buckets[position] = self._buckets[last]
+            self._keys[position] = moved
+            self._positions[moved] = position
+        self._keys.pop()
+        return True
+
+    def _evict(self) -> List[str]:
+        """Évince les requêtes les plus anciennes au-delà de max_entries (verrou tenu)."""
+        evicted = []
+        while len(self._keys) > self.max_entries:
+            oldest = next(iter(self._order))
+            self._remove(oldest)
+            evicted.append(oldest)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _delete(self, keys: List[str]) -> None:
+        """Supprime des lignes persistées."""
+        if self.path is not None and keys:
+            conn = self._connection()
+            with conn:
+                conn.executemany("DELETE FROM semantic_queries WHERE cache_key = ?", [(key,) for key in keys])
+
+    def add(self, key: str, embedding: np.ndarray, bucket: str = "") -> None:
+        """
+        Enregistre l'embedding (normalisé) d'une requête mise en cache.
+
+        Args:
+            key: Clé de cache de la recette
+            embedding: Embedding L2-normalisé de la requête
+            bucket: Contraintes strictes de la requête (budget, filtres)
+        """
+        self.add_many([(key, embedding, bucket)])
+
+    def add_many(self, entries: Iterable[Tuple[str, np.ndarray, str]]) -> int:
+        """Enregistre plusieurs requêtes (une transaction). Retourne leur nombre."""
+        rows = []
+        now = time.time()
+        with self._lock:
+            for key, embedding, bucket in entries:
+                embedding = np.ascontiguousarray(embedding, dtype=np.float32).ravel()
+                self._append(key, embedding, bucket)
+                rows.append((key, self.model_name, bucket, now, embedding.tobytes()))
+            evicted = self._evict()
+
+        if self.path is not None and rows:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO semantic_queries (cache_key, model_name, bucket, added_at, embedding) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        self._delete(evicted)
+        return len(rows)
+
+    def remove(self, key: str) -> None:
+        """Retire une requête (ex: sa recette n'est plus dans le cache)."""
+        with self._lock:
+            removed = self._remove(key)
+        if removed:
+            self._delete([key])
+
+    def lookup(self, embedding: np.ndarray, bucket: str = "") -> Optional[Tuple[str, float]]:
+        """
+        Cherche la requête en cache la plus proche, dans le même bucket.
+
+        Ne compte ni hit ni miss: l'appelant vérifie que la recette existe
+        encore, puis appelle `record_lookup()`.
+
+        Args:
+            embedding: Embedding L2-normalisé de la nouvelle requête
+            bucket: Contraintes strictes de la nouvelle requête
+
+        Returns:
+            (clé de cache, similarité) si la similarité atteint le seuil, sinon None
+        """
+        with self._lock:
+            n = len(self._keys)
+            bucket_id = self._bucket_ids.get(bucket)
+            if n == 0 or bucket_id is None:
+                return None
+
+            similarities = self._matrix[:n] @ np.asarray(embedding, dtype=np.float32).ravel()
+            similarities[self._buckets[:n] != bucket_id] = -np.inf
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+
+            if similarity < self.threshold:
+                return None
+            return self._keys[best], similarity
+
+    def record_lookup(self, hit: bool) -> None:
+        """Compte une recherche (hit = recette effectivement réutilisée)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def stats(self) -> dict:
+        """Compteurs du cache sémantique."""
+        return {"entries": len(self._keys), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+# Backends disponibles (sélection par nom, ex: variable d'environnement)
+CACHE_BACKENDS: Dict[str, type] = {
+    "sqlite": SQLiteRecipeCache,
+    "json": JsonRecipeCache,
+}
+
+
+def create_recipe_cache(backend: str, path: Path) -> RecipeCache:
+    """
+    Instancie un backend de cache par son nom.
+
+    Args:
+        backend: "sqlite" ou "json"
+        path: Fichier de stockage du backend
+
+    Raises:
+        ValueError: Si le backend est inconnu
+    """
+    try:
+        cache_class = CACHE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown recipe cache backend '{backend}' (available: {', '.join(CACHE_BACKENDS)})")
+    return cache_class(path)
+
+
+def migrate_json_cache(json_path: Path, target: RecipeCache) -> int:
+    """
+    Importe l'ancien cache JSON dans `target` (migration one-shot).
+
+    Le fichier JSON est renommé en `<nom>.migrated` après import, la
+    migration ne se relance donc pas aux démarrages suivants.
+
+    Args:
+        json_path: Chemin de l'ancien recipe_cache.json
+        target: Cache de destination
+
+    Returns:
+        int: Nombre de recettes importées (0 si rien à migrer)
+    """
+    json_path = Path(json_path)
+    if not json_path.exists():
+        return 0
+
+    entries = JsonRecipeCache(json_path).load()
+    count = target.set_many(entries.items())
+    try:
+        json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+    except OSError:
+        # Un autre worker a migré en même temps: INSERT OR REPLACE est idempotent
+        pass
+
+    logger.info(f"Migrated {count} recipes from {json_path} to {type(target).__name__}")
+    return count
@@ -0,0 +1,117 @@
+"""
+L'IA Pero - Parsing incrémental des recettes en streaming
+===========================================================
+
+Gemini renvoie la recette par morceaux de texte. Plutôt que d'attendre le
+JSON complet, IncrementalRecipeParser reçoit chaque morceau et signale
+chaque champ de premier niveau dès que sa valeur est complète:
+
+    {"name": "Le Charleston", "ingredients": [...], "instructions": "...", ...}
+           └── "name" émis ici   └── "ingredients"    └── "instructions"
+
+L'interface peut ainsi afficher le nom du cocktail en quelques centaines de
+millisecondes, puis les ingrédients et la préparation au fil de l'eau.
+
+Le parseur suit uniquement la profondeur d'imbrication et les chaînes
+(guillemets, échappements): un membre de premier niveau est complet dès
+qu'une virgule ou l'accolade fermante de l'objet racine apparaît à la
+profondeur 1. Le texte avant l'objet (balises ```json) est ignoré.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Any, Dict, List, Tuple
+import json
+
+
+class IncrementalRecipeParser:
+    """
+    Parseur incrémental d'un objet JSON, champ de premier niveau par champ.
+
+    Usage:
+        parser = IncrementalRecipeParser()
+        for chunk in response_stream:
+            for field, value in parser.feed(chunk.text):
+                afficher(field, value)
+        recipe = parser.result()   # dict complet (None si JSON incomplet)
+    """
+
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+        self.fields: Dict[str, Any] = {}
+        self.complete = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Ajoute un morceau de texte.
+
+        Returns:
+            Champs (nom, valeur) devenus complets avec ce morceau, dans
+            l'ordre d'arrivée
+
+        Raises:
+            json.JSONDecodeError: si un membre complet n'est pas du JSON valide
+        """
+        completed = []
+        for char in chunk:
+            if self.complete:
+                break
+            self._buffer.append(char)
+
+            if not self._started:
+                # Texte avant l'objet racine (```json, espaces...)
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                self._member.append(char)
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+
+            if self._depth == 1 and char == ",":
+                completed.extend(self._close_member())
+            elif self._depth == 0:
+                completed.extend(self._close_member())
+                self.complete = True
+            else:
+                self._member.append(char)
+
+        return completed
+
+    def _close_member(self) -> List[Tuple[str, Any]]:
+        """Décode le membre `"clé": valeur` accumulé."""
+        text = "".join(self._member).strip()
+        self._member = []
+        if not text:
+            return []
+        member = json.loads("{" + text + "}")
+        self.fields.update(member)
+        return list(member.items())
+
+    def result(self) -> Dict[str, Any] | None:
+        """L'objet complet, ou None si l'accolade fermante n'est pas arrivée."""
+        return dict(self.fields) if self.complete else None
+
+    @property
+    def text(self) -> str:
+        """Texte reçu jusqu'ici."""
+        return "".join(self._buffer)
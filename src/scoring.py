@@ -19,6 +19,11 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 import logging
+import threading
+import weakref
+
+from src.embeddings import encode_query, normalize_embeddings
+from src.instrumentation import span
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +83,13 @@ DEFAULT_USER_WEIGHTS = {
 }
 
 
+# Seuil de similarite pour qu'un mot-cle soit considere comme "matche"
+KEYWORD_MATCH_THRESHOLD = 0.3
+
+# Nombre de meilleures similarites moyennees pour le score d'un bloc
+BLOCK_TOP_K = 3
+
+
 @dataclass
 class ScoringResult:
     """Resultat du calcul de score avec details par bloc"""
@@ -97,6 +109,10 @@ def calculate_block_similarity(
     """
     Calcule la similarite semantique entre une requete et un bloc de competences.
 
+    Version unitaire (un bloc, mots-cles encodes a chaque appel). Le calcul
+    du Coverage Score utilise `calculate_all_block_similarities`, qui donne
+    le meme resultat pour les 7 blocs en une seule operation matricielle.
+
     Args:
         query_embedding: Embedding de la requete utilisateur
         block_keywords: Liste des mots-cles du bloc
@@ -114,19 +130,156 @@ def calculate_block_similarity(
     similarities = util.cos_sim(query_embedding, keyword_embeddings).numpy().flatten()
 
     # Identifier les keywords matches (similarite > 0.3)
-    matched = [kw for kw, sim in zip(block_keywords, similarities) if sim > 0.3]
+    matched = [kw for kw, sim in zip(block_keywords, similarities) if sim > KEYWORD_MATCH_THRESHOLD]
 
     # Score du bloc = moyenne des Top-3 similarites
-    top_similarities = sorted(similarities, reverse=True)[:3]
+    top_similarities = sorted(similarities, reverse=True)[:BLOCK_TOP_K]
     block_score = float(np.mean(top_similarities)) if top_similarities else 0.0
 
     return block_score, matched
 
 
+@dataclass(frozen=True)
+class BlockKeywordIndex:
+    """
+    Mots-cles de tous les blocs encodes une seule fois.
+
+    Attributes:
+        block_names: Noms des blocs, dans l'ordre de TASTE_BLOCKS
+        keywords: Mots-cles de tous les blocs, concatenes bloc par bloc
+        embeddings: Matrice [n_keywords x dim] normalisee (float32)
+        block_ids: Indice du bloc de chaque mot-cle [n_keywords]
+        padded_positions: [n_blocks x max_keywords] positions des mots-cles
+            de chaque bloc dans `keywords`, completees par -1
+    """
+    block_names: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+    embeddings: np.ndarray
+    block_ids: np.ndarray
+    padded_positions: np.ndarray
+
+
+# Index par modele (entree liberee avec le modele) + empreinte de TASTE_BLOCKS
+_block_index_cache = weakref.WeakKeyDictionary()
+_block_index_lock = threading.Lock()
+
+
+def get_block_keyword_index(model) -> BlockKeywordIndex:
+    """
+    Retourne les mots-cles des 7 blocs encodes en une seule passe SBERT.
+
+    L'index est calcule une fois par modele et recalcule automatiquement
+    si TASTE_BLOCKS change (empreinte des noms et mots-cles).
+
+    Args:
+        model: Modele SBERT
+
+    Returns:
+        BlockKeywordIndex pret pour un produit matrice-vecteur
+    """
+    fingerprint = tuple((name, tuple(config["keywords"])) for name, config in TASTE_BLOCKS.items())
+
+    with _block_index_lock:
+        cached = _block_index_cache.get(model)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+    block_names = tuple(name for name, _ in fingerprint)
+    keywords = tuple(kw for _, block_keywords in fingerprint for kw in block_keywords)
+    block_ids = np.repeat(np.arange(len(fingerprint)), [len(kws) for _, kws in fingerprint])
+
+    max_keywords = max((len(kws) for _, kws in fingerprint), default=0)
+    padded_positions = np.full((len(fingerprint), max_keywords), -1, dtype=np.intp)
+    start = 0
+    for i, (_, block_keywords) in enumerate(fingerprint):
+        padded_positions[i, :len(block_keywords)] = np.arange(start, start + len(block_keywords))
+        start += len(block_keywords)
+
+    embeddings = normalize_embeddings(model.encode(list(keywords), convert_to_numpy=True))
+    embeddings.setflags(write=False)
+
+    index = BlockKeywordIndex(block_names, keywords, embeddings, block_ids, padded_positions)
+    with _block_index_lock:
+        _block_index_cache[model] = (fingerprint, index)
+    return index
+
+
+def _score_blocks(
+    query_embeddings: np.ndarray,
+    model
+) -> Tuple[np.ndarray, np.ndarray, BlockKeywordIndex]:
+    """
+    Calcule le score de chaque bloc pour une ou plusieurs requetes.
+
+    Equivalent vectorise de `calculate_block_similarity` applique a tous
+    les blocs: un produit matriciel, un top-3 segmente par bloc et un
+    masque de seuil.
+
+    Args:
+        query_embeddings: Embedding(s) normalise(s) [dim] ou [n_queries x dim]
+        model: Modele SBERT (pour l'index des mots-cles)
+
+    Returns:
+        Tuple (block_scores [n_queries x n_blocks],
+               matched_mask [n_queries x n_keywords], index)
+    """
+    index = get_block_keyword_index(model)
+    queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+
+    # Similarite cosinus avec tous les mots-cles: [n_queries x n_keywords]
+    similarities = queries @ index.embeddings.T
+
+    # Top-3 par bloc: similarites regroupees [n_queries x n_blocks x max_kw]
+    # (-inf pour les cases de remplissage), triees par ordre decroissant
+    padded = np.where(
+        index.padded_positions >= 0,
+        similarities[:, index.padded_positions],
+        -np.inf,
+    )
+    top = -np.sort(-padded, axis=2)[:, :, :BLOCK_TOP_K]
+    valid = np.isfinite(top)
+    counts = valid.sum(axis=2)
+    # Moyenne en float32, comme np.mean sur les similarites float32 d'un bloc
+    block_scores = (
+        np.where(valid, top, 0).sum(axis=2, dtype=np.float32)
+        / np.maximum(counts, 1).astype(np.float32)
+    )
+
+    return block_scores, similarities > KEYWORD_MATCH_THRESHOLD, index
+
+
+def calculate_all_block_similarities(
+    query_embedding: np.ndarray,
+    model
+) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+    """
+    Calcule la similarite d'une requete avec tous les blocs de competences.
+
+    Meme resultat que `calculate_block_similarity` appele pour chaque bloc,
+    sans re-encoder les mots-cles ni trier en Python.
+
+    Args:
+        query_embedding: Embedding normalise de la requete utilisateur
+        model: Modele SBERT
+
+    Returns:
+        Tuple (scores par bloc, mots-cles matches par bloc)
+    """
+    block_scores, matched_mask, index = _score_blocks(query_embedding, model)
+
+    scores = {name: float(block_scores[0, i]) for i, name in enumerate(index.block_names)}
+    matched = {name: [] for name in index.block_names}
+    for pos in np.flatnonzero(matched_mask[0]):
+        matched[index.block_names[index.block_ids[pos]]].append(index.keywords[pos])
+
+    return scores, matched
+
+
 def calculate_weighted_coverage_score(
     query: str,
     user_preferences: Dict[str, int],
-    model
+    model,
+    query_embedding: Optional[np.ndarray] = None
 ) -> ScoringResult:
     """
     Calcule le Coverage Score pondere selon la formule RNCP:
@@ -136,12 +289,21 @@ def calculate_weighted_coverage_score(
         query: Requete utilisateur en texte libre
         user_preferences: Preferences Likert (1-5) par dimension
         model: Modele SBERT
+        query_embedding: Embedding normalise de `query` deja calcule par
+            l'appelant (l'interface le partage avec le guardrail)
 
     Returns:
         ScoringResult avec tous les details du calcul
     """
-    # Encoder la requete utilisateur
-    query_embedding = model.encode(query, convert_to_numpy=True)
+    # Encoder la requete utilisateur (sauf si l'appelant l'a deja fait;
+    # memoise sinon)
+    if query_embedding is None:
+        with span("scoring.encode"):
+            query_embedding = encode_query(model, query)
+
+    # Scores des 7 blocs en une passe (mots-cles pre-encodes)
+    with span("scoring.blocks"):
+        all_scores, all_matched = calculate_all_block_similarities(query_embedding, model)
 
     block_scores = {}
     weighted_scores = {}
@@ -151,12 +313,9 @@ def calculate_weighted_coverage_score(
     total_weight = 0.0
 
     for block_name, block_config in TASTE_BLOCKS.items():
-        # Calculer la similarite pour ce bloc
-        score, matched = calculate_block_similarity(
-            query_embedding,
-            block_config["keywords"],
-            model
-        )
+        # Similarite pour ce bloc
+        score = all_scores[block_name]
+        matched = all_matched[block_name]
 
         # Recuperer le poids utilisateur (preference Likert)
         user_weight = user_preferences.get(block_name, 3)
@@ -192,6 +351,96 @@ def calculate_weighted_coverage_score(
     )
 
 
+def score_batch(
+    queries: List[str],
+    preferences_matrix,
+    model,
+    batch_size: int = 256
+) -> np.ndarray:
+    """
+    Calcule le Coverage Score de nombreuses requetes pour plusieurs profils.
+
+    Destine aux analyses hors-ligne (logs de requetes, tests A/B): les
+    requetes sont encodees par lots, les similarites requete x bloc sont
+    calculees en une operation matricielle et la formule ΣWi*Si / ΣWi est
+    appliquee a toutes les paires (requete, profil) d'un coup.
+
+    Args:
+        queries: Requetes en texte libre
+        preferences_matrix: Profils Likert (1-5), soit une matrice
+            [n_profils x 7] dans l'ordre de TASTE_BLOCKS, soit une liste de
+            dictionnaires {dimension: preference} (3 par defaut)
+        model: Modele SBERT
+        batch_size: Taille des lots d'encodage
+
+    Returns:
+        np.ndarray structure de n_requetes x n_profils lignes (ordre: toutes
+        les requetes du profil 0, puis du profil 1...) avec les champs:
+            - query, profile: indices dans `queries` / `preferences_matrix`
+            - coverage_score: Score global 0-100 (arrondi a 0.1)
+            - un champ par dimension: score du bloc en % (comme block_scores)
+
+    Example:
+        >>> scores = score_batch(logged_queries, [DEFAULT_USER_WEIGHTS, sweet_profile], model)
+        >>> scores[scores["profile"] == 1]["coverage_score"].mean()
+    """
+    block_names = list(TASTE_BLOCKS)
+
+    # Profils -> matrice [n_profils x n_blocs]
+    if len(preferences_matrix) and isinstance(preferences_matrix[0], dict):
+        preferences = np.array(
+            [[prefs.get(name, 3) for name in block_names] for prefs in preferences_matrix],
+            dtype=np.float64,
+        )
+    else:
+        preferences = np.asarray(preferences_matrix, dtype=np.float64).reshape(-1, len(block_names))
+
+    dtype = np.dtype(
+        [("query", np.int32), ("profile", np.int32), ("coverage_score", np.float32)]
+        + [(name, np.float32) for name in block_names]
+    )
+    if not queries or len(preferences) == 0:
+        return np.zeros(0, dtype=dtype)
+
+    # Encodage par lots (memoire bornee), embeddings normalises
+    query_embeddings = np.concatenate([
+        normalize_embeddings(np.atleast_2d(model.encode(
+            list(queries[start:start + batch_size]),
+            batch_size=batch_size,
+            convert_to_numpy=True,
+        )))
+        for start in range(0, len(queries), batch_size)
+    ])
+
+    # Scores par bloc de toutes les requetes: [n_requetes x n_blocs]
+    block_scores, _, _ = _score_blocks(query_embeddings, model)
+    block_scores = block_scores.astype(np.float64)
+
+    # Poids finaux Wi = poids du bloc * preference / 3: [n_profils x n_blocs]
+    block_weights = np.array([TASTE_BLOCKS[name]["weight"] for name in block_names])
+    weights = block_weights * (preferences / 3.0)
+    total_weights = weights.sum(axis=1)
+
+    # Coverage Score = ΣWi*Si / ΣWi pour chaque paire: [n_requetes x n_profils]
+    coverage = np.divide(
+        block_scores @ weights.T * 100,
+        total_weights,
+        out=np.zeros((len(queries), len(preferences))),
+        where=total_weights > 0,
+    )
+
+    n_queries, n_profiles = coverage.shape
+    result = np.empty(n_queries * n_profiles, dtype=dtype)
+    result["query"] = np.tile(np.arange(n_queries), n_profiles)
+    result["profile"] = np.repeat(np.arange(n_profiles), n_queries)
+    result["coverage_score"] = np.round(coverage.T.ravel(), 1)
+    rounded_blocks = np.round(block_scores * 100, 1)
+    for i, name in enumerate(block_names):
+        result[name] = np.tile(rounded_blocks[:, i], n_profiles)
+
+    return result
+
+
 def generate_profile_summary(
     block_scores: Dict[str, float],
     user_preferences: Dict[str, int]
@@ -255,6 +504,26 @@ def identify_exploration_areas(
     return recommendations[:3]  # Max 3 recommandations
 
 
+# Contexte ajoute par enrich_short_query selon les preferences
+STRONG_PREFERENCE_CONTEXT = {  # preference >= 4
+    "Douceur": "doux et sucre",
+    "Acidite": "acidule et frais",
+    "Amertume": "avec une touche amere",
+    "Force": "plutot fort en alcool",
+    "Fraicheur": "rafraichissant",
+    "Complexite": "elabore et sophistique",
+    "Exotisme": "tropical et depaysant",
+}
+WEAK_PREFERENCE_CONTEXT = {  # preference <= 2
+    "Amertume": "pas trop amer",
+    "Force": "leger en alcool",
+}
+ENRICHMENT_PHRASES = frozenset(STRONG_PREFERENCE_CONTEXT.values()) | frozenset(WEAK_PREFERENCE_CONTEXT.values())
+
+# Nombre maximum d'indications ajoutees a une requete courte
+MAX_ENRICHMENT_PARTS = 3
+
+
 def enrich_short_query(query: str, preferences: Dict[str, int]) -> str:
     """
     Enrichit une requete courte (<5 mots) avec le contexte des preferences.
@@ -280,38 +549,46 @@ def enrich_short_query(query: str, preferences: Dict[str, int]) -> str:
 
     # Ajouter les preferences fortes (>= 4)
     for dim, pref in preferences.items():
-        if pref >= 4:
-            if dim == "Douceur":
-                context_parts.append("doux et sucre")
-            elif dim == "Acidite":
-                context_parts.append("acidule et frais")
-            elif dim == "Amertume":
-                context_parts.append("avec une touche amere")
-            elif dim == "Force":
-                context_parts.append("plutot fort en alcool")
-            elif dim == "Fraicheur":
-                context_parts.append("rafraichissant")
-            elif dim == "Complexite":
-                context_parts.append("elabore et sophistique")
-            elif dim == "Exotisme":
-                context_parts.append("tropical et depaysant")
+        if pref >= 4 and dim in STRONG_PREFERENCE_CONTEXT:
+            context_parts.append(STRONG_PREFERENCE_CONTEXT[dim])
 
     # Ajouter les preferences faibles (< 2)
     for dim, pref in preferences.items():
-        if pref <= 2:
-            if dim == "Amertume":
-                context_parts.append("pas trop amer")
-            elif dim == "Force":
-                context_parts.append("leger en alcool")
+        if pref <= 2 and dim in WEAK_PREFERENCE_CONTEXT:
+            context_parts.append(WEAK_PREFERENCE_CONTEXT[dim])
 
     if context_parts:
-        enriched = f"{query}, {', '.join(context_parts[:3])}"
+        enriched = f"{query}, {', '.join(context_parts[:MAX_ENRICHMENT_PARTS])}"
         logger.info(f"Query enriched: '{query}' -> '{enriched}'")
         return enriched
 
     return query
 
 
+def split_enriched_query(enriched_query: str) -> Tuple[str, str]:
+    """
+    Inverse de enrich_short_query: separe le texte de l'utilisateur du
+    contexte des preferences ajoute.
+
+    Exemple:
+        "mojito, doux et sucre, rafraichissant"
+            → ("mojito", "doux et sucre, rafraichissant")
+
+    Returns:
+        Tuple (requete originale, contexte) - contexte "" si la requete
+        n'a pas ete enrichie
+    """
+    parts = enriched_query.split(", ")
+    n = len(parts)
+    while n > 1 and len(parts) - n < MAX_ENRICHMENT_PARTS and parts[n - 1] in ENRICHMENT_PHRASES:
+        n -= 1
+
+    query = ", ".join(parts[:n])
+    if n == len(parts) or len(query.split()) >= 5:
+        return enriched_query, ""
+    return query, ", ".join(parts[n:])
+
+
 def generate_progression_plan(
     current_cocktail: dict,
     block_scores: Dict[str, float],
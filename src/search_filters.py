@@ -0,0 +1,131 @@
+"""
+L'IA Pero - Filtres de la recherche sémantique
+================================================
+
+Index de masques booléens sur les métadonnées du catalogue de cocktails
+(voir catalog.CocktailCatalog), construits une seule fois au chargement:
+
+    source      → "generated" | "kaggle"
+    category    → Classic, Tropical, Tiki...
+    difficulty  → Facile | Moyen | Difficile
+    prep_time   → tranches "< 5 min" | "5-10 min" | "> 10 min"
+    alcohol     → avec / sans alcool
+
+Une recherche filtrée combine les masques sélectionnés par un ET logique et
+le masque obtenu est appliqué au vecteur de similarités AVANT la sélection
+du top-k (voir VectorIndex.search): les résultats filtrés remplissent donc
+toujours top_k, sans post-filtrage ligne par ligne.
+
+Les valeurs acceptées sont celles de l'interface ("Tous", "Base Kaggle",
+"Expert", "Sans Alcool"...) ou les valeurs brutes du CSV.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Valeur de filtre signifiant "pas de filtre"
+ALL = "Tous"
+
+# Libellés de l'interface → valeurs du catalogue
+SOURCE_LABELS = {"Generes par IA": "generated", "Base Kaggle": "kaggle"}
+DIFFICULTY_LABELS = {"Expert": "Difficile"}
+ALCOHOL_LABELS = {"Avec Alcool": True, "Sans Alcool": False}
+
+# Tranches de temps de préparation (minutes, bornes incluses)
+PREP_TIME_BUCKETS = {
+    "< 5 min": (0, 4),
+    "5-10 min": (5, 10),
+    "> 10 min": (11, None),
+}
+
+# Marqueurs d'un cocktail sans alcool (description Kaggle, catégorie "Soft Drink")
+NON_ALCOHOLIC_CATEGORY = "Sans alcool"
+NON_ALCOHOLIC_MARKERS = ("sans alcool", "mocktail")
+
+
+def is_alcoholic(df: pd.DataFrame) -> np.ndarray:
+    """
+    Statut alcoolisé de chaque cocktail (le CSV n'a pas de colonne dédiée).
+
+    Un cocktail est sans alcool si sa catégorie est "Sans alcool" ou si sa
+    description le mentionne ("sans alcool", "mocktail").
+    """
+    descriptions = df.get("description_semantique", pd.Series("", index=df.index))
+    pattern = "|".join(NON_ALCOHOLIC_MARKERS)
+    non_alcoholic = descriptions.fillna("").str.lower().str.contains(pattern, regex=True)
+    if "category" in df:
+        non_alcoholic |= df["category"] == NON_ALCOHOLIC_CATEGORY
+    return ~non_alcoholic.to_numpy(dtype=bool)
+
+
+class FilterMasks:
+    """
+    Masques booléens précalculés pour chaque valeur de chaque filtre.
+
+    Construits à partir des colonnes typées d'un CocktailCatalog (codes
+    catégoriels, temps de préparation, statut alcoolisé).
+
+    Usage:
+        masks = catalog.filters
+        mask = masks.build({"source": "Base Kaggle", "difficulty": "Facile"})
+        # mask: np.ndarray[bool] de len(catalog), ou None si aucun filtre actif
+    """
+
+    def __init__(self, catalog):
+        """
+        Args:
+            catalog: CocktailCatalog (attributs codes, categories,
+                prep_time, alcoholic)
+        """
+        self.n_rows = len(catalog.alcoholic)
+        self.masks: Dict[str, Dict] = {}
+
+        for column, codes in catalog.codes.items():
+            self.masks[column] = {
+                value: codes == code for code, value in enumerate(catalog.categories[column])
+            }
+
+        prep_time = catalog.prep_time
+        self.masks["prep_time"] = {
+            label: (prep_time >= low) & (prep_time <= (np.inf if high is None else high))
+            for label, (low, high) in PREP_TIME_BUCKETS.items()
+        }
+
+        alcoholic = np.asarray(catalog.alcoholic, dtype=bool)
+        self.masks["alcohol"] = {True: alcoholic, False: ~alcoholic}
+
+    def _resolve(self, name: str, value):
+        """Traduit un libellé de l'interface en valeur du catalogue."""
+        if name == "source":
+            return SOURCE_LABELS.get(value, value)
+        if name == "difficulty":
+            return DIFFICULTY_LABELS.get(value, value)
+        if name == "alcohol":
+            return ALCOHOL_LABELS.get(value, value)
+        return value
+
+    def build(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Combine les filtres actifs en un seul masque.
+
+        Args:
+            filters: {nom du filtre: valeur}; "Tous", None et les filtres
+                inconnus sont ignorés. Une valeur absente du catalogue
+                donne un masque vide (aucun résultat).
+
+        Returns:
+            np.ndarray[bool] ou None si aucun filtre n'est actif
+        """
+        mask = None
+        for name, value in (filters or {}).items():
+            if value is None or value == ALL or name not in self.masks:
+                continue
+            value_mask = self.masks[name].get(self._resolve(name, value))
+            if value_mask is None:
+                value_mask = np.zeros(self.n_rows, dtype=bool)
+            mask = value_mask.copy() if mask is None else mask & value_mask
+        return mask
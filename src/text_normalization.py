@@ -0,0 +1,120 @@
+"""
+L'IA Pero - Normalisation des noms d'ingrédients
+==================================================
+
+Fonctions partagées par l'IngredientProfiler et les scripts d'enrichissement
+(export_known_ingredients, enrich_kaggle):
+
+- `strip_accents("Crème de Cassis")` → "Creme de Cassis"
+- `normalize_name("Jus d'Orange ")` → "jus dorange"
+  (`strip_punctuation=False`: "jus d'orange", forme des clés de
+  known_ingredients.json)
+- `normalize_many(names)`: version par lot (chaque nom distinct n'est
+  normalisé qu'une fois)
+- `split_quantity("60ml Vodka")` → (60.0, "Vodka")
+
+Les expressions régulières sont compilées une seule fois au chargement du
+module, et les résultats sont mémoïsés (LRU borné): un enrichissement ne
+manipule que quelques centaines de noms distincts, répétés des milliers de
+fois.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from functools import lru_cache
+from typing import Iterable, List, Tuple
+import re
+import unicodedata
+
+# Nombre maximum de résultats mémoïsés par fonction
+NORMALIZE_CACHE_SIZE = 8192
+
+# Caractères supprimés par normalize_name (tout sauf lettres, chiffres,
+# espaces et tirets)
+_PUNCTUATION_RE = re.compile(r'[^\w\s-]')
+
+# Quantités en tête d'ingrédient: (motif, ml par unité, fraction ?)
+_QUANTITY_PATTERNS = [
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*ml', re.IGNORECASE), 1.0, False),     # 60ml
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*cl', re.IGNORECASE), 10.0, False),    # 6cl = 60ml
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*oz', re.IGNORECASE), 30.0, False),    # 2oz ≈ 60ml
+    (re.compile(r'^(\d+)/(\d+)\s*oz', re.IGNORECASE), 30.0, True),         # 1/2oz ≈ 15ml
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*cup', re.IGNORECASE), 240.0, False),  # 1 cup ≈ 240ml
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*tsp', re.IGNORECASE), 5.0, False),    # 1 tsp ≈ 5ml
+    (re.compile(r'^(\d+(?:\.\d+)?)\s*tbsp', re.IGNORECASE), 15.0, False),  # 1 tbsp ≈ 15ml
+]
+
+# Préfixes de quantité retirés du nom
+_QUANTITY_PREFIX_RE = re.compile(r'^\d+(\.\d+)?\s*(ml|oz|cl|cup|tsp|tbsp|dash|splash)?\s*', re.IGNORECASE)
+_FRACTION_PREFIX_RE = re.compile(r'^\d+/\d+\s*(ml|oz|cl|cup|tsp|tbsp)?\s*', re.IGNORECASE)
+
+# Quantité par défaut quand aucune unité n'est reconnue
+DEFAULT_QUANTITY = 1.0
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def strip_accents(text: str) -> str:
+    """Supprime les diacritiques (décomposition NFD, marques combinantes retirées)."""
+    if text.isascii():
+        return text
+    return ''.join(c for c in unicodedata.normalize('NFD', text)
+                   if unicodedata.category(c) != 'Mn')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_name(name: str, strip_punctuation: bool = True) -> str:
+    """
+    Normalise un nom d'ingrédient: sans accents, minuscules, sans espaces
+    aux extrémités, puis (par défaut) sans ponctuation.
+
+    Args:
+        name: Nom brut (FR ou EN)
+        strip_punctuation: Supprimer les caractères autres que lettres,
+            chiffres, espaces et tirets
+
+    Returns:
+        str: Nom normalisé
+    """
+    name = strip_accents(name).lower().strip()
+    if strip_punctuation:
+        name = _PUNCTUATION_RE.sub('', name)
+    return name
+
+
+def normalize_many(names: Iterable[str], strip_punctuation: bool = True) -> List[str]:
+    """
+    Normalise une liste de noms (même ordre, doublons compris).
+
+    Chaque nom distinct n'est normalisé qu'une fois.
+    """
+    names = list(names)
+    unique = {name: normalize_name(name, strip_punctuation) for name in dict.fromkeys(names)}
+    return [unique[name] for name in names]
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def split_quantity(ingredient_text: str) -> Tuple[float, str]:
+    """
+    Sépare la quantité (convertie en ml) et le nom d'un ingrédient.
+
+    Args:
+        ingredient_text: Ex: "60ml Vodka", "1/2 oz Lime juice"
+
+    Returns:
+        Tuple (quantity_ml, ingredient_name); quantité DEFAULT_QUANTITY si
+        aucune unité n'est reconnue
+    """
+    quantity = DEFAULT_QUANTITY
+    for pattern, multiplier, fraction in _QUANTITY_PATTERNS:
+        match = pattern.search(ingredient_text)
+        if match:
+            if fraction:
+                num, denom = match.groups()
+                quantity = (float(num) / float(denom)) * multiplier
+            else:
+                quantity = float(match.group(1)) * multiplier
+            break
+
+    name = _QUANTITY_PREFIX_RE.sub('', ingredient_text)
+    name = _FRACTION_PREFIX_RE.sub('', name)
+    return quantity, name.strip()
@@ -0,0 +1,250 @@
+"""
+L'IA Pero - Index vectoriels pour la recherche sémantique
+==========================================================
+
+Abstraction commune pour retrouver les k embeddings les plus proches d'une
+requête (similarité cosinus, lignes normalisées L2):
+
+    ExactIndex   → produit matrice-vecteur sur tout le corpus (référence)
+    IVFIndex     → index approximatif "inverted file" en NumPy pur:
+                   k-means sphérique, chaque requête ne parcourt que les
+                   `nprobe` listes dont le centroïde est le plus proche
+
+Un masque booléen optionnel (filtres de métadonnées, voir search_filters)
+restreint la recherche aux lignes autorisées avant la sélection du top-k.
+
+La sélection du top-k utilise `np.argpartition` (O(N)) puis ne trie que les
+k candidats retenus, au lieu d'un `np.argsort` complet (O(N log N)).
+
+`build_index()` choisit le backend selon la taille du corpus: exact pour le
+catalogue actuel (600 cocktails), IVF au-delà de IVF_MIN_ROWS lignes.
+`measure_recall()` compare un index approximatif à la recherche exacte.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingénierie de Données
+"""
+from typing import Optional, Tuple
+import logging
+
+import numpy as np
+
+# Taille de corpus à partir de laquelle build_index() passe en IVF
+IVF_MIN_ROWS = 20_000
+
+# Nombre de listes parcourues par requête (compromis rappel / latence)
+IVF_DEFAULT_NPROBE = 8
+
+# Nombre maximum de lignes utilisées pour entraîner le k-means
+IVF_TRAIN_SAMPLE = 25_000
+
+logger = logging.getLogger(__name__)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices des k meilleurs scores, triés par score décroissant.
+
+    Args:
+        scores: Vecteur de scores
+        k: Nombre de résultats (borné par len(scores))
+
+    Returns:
+        np.ndarray: Indices (int64) dans `scores`
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorIndex:
+    """
+    Interface commune des index vectoriels.
+
+    Les embeddings indexés et les requêtes doivent être normalisés (L2):
+    le score retourné est alors la similarité cosinus.
+    """
+
+    def search(
+        self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les k lignes les plus proches de `query`.
+
+        Args:
+            query: Embedding normalisé de la requête
+            k: Nombre de résultats
+            mask: Lignes autorisées (np.ndarray[bool], voir search_filters);
+                appliqué avant la sélection du top-k
+
+        Returns:
+            (indices, scores): lignes du corpus et similarités, par score
+            décroissant (moins de k seulement si le masque autorise moins
+            de k lignes)
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class ExactIndex(VectorIndex):
+    """Recherche exhaustive: un produit matrice-vecteur + top-k."""
+
+    def __init__(self, embeddings: np.ndarray):
+        """
+        Args:
+            embeddings: Matrice [N × dim] normalisée (memory-map accepté, non copiée)
+        """
+        self.embeddings = embeddings
+
+    def search(
+        self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.embeddings @ query
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            k = min(k, int(np.count_nonzero(mask)))
+        indices = top_k(scores, k)
+        return indices, scores[indices]
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+
+class IVFIndex(VectorIndex):
+    """
+    Index approximatif par partitionnement (inverted file).
+
+    Le corpus est réparti en `n_lists` listes par un k-means sphérique
+    (centroïdes normalisés, affectation par produit scalaire). Une requête
+    est comparée aux centroïdes, puis uniquement aux lignes des `nprobe`
+    listes les plus proches: environ N × nprobe / n_lists produits scalaires
+    au lieu de N.
+
+    Les lignes sont stockées par liste (`ids` trié par liste + `offsets`),
+    sans copie de la matrice d'embeddings.
+    """
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        n_lists: Optional[int] = None,
+        nprobe: int = IVF_DEFAULT_NPROBE,
+        n_iter: int = 10,
+        seed: int = 0
+    ):
+        """
+        Args:
+            embeddings: Matrice [N × dim] normalisée
+            n_lists: Nombre de listes (défaut: ~√N)
+            nprobe: Nombre de listes parcourues par requête
+            n_iter: Itérations du k-means
+            seed: Graine (construction reproductible)
+        """
+        self.embeddings = embeddings
+        n_rows = len(embeddings)
+        if n_lists is None:
+            n_lists = int(np.sqrt(n_rows))
+        self.n_lists = max(1, min(n_lists, n_rows))
+        self.nprobe = nprobe
+
+        self.centroids = self._train(n_iter, np.random.default_rng(seed))
+        assignments = self._assign(embeddings)
+
+        self.ids = np.argsort(assignments, kind="stable")
+        self.offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=self.n_lists), out=self.offsets[1:])
+
+        logger.info(f"IVF index built: {n_rows} rows, {self.n_lists} lists, nprobe={nprobe}")
+
+    def _train(self, n_iter: int, rng: np.random.Generator) -> np.ndarray:
+        """K-means sphérique sur un échantillon du corpus."""
+        n_rows = len(self.embeddings)
+        sample_size = min(n_rows, IVF_TRAIN_SAMPLE)
+        sample_rows = np.sort(rng.choice(n_rows, size=sample_size, replace=False))
+        sample = np.asarray(self.embeddings[sample_rows], dtype=np.float32)
+
+        centroids = sample[rng.choice(sample_size, size=self.n_lists, replace=False)].copy()
+        for _ in range(n_iter):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Liste vide: on garde l'ancien centroïde
+            empty = norms[:, 0] == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.maximum(norms, 1e-12))
+
+        return np.ascontiguousarray(centroids, dtype=np.float32)
+
+    def _assign(self, embeddings: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+        """Liste (centroïde le plus proche) de chaque ligne, par blocs."""
+        assignments = np.empty(len(embeddings), dtype=np.int64)
+        for start in range(0, len(embeddings), chunk_size):
+            chunk = embeddings[start:start + chunk_size]
+            assignments[start:start + chunk_size] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignments
+
+    def search(
+        self, query: np.ndarray, k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        probes = top_k(self.centroids @ query, self.nprobe)
+        candidates = np.concatenate(
+            [self.ids[self.offsets[p]:self.offsets[p + 1]] for p in probes]
+        )
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+            # Filtre très sélectif: les listes sondées ne suffisent pas,
+            # on parcourt directement les lignes autorisées
+            if len(candidates) < k:
+                candidates = np.flatnonzero(mask)
+        scores = self.embeddings[candidates] @ query
+        best = top_k(scores, k)
+        return candidates[best], scores[best]
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+
+def build_index(embeddings: np.ndarray, min_ivf_rows: int = IVF_MIN_ROWS, **ivf_kwargs) -> VectorIndex:
+    """
+    Construit l'index adapté à la taille du corpus.
+
+    Args:
+        embeddings: Matrice [N × dim] normalisée (ex: EmbeddingStore.sync())
+        min_ivf_rows: Taille à partir de laquelle l'IVF est utilisé
+        **ivf_kwargs: Paramètres de IVFIndex (n_lists, nprobe...)
+
+    Returns:
+        VectorIndex: ExactIndex pour un petit corpus, IVFIndex sinon
+    """
+    if len(embeddings) < min_ivf_rows:
+        return ExactIndex(embeddings)
+    return IVFIndex(embeddings, **ivf_kwargs)
+
+
+def measure_recall(index: VectorIndex, embeddings: np.ndarray, queries: np.ndarray, k: int = 10) -> float:
+    """
+    Rappel@k moyen d'un index par rapport à la recherche exacte.
+
+    Args:
+        index: Index à évaluer
+        embeddings: Corpus indexé (référence exacte)
+        queries: Requêtes normalisées [Q × dim]
+        k: Nombre de voisins comparés
+
+    Returns:
+        float: Proportion moyenne des k vrais voisins retrouvés (0-1)
+    """
+    exact = ExactIndex(embeddings)
+    recalls = []
+    for query in queries:
+        expected, _ = exact.search(query, k)
+        found, _ = index.search(query, k)
+        if len(expected):
+            recalls.append(len(np.intersect1d(expected, found)) / len(expected))
+    return float(np.mean(recalls)) if recalls else 1.0
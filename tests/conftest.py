@@ -1,9 +1,24 @@
 """
-Playwright fixtures configuration for L'IA Pero tests.
+Fixtures partagees des tests de L'IA Pero.
+
+- Playwright: contexte du navigateur
+- `fake_sbert` / `sbert`: modele SBERT factice (aucun telechargement)
+- `isolated_cache`: cache de recettes dans un repertoire temporaire
+- `make_service` / `StubTransport`: service de generation sur un transport local
 """
+import asyncio
+import threading
+from unittest.mock import patch
+
 import pytest
 from playwright.sync_api import Browser
 
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generation_service import GenerationService, Transport
+
 
 @pytest.fixture(scope="session")
 def browser_context_args(browser_context_args):
@@ -13,3 +28,118 @@ def browser_context_args(browser_context_args):
         "viewport": {"width": 1280, "height": 720},
         "locale": "fr-FR",
     }
+
+
+class FakeSbertModel:
+    """
+    Encodeur deterministe qui imite `SentenceTransformer.encode` hors-ligne.
+
+    Chaque mot est projete sur un vecteur pseudo-aleatoire (graine = hash du mot),
+    le texte est la somme de ses mots: deux textes partageant des mots sont proches.
+    Compte les textes encodes pour verifier le nombre de passages "transformer".
+    """
+
+    dimension = 384
+
+    def __init__(self):
+        self.encoded_texts = []
+
+    def _word_vector(self, word: str):
+        import hashlib
+        import numpy as np
+        seed = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).standard_normal(self.dimension).astype(np.float32)
+
+    def encode(self, sentences, convert_to_numpy=True, **kwargs):
+        import numpy as np
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self.encoded_texts.extend(texts)
+        vectors = np.stack([
+            sum((self._word_vector(w) for w in text.lower().split()), np.zeros(self.dimension, dtype=np.float32))
+            for text in texts
+        ]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+        return vectors[0] if single else vectors
+
+
+@pytest.fixture
+def fake_sbert():
+    """Modele SBERT factice (aucun telechargement requis)."""
+    return FakeSbertModel()
+
+
+@pytest.fixture
+def sbert(fake_sbert):
+    """Remplace le modele SBERT du backend par le modele factice."""
+    from src import backend
+
+    backend._get_keyword_embeddings.cache_clear()
+    with patch.object(backend, "get_sbert_model", return_value=fake_sbert):
+        yield fake_sbert
+    backend._get_keyword_embeddings.cache_clear()
+
+
+@pytest.fixture
+def isolated_cache(tmp_path):
+    """Cache de recettes dans un repertoire temporaire."""
+    from src import backend
+
+    backend.get_recipe_cache.cache_clear()
+    backend.get_semantic_index.cache_clear()
+    with patch.object(backend, "CACHE_DB_FILE", tmp_path / "recipe_cache.db"), \
+            patch.object(backend, "CACHE_FILE", tmp_path / "recipe_cache.json"):
+        yield tmp_path
+    backend.get_recipe_cache.cache_clear()
+    backend.get_semantic_index.cache_clear()
+
+
+class FakeClock:
+    """Horloge manuelle."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubTransport(Transport):
+    """Transport factice: reponses scriptees par modele, appels comptes."""
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    async def generate(self, model_name, prompt):
+        self.calls.append(model_name)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            while not self.release.is_set():
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(self.delay)
+            response = self.responses.get(model_name, f"reponse de {model_name}")
+            if isinstance(response, Exception):
+                raise response
+            return response
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def make_service():
+    services = []
+
+    def factory(transport, models=("model-a", "model-b"), **kwargs):
+        service = GenerationService(transport, models, **kwargs)
+        services.append(service)
+        return service
+
+    yield factory
+    for service in services:
+        service.close()
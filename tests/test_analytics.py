@@ -0,0 +1,178 @@
+"""
+Tests pour le journal d'analytics (JSON Lines en ajout seul)
+=============================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import json
+import threading
+import time
+from datetime import datetime
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.analytics import AnalyticsLog
+
+
+def entry(query="mojito", status="ok", cached=False, duration_ms=100.0):
+    return {"timestamp": "2026-01-16T14:23:45", "query": query, "cocktail_name": "X",
+            "duration_ms": duration_ms, "cached": cached, "status": status}
+
+
+class FakeClock:
+    def __init__(self, day="2026-01-16"):
+        self.now = datetime.fromisoformat(day)
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def make_log(tmp_path):
+    def make(**kwargs):
+        kwargs.setdefault("flush_interval", None)
+        kwargs.setdefault("legacy_file", None)
+        return AnalyticsLog(directory=tmp_path / "analytics", **kwargs)
+    return make
+
+
+class TestAnalyticsLog:
+    """Tests de l'ecriture et de la lecture du journal."""
+
+    def test_record_is_buffered_until_flush(self, make_log):
+        log = make_log()
+        log.record(entry())
+        assert log.segments() == []
+
+        assert log.flush() == 1
+        assert list(log.iter_entries()) == [entry()]
+
+    def test_append_only(self, make_log):
+        log = make_log()
+        log.record(entry("a"))
+        log.flush()
+        first = log.segments()[0].read_text(encoding="utf-8")
+        log.record(entry("b"))
+        log.flush()
+
+        assert log.segments()[0].read_text(encoding="utf-8").startswith(first)
+        assert [e["query"] for e in log.iter_entries()] == ["a", "b"]
+
+    def test_concurrent_sessions_lose_nothing(self, make_log):
+        log = make_log(flush_interval=0.001)
+        threads = [
+            threading.Thread(target=lambda i=i: [log.record(entry(f"q{i}")) for _ in range(200)])
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        log.close()
+
+        assert sum(1 for _ in log.iter_entries()) == 1600
+        assert log.summary()["requests"] == 1600
+
+    def test_rotation_by_date(self, make_log):
+        clock = FakeClock("2026-01-16")
+        log = make_log(clock=clock)
+        log.record(entry())
+        log.flush()
+        clock.now = datetime.fromisoformat("2026-01-17")
+        log.record(entry())
+        log.flush()
+
+        assert [p.name for p in log.segments()] == ["analytics-20260116.jsonl", "analytics-20260117.jsonl"]
+
+    def test_rotation_by_size_and_retention(self, make_log):
+        log = make_log(max_bytes=300, max_files=3, clock=FakeClock())
+        for i in range(20):
+            log.record(entry(f"requete {i}"))
+            log.flush()
+
+        names = [p.name for p in log.segments()]
+        assert len(names) == 3
+        assert names[-1].startswith("analytics-20260116.")
+        assert all(p.stat().st_size <= 300 for p in log.segments())
+
+    def test_corrupt_line_skipped(self, make_log):
+        log = make_log()
+        log.record(entry("a"))
+        log.flush()
+        with open(log.segments()[0], "a", encoding="utf-8") as f:
+            f.write('{"query": "tronq')
+        assert [e["query"] for e in log.iter_entries()] == ["a"]
+
+
+class TestAnalyticsAggregates:
+    """Tests des agregats incrementaux."""
+
+    def test_summary(self, make_log):
+        log = make_log()
+        log.record(entry(cached=True, duration_ms=10))
+        log.record(entry(duration_ms=30))
+        log.record(entry("velo", status="error", duration_ms=20))
+
+        summary = log.summary()
+        assert summary["requests"] == 3
+        assert summary["ok"] == 2 and summary["errors"] == 1
+        assert summary["cache_hit_rate"] == pytest.approx(0.333)
+        assert summary["avg_duration_ms"] == 20.0
+
+    def test_top_queries(self, make_log):
+        log = make_log()
+        for query in ["Negroni", "mojito", "negroni ", "spritz", "negroni"]:
+            log.record(entry(query))
+        assert log.top_queries(2) == [("Negroni", 3), ("mojito", 1)]
+
+    def test_aggregates_persisted_without_rereading_segments(self, make_log):
+        log = make_log()
+        for query in ["negroni", "negroni", "mojito"]:
+            log.record(entry(query))
+        log.flush()
+
+        reopened = make_log()
+        reopened.iter_entries = lambda: pytest.fail("raw history read")
+        assert reopened.summary()["requests"] == 3
+        assert reopened.top_queries(1) == [("negroni", 2)]
+
+    def test_aggregates_rebuilt_when_missing(self, make_log):
+        log = make_log()
+        log.record(entry())
+        log.flush()
+        (log.directory / "aggregates.json").unlink()
+
+        assert make_log().summary()["requests"] == 1
+
+    def test_legacy_json_imported(self, make_log, tmp_path):
+        legacy = tmp_path / "analytics.json"
+        legacy.write_text(json.dumps([entry("ancien"), entry("ancien")]), encoding="utf-8")
+
+        log = make_log(legacy_file=legacy)
+        assert log.top_queries(1) == [("ancien", 2)]
+        assert not legacy.exists()
+        assert (tmp_path / "analytics.json.migrated").exists()
+        assert len(list(log.iter_entries())) == 2
+
+
+class TestBackgroundFlush:
+    """Tests du thread d'ecriture."""
+
+    def test_flushed_in_background(self, make_log):
+        log = make_log(flush_interval=0.01)
+        log.record(entry())
+        deadline = time.time() + 5
+        while not log.segments() and time.time() < deadline:
+            time.sleep(0.01)
+        log.close()
+
+        assert len(list(log.iter_entries())) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,254 @@
+"""
+Tests pour le backend (Guardrail & Cache de recettes)
+======================================================
+
+Les tests utilisent un modele SBERT factice (fixture `fake_sbert`) pour
+fonctionner hors-ligne, sans telecharger all-MiniLM-L6-v2.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend
+
+
+class TestGuardrailKeywordCache:
+    """Tests du cache d'embeddings des mots-cles du guardrail."""
+
+    def test_keywords_encoded_once(self, sbert):
+        """Les mots-cles ne passent dans le modele qu'au premier appel."""
+        backend.check_relevance("un mojito frais")
+        backend.check_relevance("un negroni bien amer")
+
+        keyword_passes = [t for t in sbert.encoded_texts if t in backend.COCKTAIL_KEYWORDS]
+        assert len(keyword_passes) == len(backend.COCKTAIL_KEYWORDS)
+        assert sbert.encoded_texts.count("un negroni bien amer") == 1
+
+    def test_keyword_matrix_layout(self, sbert):
+        """Matrice normalisee, float32, contigue et en lecture seule."""
+        matrix = backend._get_keyword_embeddings(backend.MODEL_NAME, tuple(backend.COCKTAIL_KEYWORDS))
+
+        assert matrix.dtype == np.float32
+        assert matrix.flags["C_CONTIGUOUS"]
+        assert not matrix.flags["WRITEABLE"]
+        assert matrix.shape == (len(backend.COCKTAIL_KEYWORDS), sbert.dimension)
+        np.testing.assert_allclose(np.linalg.norm(matrix, axis=1), 1.0, rtol=1e-5)
+
+    def test_cache_invalidated_when_keywords_change(self, sbert):
+        """Modifier COCKTAIL_KEYWORDS recalcule les embeddings."""
+        backend.check_relevance("mojito")
+        with patch.object(backend, "COCKTAIL_KEYWORDS", ["pizza"]):
+            result = backend.check_relevance("pizza")
+        assert result["status"] == "ok"
+        assert "pizza" in sbert.encoded_texts
+
+    def test_relevance_decision(self, sbert):
+        """Une requete cocktail passe, une requete hors-sujet est rejetee."""
+        assert backend.check_relevance("mojito")["status"] == "ok"
+        assert backend.check_relevance("reparer mon velo")["status"] == "error"
+
+
+class TestGenerateRecipeCache:
+    """Tests du pipeline generate_recipe avec le cache persistant."""
+
+    def test_second_request_served_from_cache(self, sbert, isolated_cache):
+        """La meme requete ne declenche qu'une generation."""
+        with patch.object(backend, "_call_gemini_api", return_value=None) as gemini:
+            first = backend.generate_recipe("un mojito frais")
+            second = backend.generate_recipe("Un Mojito Frais ")
+
+        assert first["cached"] is False
+        assert second["cached"] is True
+        assert second["recipe"] == first["recipe"]
+        assert gemini.call_count == 1
+
+    def test_legacy_json_cache_migrated(self, sbert, isolated_cache):
+        """Les recettes de l'ancien recipe_cache.json restent servies."""
+        import json
+        recipe = {"name": "Ancien Mojito", "ingredients": [], "instructions": "", "taste_profile": {}}
+        key = backend._get_cache_key("un mojito frais")
+        (isolated_cache / "recipe_cache.json").write_text(json.dumps({key: recipe}), encoding="utf-8")
+
+        result = backend.generate_recipe("un mojito frais")
+
+        assert result["cached"] is True
+        assert result["recipe"] == recipe
+
+
+def gemini_recipe(query):
+    """Recette "generee" factice (meme forme que _finalize_recipe)."""
+    return {"name": f"Creation {query}", "ingredients": ["50ml Rhum"], "instructions": "",
+            "taste_profile": {}, "query": query}
+
+
+class TestSemanticCache:
+    """Tests du cache semantique (requetes quasi identiques)."""
+
+    def test_near_duplicate_served_from_cache(self, sbert, isolated_cache):
+        """Une reformulation proche reutilise la recette sans appel Gemini."""
+        with patch.object(backend, "SEMANTIC_CACHE_THRESHOLD", 0.8), \
+                patch.object(backend, "_call_gemini_api", side_effect=gemini_recipe) as gemini:
+            first = backend.generate_recipe("un mojito frais")
+            second = backend.generate_recipe("un mojito bien frais")
+
+        assert gemini.call_count == 1
+        assert second["cached"] is True
+        assert second["recipe"] == first["recipe"]
+        assert 0.8 <= second["semantic_similarity"] < 1.0
+        assert backend.get_cache_stats()["semantic_hits"] == 1
+
+    def test_other_budget_not_matched(self, sbert, isolated_cache):
+        """Une requete proche mais d'un autre budget ne reutilise pas la recette."""
+        with patch.object(backend, "SEMANTIC_CACHE_THRESHOLD", 0.5), \
+                patch.object(backend, "_call_gemini_api", side_effect=gemini_recipe) as gemini:
+            backend.generate_recipe("un mojito frais (budget: Luxe (> 25€))")
+            result = backend.generate_recipe("un mojito frais (budget: Economique (< 8€))")
+            near = backend.generate_recipe("un mojito bien frais (budget: Luxe (> 25€))")
+
+        assert gemini.call_count == 2
+        assert result["cached"] is False
+        assert near["cached"] is True
+
+    def test_free_text_compared_within_preferences(self, sbert, isolated_cache):
+        """Deux boissons differentes avec les memes preferences ne se confondent pas."""
+        from src.queries import build_final_query
+        from src.scoring import enrich_short_query
+
+        preferences = {"Douceur": 5, "Acidite": 3, "Fraicheur": 3}
+
+        def final(query, prefs=preferences):
+            return build_final_query(enrich_short_query(query, prefs))
+
+        with patch.object(backend, "SEMANTIC_CACHE_THRESHOLD", 0.8), \
+                patch.object(backend, "_call_gemini_api", side_effect=gemini_recipe) as gemini:
+            backend.generate_recipe(final("un mojito frais"))
+            daiquiri = backend.generate_recipe(final("un daiquiri frais"))
+            near = backend.generate_recipe(final("un mojito bien frais"))
+            other_prefs = backend.generate_recipe(final("un mojito bien frais", {"Fraicheur": 5}))
+
+        assert daiquiri["cached"] is False
+        assert near["cached"] is True
+        assert other_prefs["cached"] is False
+        assert gemini.call_count == 3
+
+    def test_fallback_not_indexed(self, sbert, isolated_cache):
+        """La recette generique de secours n'est servie que pour sa requete exacte."""
+        with patch.object(backend, "SEMANTIC_CACHE_THRESHOLD", 0.8), \
+                patch.object(backend, "_call_gemini_api", return_value=None) as gemini:
+            backend.generate_recipe("un mojito frais")
+            exact = backend.generate_recipe("un mojito frais")
+            near = backend.generate_recipe("un mojito bien frais")
+
+        assert exact["cached"] is True
+        assert near["cached"] is False
+        assert gemini.call_count == 2
+        assert len(backend.get_semantic_index()) == 0
+
+    def test_hit_counted_only_when_recipe_found(self, sbert, isolated_cache):
+        """Une entree d'index dont la recette a disparu est un miss, et est retiree."""
+        query = "un mojito frais"
+        index = backend.get_semantic_index()
+        index.add("disparue", backend.encode_query(query))
+
+        assert backend._lookup_recipe_cache(query) is None
+        assert "disparue" not in index
+        assert (index.stats()["hits"], index.stats()["misses"]) == (0, 1)
+
+    def test_migrated_recipes_indexed(self, sbert, isolated_cache):
+        """Les recettes importees de recipe_cache.json sont retrouvees par similarite."""
+        import json
+        query = "un mojito frais"
+        recipe = {"name": "Ancien Mojito", "ingredients": [], "instructions": "", "taste_profile": {},
+                  "query": query}
+        fallback = backend._generate_fallback_recipe("un negroni amer")
+        (isolated_cache / "recipe_cache.json").write_text(json.dumps({
+            backend._get_cache_key(query): recipe,
+            backend._get_cache_key("un negroni amer"): fallback,
+        }), encoding="utf-8")
+
+        with patch.object(backend, "SEMANTIC_CACHE_THRESHOLD", 0.8), \
+                patch.object(backend, "_call_gemini_api", return_value=None) as gemini:
+            result = backend.generate_recipe("un mojito bien frais")
+
+        assert gemini.call_count == 0
+        assert result["recipe"] == recipe
+        assert len(backend.get_semantic_index()) == 1
+
+    def test_distinct_query_not_matched(self, sbert, isolated_cache):
+        """Une requete differente declenche une nouvelle generation."""
+        with patch.object(backend, "_call_gemini_api", return_value=None) as gemini:
+            backend.generate_recipe("un mojito frais")
+            result = backend.generate_recipe("un negroni amer")
+
+        assert gemini.call_count == 2
+        assert result["cached"] is False
+
+    def test_query_encoded_once(self, sbert, isolated_cache):
+        """Guardrail et cache semantique partagent le meme embedding."""
+        with patch.object(backend, "_call_gemini_api", return_value=None):
+            backend.generate_recipe("un daiquiri glace")
+
+        assert sbert.encoded_texts.count("un daiquiri glace") == 1
+
+
+class TestSharedQueryEmbedding:
+    """Tests de l'encodage unique des requetes (guardrail, scoring, recherche)."""
+
+    def test_guardrail_and_scoring_share_embedding(self, sbert, isolated_cache):
+        """Parcours de app.main: chaque texte de la requete n'est encode qu'une fois."""
+        from src.queries import build_final_query
+        from src.scoring import calculate_weighted_coverage_score, enrich_short_query
+
+        preferences = {"Douceur": 5, "Acidite": 3, "Fraicheur": 3}
+        enriched_query = enrich_short_query("un spritz leger", preferences)
+        final_query = build_final_query(enriched_query, "Premium (15-25€)", {"alcohol": "Sans Alcool"})
+        assert final_query != enriched_query
+
+        query_embedding = backend.encode_query(enriched_query)
+        with patch.object(backend, "_call_gemini_api", return_value=None), \
+                patch.object(backend, "_stream_gemini_api", return_value=iter([{"type": "recipe", "recipe": None}])):
+            events = list(backend.generate_recipe_stream(final_query, query_embedding=query_embedding))
+        calculate_weighted_coverage_score(enriched_query, preferences, sbert, query_embedding=query_embedding)
+
+        assert events[-1]["result"]["status"] == "ok"
+        # Requete enrichie: guardrail + scoring; texte libre: cache semantique
+        counts = {text: sbert.encoded_texts.count(text) for text in (enriched_query, final_query, "un spritz leger")}
+        assert counts == {enriched_query: 1, final_query: 0, "un spritz leger": 1}
+
+    def test_guardrail_encodes_request_text(self, sbert, isolated_cache):
+        """Sans embedding fourni, guardrail et scoring encodent le meme texte (memoise)."""
+        from src.queries import build_final_query
+        from src.scoring import calculate_weighted_coverage_score, enrich_short_query
+
+        preferences = {"Douceur": 5, "Acidite": 3, "Fraicheur": 3}
+        enriched_query = enrich_short_query("un spritz leger", preferences)
+        final_query = build_final_query(enriched_query)
+        with patch.object(backend, "_call_gemini_api", return_value=None):
+            backend.generate_recipe(final_query)
+        calculate_weighted_coverage_score(enriched_query, preferences, sbert)
+
+        assert sbert.encoded_texts.count(enriched_query) == 1
+        assert final_query not in sbert.encoded_texts
+
+    def test_memo_is_bounded(self, fake_sbert):
+        """Le LRU garde au plus QUERY_CACHE_SIZE requetes par modele."""
+        from src import embeddings
+
+        with patch.object(embeddings, "QUERY_CACHE_SIZE", 2):
+            for text in ["gin", "rhum", "vodka", "gin"]:
+                embeddings.encode_query(fake_sbert, text)
+
+        assert fake_sbert.encoded_texts == ["gin", "rhum", "vodka", "gin"]
+        assert not embeddings.encode_query(fake_sbert, "gin").flags["WRITEABLE"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
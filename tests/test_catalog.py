@@ -0,0 +1,86 @@
+"""
+Tests pour le catalogue de cocktails en colonnes
+=================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.catalog import CocktailCatalog, TASTE_DIMENSIONS
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+
+@pytest.fixture
+def frame():
+    """Deux cocktails au format des CSV (colonnes JSON comprises)."""
+    return pd.DataFrame({
+        "name": ["Mojito", "Negroni"],
+        "description_semantique": ["Frais et mentholé", "Amer et puissant"],
+        "ingredients": ['["50ml Rhum blanc", "Menthe"]', '["30ml Gin", "30ml Campari"]'],
+        "instructions": ["Piler", "Remuer"],
+        "category": ["Classic", "Aperitif"],
+        "difficulty": ["Facile", "Moyen"],
+        "prep_time": [4, 3],
+        "taste_profile": [
+            '{"Douceur": 3.0, "Acidite": 2.5, "Amertume": 1.0, "Force": 3.5, "Fraicheur": 4.8}',
+            '{"Douceur": 1.5, "Amertume": 4.7}',
+        ],
+        "source": ["kaggle", "generated"],
+    })
+
+
+class TestCocktailCatalog:
+    """Tests du chargement en colonnes typees."""
+
+    def test_columns_decoded(self, frame):
+        catalog = CocktailCatalog.from_dataframe(frame)
+
+        assert len(catalog) == 2
+        assert catalog.ingredients[0] == ("50ml Rhum blanc", "Menthe")
+        assert catalog.taste.shape == (2, len(TASTE_DIMENSIONS))
+        assert catalog.taste.dtype == np.float32
+        assert catalog.taste[0, TASTE_DIMENSIONS.index("Fraicheur")] == pytest.approx(4.8)
+        assert np.isnan(catalog.taste[1, TASTE_DIMENSIONS.index("Acidite")])
+
+    def test_categorical_codes(self, frame):
+        catalog = CocktailCatalog.from_dataframe(frame)
+
+        assert catalog.codes["category"].dtype == np.int32
+        assert list(catalog.column("category")) == ["Classic", "Aperitif"]
+        assert list(catalog.column("source")) == ["kaggle", "generated"]
+
+    def test_results_built_from_rows(self, frame):
+        catalog = CocktailCatalog.from_dataframe(frame)
+        results = catalog.results(np.array([1]), np.array([0.876]))
+
+        assert results == [{
+            "name": "Negroni",
+            "description": "Amer et puissant",
+            "ingredients": "30ml Gin, 30ml Campari",
+            "similarity": 87.6,
+            "source": "generated",
+        }]
+
+    @pytest.mark.skipif(not (DATA_DIR / "cocktails.csv").exists(), reason="CSV absent")
+    def test_real_csv(self):
+        """Le CSV genere se charge sans perte (600 lignes, profils complets)."""
+        df = pd.read_csv(DATA_DIR / "cocktails.csv")
+        df["source"] = "generated"
+        catalog = CocktailCatalog.from_dataframe(df)
+
+        assert len(catalog) == len(df)
+        assert not np.isnan(catalog.taste).any()
+        assert all(len(ingredients) > 0 for ingredients in catalog.ingredients)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
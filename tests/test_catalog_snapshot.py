@@ -0,0 +1,101 @@
+"""
+Tests pour le snapshot binaire du catalogue
+============================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.catalog import CocktailCatalog, read_catalog_sources
+from src.catalog_snapshot import StringColumn, build_snapshot, load_snapshot
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """Deux CSV sources au format du projet."""
+    generated = pd.DataFrame({
+        "name": ["Mojito Glacé", "Negroni"],
+        "description_semantique": ["Frais et mentholé", "Amer et puissant"],
+        "ingredients": ['["50ml Rhum blanc", "Menthe"]', '["30ml Gin", "30ml Campari"]'],
+        "instructions": ["Piler", "Remuer"],
+        "category": ["Classic", "Aperitif"],
+        "difficulty": ["Facile", "Moyen"],
+        "prep_time": [4, 3],
+        "taste_profile": ['{"Douceur": 3.0, "Fraicheur": 4.8}', '{"Amertume": 4.7}'],
+    })
+    kaggle = generated.iloc[:1].assign(name="Virgin Mojito", ingredients="[]")
+    generated.to_csv(tmp_path / "cocktails.csv", index=False)
+    kaggle.to_csv(tmp_path / "kaggle.csv", index=False)
+    return (("generated", tmp_path / "cocktails.csv"), ("kaggle", tmp_path / "kaggle.csv"))
+
+
+class TestStringColumn:
+    """Tests des colonnes de chaines (buffer UTF-8 + offsets)."""
+
+    def test_roundtrip(self):
+        column = StringColumn.from_strings(["Mojito", "", "Piña Colada"])
+
+        assert len(column) == 3
+        assert column[2] == "Piña Colada"
+        assert column[-2] == ""
+        assert list(column[np.array([2, 0])]) == ["Piña Colada", "Mojito"]
+        assert column.tolist() == ["Mojito", "", "Piña Colada"]
+
+
+class TestCatalogSnapshot:
+    """Tests de la construction et du chargement du snapshot."""
+
+    def test_snapshot_matches_csv_catalog(self, sources, tmp_path):
+        """Le snapshot redonne exactement le catalogue construit depuis les CSV."""
+        expected = CocktailCatalog.from_dataframe(read_catalog_sources(sources))
+        build_snapshot(expected, sources, tmp_path / "snapshot")
+
+        catalog = load_snapshot(sources, tmp_path / "snapshot")
+
+        assert catalog is not None
+        assert isinstance(catalog.taste, np.memmap)
+        assert catalog.names.tolist() == expected.names.tolist()
+        assert catalog.ingredients[0] == ("50ml Rhum blanc", "Menthe")
+        assert catalog.ingredients[2] == ()
+        np.testing.assert_array_equal(catalog.taste, expected.taste)
+        np.testing.assert_array_equal(catalog.column("source"), expected.column("source"))
+        indices, scores = np.array([1, 0]), np.array([0.9, 0.5])
+        assert catalog.results(indices, scores) == expected.results(indices, scores)
+        assert list(catalog.filters.build({"source": "Base Kaggle"})) == [False, False, True]
+
+    def test_stale_when_csv_changes(self, sources, tmp_path):
+        """Un CSV modifie rend le snapshot perime (retour aux CSV)."""
+        catalog = CocktailCatalog.from_dataframe(read_catalog_sources(sources))
+        build_snapshot(catalog, sources, tmp_path / "snapshot")
+
+        with open(sources[0][1], "a", encoding="utf-8") as f:
+            f.write('Spritz,Leger,"[]",Verser,Aperitif,Facile,2,"{}"\n')
+
+        assert load_snapshot(sources, tmp_path / "snapshot") is None
+
+    def test_missing_snapshot(self, sources, tmp_path):
+        assert load_snapshot(sources, tmp_path / "absent") is None
+
+    def test_rebuild_replaces_previous_data(self, sources, tmp_path):
+        """Reconstruire apres modification ne laisse qu'un repertoire de donnees."""
+        directory = tmp_path / "snapshot"
+        build_snapshot(CocktailCatalog.from_dataframe(read_catalog_sources(sources)), sources, directory)
+        with open(sources[1][1], "a", encoding="utf-8") as f:
+            f.write('Spritz,Leger,"[]",Verser,Aperitif,Facile,2,"{}"\n')
+        build_snapshot(CocktailCatalog.from_dataframe(read_catalog_sources(sources)), sources, directory)
+
+        catalog = load_snapshot(sources, directory)
+        assert len(catalog) == 4
+        assert len(list(directory.glob("catalog-*"))) == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,72 @@
+"""
+Tests pour le stockage persistant des embeddings
+=================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embedding_store import EmbeddingStore
+
+
+class TestEmbeddingStore:
+    """Tests du stockage memory-map indexe par hash de contenu."""
+
+    @pytest.fixture
+    def encode(self, fake_sbert):
+        return lambda texts: fake_sbert.encode(texts, convert_to_numpy=True)
+
+    def test_first_sync_encodes_everything(self, tmp_path, fake_sbert, encode):
+        """Premier demarrage: tout le corpus est encode et persiste."""
+        store = EmbeddingStore("corpus", model_name="fake", directory=tmp_path)
+        embeddings = store.sync(["mojito frais", "negroni amer"], encode)
+
+        assert embeddings.shape == (2, fake_sbert.dimension)
+        assert isinstance(embeddings, np.memmap)
+        np.testing.assert_allclose(np.linalg.norm(embeddings, axis=1), 1.0, rtol=1e-5)
+        assert store.manifest_path.exists()
+
+    def test_unchanged_corpus_not_reencoded(self, tmp_path, fake_sbert, encode):
+        """Redemarrage sans changement: aucun encodage, chargement memory-map."""
+        texts = ["mojito frais", "negroni amer"]
+        first = np.array(EmbeddingStore("corpus", "fake", tmp_path).sync(texts, encode))
+        fake_sbert.encoded_texts.clear()
+
+        second = EmbeddingStore("corpus", "fake", tmp_path).sync(texts, encode)
+
+        assert fake_sbert.encoded_texts == []
+        np.testing.assert_array_equal(first, second)
+
+    def test_only_changed_rows_reencoded(self, tmp_path, fake_sbert, encode):
+        """Seules les lignes modifiees ou ajoutees passent dans le modele."""
+        store = EmbeddingStore("corpus", "fake", tmp_path)
+        store.sync(["mojito frais", "negroni amer", "spritz leger"], encode)
+        fake_sbert.encoded_texts.clear()
+
+        embeddings = store.sync(["negroni amer", "mojito glace", "spritz leger", "daiquiri"], encode)
+
+        assert fake_sbert.encoded_texts == ["mojito glace", "daiquiri"]
+        expected = EmbeddingStore("fresh", "fake", tmp_path).sync(
+            ["negroni amer", "mojito glace", "spritz leger", "daiquiri"], encode)
+        np.testing.assert_allclose(embeddings, expected, rtol=1e-6)
+        assert len(list(tmp_path.glob("corpus-*.npy"))) == 1
+
+    def test_model_change_invalidates_store(self, tmp_path, fake_sbert, encode):
+        """Un autre modele ne reutilise pas les embeddings existants."""
+        EmbeddingStore("corpus", "fake", tmp_path).sync(["mojito frais"], encode)
+        fake_sbert.encoded_texts.clear()
+
+        EmbeddingStore("corpus", "other-model", tmp_path).sync(["mojito frais"], encode)
+
+        assert fake_sbert.encoded_texts == ["mojito frais"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
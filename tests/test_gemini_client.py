@@ -0,0 +1,130 @@
+"""
+Tests pour le pool de clients Gemini
+=====================================
+
+Les modeles sont des objets factices: aucun appel reseau.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import gemini_client
+from src.gemini_client import GeminiClientPool, get_client_pool, set_client_pool
+from src.generation_service import GeminiTransport
+
+
+class FakeModel:
+    """Modele factice: reponse fixe, appels comptes."""
+
+    def __init__(self, name, text="ok"):
+        self.name = name
+        self.text = text
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=self.text)
+
+
+class CountingFactory:
+    """Fabrique de modeles comptant les constructions."""
+
+    def __init__(self, text="ok"):
+        self.text = text
+        self.built = []
+
+    def __call__(self, name):
+        self.built.append(name)
+        return FakeModel(name, self.text)
+
+
+class TestGeminiClientPool:
+    """Tests de la reutilisation des modeles."""
+
+    def test_model_built_once(self):
+        factory = CountingFactory()
+        pool = GeminiClientPool(model_factory=factory)
+
+        for _ in range(3):
+            pool.generate("gemini-2.5-flash-lite", "prompt")
+        pool.generate("gemini-2.5-flash", "prompt")
+
+        assert factory.built == ["gemini-2.5-flash-lite", "gemini-2.5-flash"]
+        assert len(pool.get_model("gemini-2.5-flash-lite").prompts) == 3
+
+    def test_thread_safe_construction(self):
+        """Des threads concurrents partagent une seule instance par modele."""
+        factory = CountingFactory()
+        pool = GeminiClientPool(model_factory=factory)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            models = list(executor.map(lambda _: pool.get_model("gemini-2.5-flash"), range(32)))
+
+        assert factory.built == ["gemini-2.5-flash"]
+        assert all(model is models[0] for model in models)
+
+    def test_unavailable_without_key(self):
+        assert not GeminiClientPool(api_key="").available
+
+    def test_global_pool_swappable(self):
+        fake = GeminiClientPool(model_factory=CountingFactory())
+        previous = gemini_client._pool
+        try:
+            set_client_pool(fake)
+            assert get_client_pool() is fake
+        finally:
+            set_client_pool(previous)
+
+    def test_transport_reuses_pool_models(self):
+        """Le transport du GenerationService passe par le pool."""
+        factory = CountingFactory("reponse")
+        transport = GeminiTransport(GeminiClientPool(model_factory=factory))
+
+        async def run():
+            return [await transport.generate("gemini-2.5-flash", "prompt") for _ in range(2)]
+
+        assert asyncio.run(run()) == ["reponse", "reponse"]
+        assert factory.built == ["gemini-2.5-flash"]
+
+
+class TestProfilerUsesPool:
+    """Tests de l'IngredientProfiler branche sur le pool partage."""
+
+    def test_infer_with_gemini(self, tmp_path):
+        from src import ingredient_profiler
+
+        profile = {"sweetness": 2.0, "acidity": 4.5, "bitterness": 2.0,
+                   "strength": 1.5, "freshness": 4.0, "category": "mixer"}
+        factory = CountingFactory("```json\n" + json.dumps(profile) + "\n```")
+        previous = gemini_client._pool
+        try:
+            set_client_pool(GeminiClientPool(model_factory=factory))
+            with patch.object(ingredient_profiler, "SBERT_AVAILABLE", False):
+                profiler = ingredient_profiler.IngredientProfiler(
+                    known_ingredients_path=tmp_path / "known.json",
+                    cache_path=tmp_path / "profiles.json",
+                )
+            first = profiler._infer_with_gemini("Yuzu")
+            second = profiler._infer_with_gemini("Kumquat")
+        finally:
+            set_client_pool(previous)
+
+        assert first["acidity"] == 4.5
+        assert first["source"] == "gemini"
+        assert second["model"] == "gemini-2.5-flash-lite"
+        assert factory.built == ["gemini-2.5-flash-lite"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,187 @@
+"""
+Tests pour le service de generation asynchrone
+===============================================
+
+Un transport local (stub) remplace google.generativeai.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend
+from src.gemini_client import GeminiClientPool
+from tests.conftest import StubTransport
+
+
+class TestGenerationService:
+    """Tests du coalescing, de la concurrence et du failover."""
+
+    def test_identical_inflight_requests_coalesced(self, make_service):
+        """Deux requetes identiques simultanees: une seule generation."""
+        transport = StubTransport()
+        transport.release.clear()
+        service = make_service(transport)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(service.generate_sync, "cle", "prompt") for _ in range(2)]
+            while service.stats()["requests"] < 2:
+                time.sleep(0.01)
+            transport.release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        assert transport.calls == ["model-a"]
+        assert results[0] == results[1] == ("model-a", "reponse de model-a")
+        assert service.stats()["coalesced"] == 1
+
+    def test_distinct_keys_not_coalesced(self, make_service):
+        transport = StubTransport()
+        service = make_service(transport)
+
+        service.generate_sync("cle-1", "prompt")
+        service.generate_sync("cle-2", "prompt")
+
+        assert len(transport.calls) == 2
+
+    def test_concurrency_bounded_per_model(self, make_service):
+        """Le semaphore limite les appels simultanes a un meme modele."""
+        transport = StubTransport(delay=0.05)
+        service = make_service(transport, models=("model-a",), max_concurrency=2)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda i: service.generate_sync(f"cle-{i}", "prompt"), range(6)))
+
+        assert transport.max_active == 2
+        assert len(transport.calls) == 6
+
+    def test_failover_on_rate_limit(self, make_service):
+        transport = StubTransport({"model-a": RuntimeError("429 quota exceeded")})
+        service = make_service(transport)
+
+        assert service.generate_sync("cle", "prompt") == ("model-b", "reponse de model-b")
+        assert transport.calls == ["model-a", "model-b"]
+
+    def test_timeout_moves_to_next_model(self, make_service):
+        """Un modele trop lent est abandonne au profit du suivant."""
+        class SlowFirstModel(StubTransport):
+            async def generate(self, model_name, prompt):
+                if model_name == "model-a":
+                    await asyncio.sleep(5)
+                return await super().generate(model_name, prompt)
+
+        service = make_service(SlowFirstModel(), timeout=0.1)
+
+        assert service.generate_sync("cle", "prompt") == ("model-b", "reponse de model-b")
+        assert service.stats()["timeouts"] == 1
+
+    def test_all_models_fail(self, make_service):
+        transport = StubTransport({"model-a": "", "model-b": RuntimeError("404 not found")})
+        service = make_service(transport)
+
+        assert service.generate_sync("cle", "prompt") is None
+        assert service.stats()["failures"] == 1
+
+
+class ChunkedTransport(StubTransport):
+    """Transport factice streame: la reponse arrive en morceaux de 4 caracteres."""
+
+    async def stream(self, model_name, prompt):
+        text = await self.generate(model_name, prompt)
+        for i in range(0, len(text), 4):
+            yield text[i:i + 4]
+
+
+class TestStreaming:
+    """Tests de stream_sync (coalescing, semaphore, failover)."""
+
+    def test_chunks_then_result(self, make_service):
+        service = make_service(ChunkedTransport())
+        events = list(service.stream_sync("cle", "prompt"))
+
+        assert "".join(e["text"] for e in events[:-1]) == "reponse de model-a"
+        assert {e["model"] for e in events[:-1]} == {"model-a"}
+        assert events[-1] == {"type": "result", "result": ("model-a", "reponse de model-a")}
+        assert service.stats()["streams"] == 1
+
+    def test_generate_joins_inflight_stream(self, make_service):
+        """Un appel non streame de meme cle attend le resultat du flux en cours."""
+        transport = ChunkedTransport()
+        transport.release.clear()
+        service = make_service(transport)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            streamed = pool.submit(lambda: list(service.stream_sync("cle", "prompt")))
+            while service.stats()["requests"] < 1:
+                time.sleep(0.01)
+            joined = pool.submit(service.generate_sync, "cle", "prompt")
+            while service.stats()["requests"] < 2:
+                time.sleep(0.01)
+            transport.release.set()
+            events, result = streamed.result(timeout=5), joined.result(timeout=5)
+
+        assert transport.calls == ["model-a"]
+        assert result == events[-1]["result"] == ("model-a", "reponse de model-a")
+        assert service.stats()["coalesced"] == 1
+
+    def test_streams_share_model_semaphore(self, make_service):
+        transport = ChunkedTransport(delay=0.05)
+        service = make_service(transport, models=("model-a",), max_concurrency=2)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda i: list(service.stream_sync(f"cle-{i}", "prompt")), range(6)))
+
+        assert transport.max_active == 2
+
+    def test_no_failover_after_text_sent(self, make_service):
+        """Une erreur en cours de flux termine la generation (pas de melange)."""
+        class BrokenStream(ChunkedTransport):
+            async def stream(self, model_name, prompt):
+                self.calls.append(model_name)
+                yield "{\"name\": "
+                raise RuntimeError("connection reset")
+
+        transport = BrokenStream()
+        service = make_service(transport)
+        events = list(service.stream_sync("cle", "prompt"))
+
+        assert transport.calls == ["model-a"]
+        assert events[-1] == {"type": "result", "result": None}
+
+
+class TestBackendIntegration:
+    """Tests de _call_gemini_api branche sur le service."""
+
+    def test_recipe_parsed_from_service(self, make_service):
+        recipe = {"name": "Le Stub", "ingredients": ["50ml Gin"], "instructions": "Remuer",
+                  "taste_profile": {"Douceur": 2.0}}
+        transport = StubTransport({"model-a": "```json\n" + json.dumps(recipe) + "\n```"})
+        service = make_service(transport)
+
+        with patch.object(backend, "GOOGLE_API_KEY", "test"), \
+                patch.object(backend, "get_client_pool", return_value=GeminiClientPool(model_factory=lambda name: None)), \
+                patch.object(backend, "get_generation_service", return_value=service):
+            result = backend._call_gemini_api("un gin tonic")
+
+        assert result["name"] == "Le Stub"
+        assert result["taste_profile"]["Qualite"] == 3.0
+        assert result["query"] == "un gin tonic"
+
+    def test_no_api_key_skips_service(self):
+        with patch.object(backend, "GOOGLE_API_KEY", ""), \
+                patch.object(backend, "get_generation_service") as service:
+            assert backend._call_gemini_api("un gin tonic") is None
+        service.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,244 @@
+"""
+Tests pour l'IngredientProfiler
+================================
+
+Modele SBERT factice enregistre dans le registre des modeles, base connue
+ecrite dans un repertoire temporaire: aucun telechargement, aucun appel
+Gemini.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import json
+import re
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import gemini_client, ingredient_profiler, model_registry
+from src.gemini_client import GeminiClientPool, set_client_pool
+from src.ingredient_profiler import IngredientProfiler
+from src.model_registry import DEFAULT_MODEL_NAME, ModelRegistry, set_model_registry
+from tests.conftest import FakeSbertModel
+
+KNOWN = {
+    "spirits": {
+        "gin": {"name_fr": "Gin", "name_en": ["gin"], "strength": 4.5, "sweetness": 1.0,
+                "acidity": 1.0, "bitterness": 2.5, "freshness": 3.0, "category": "spirit"},
+        "rhum blanc": {"name_fr": "Rhum blanc", "name_en": ["white rum", "light rum"], "strength": 4.0,
+                       "sweetness": 2.0, "acidity": 1.0, "bitterness": 1.0, "freshness": 2.0,
+                       "category": "spirit"},
+    },
+    "mixers": {
+        "jus de citron vert": {"name_fr": "Jus de citron vert", "name_en": ["lime juice"], "strength": 0.0,
+                               "sweetness": 1.0, "acidity": 5.0, "bitterness": 1.0, "freshness": 4.5,
+                               "category": "mixer"},
+    },
+}
+
+
+@pytest.fixture
+def sbert():
+    """Registre global dont le modele par defaut est un modele factice."""
+    previous = model_registry._registry
+    model = FakeSbertModel()
+    registry = ModelRegistry(loader=lambda name: pytest.fail(f"model {name} loaded"))
+    registry.register(DEFAULT_MODEL_NAME, model)
+    set_model_registry(registry)
+    yield model
+    set_model_registry(previous)
+
+
+@pytest.fixture
+def make_profiler(tmp_path, sbert):
+    known_path = tmp_path / "known_ingredients.json"
+    known_path.write_text(json.dumps(KNOWN), encoding="utf-8")
+
+    def make(cache_name="profiles.json"):
+        return IngredientProfiler(known_ingredients_path=known_path, cache_path=tmp_path / cache_name)
+    return make
+
+
+class FakeGeminiModel:
+    """
+    Modele Gemini factice: profil deterministe par ingredient, pour les
+    prompts individuels comme pour les prompts groupes. Les ingredients de
+    `unknown` n'obtiennent jamais de profil valide.
+    """
+
+    def __init__(self, name, prompts, unknown=()):
+        self.name = name
+        self.prompts = prompts
+        self.unknown = set(unknown)
+
+    def profile(self, ingredient):
+        level = 1.5 + (len(ingredient) % 7) * 0.5
+        return {"sweetness": level, "acidity": 2.0, "bitterness": 1.5, "strength": 1.5,
+                "freshness": level, "category": "garnish"}
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        single = re.search(r'Analyse l\'ingredient de cocktail "(.+)"\.', prompt)
+        if single:
+            name = single.group(1)
+            return SimpleNamespace(text="{}" if name in self.unknown else json.dumps(self.profile(name)))
+        names = [json.loads(n) for n in re.findall(r'^- (".*")$', prompt, re.MULTILINE)]
+        response = {n: self.profile(n) for n in names if n not in self.unknown}
+        return SimpleNamespace(text="```json\n" + json.dumps(response) + "\n```")
+
+
+@pytest.fixture
+def gemini():
+    """Pool Gemini global remplace par des modeles factices (prompts enregistres)."""
+    previous = gemini_client._pool
+    prompts = []
+    set_client_pool(GeminiClientPool(model_factory=lambda name: FakeGeminiModel(name, prompts, unknown={"Mystere"})))
+    yield prompts
+    set_client_pool(previous)
+
+
+class TestAliasIndex:
+    """Tests de la recherche de niveau 1 (base connue et cache)."""
+
+    @pytest.mark.parametrize("name, key", [
+        ("gin", "gin"),
+        ("White Rum", "rhum blanc"),
+        ("  Light Rum ", "rhum blanc"),
+        ("Rhum Blanc!", "rhum blanc"),
+        ("Jus de Citron Vert", "jus de citron vert"),
+        ("LIME JUICE", "jus de citron vert"),
+    ])
+    def test_resolved_to_canonical_profile(self, make_profiler, name, key):
+        profile = make_profiler().get_profile(name)
+        assert profile["source"] == "known"
+        assert profile["name_fr"] == KNOWN["spirits"].get(key, KNOWN["mixers"].get(key))["name_fr"]
+
+    def test_cached_profile_resolved(self, make_profiler):
+        profiler = make_profiler()
+        profiler._cache_profile("yuzu", {"sweetness": 1.5, "acidity": 4.5, "source": "gemini"})
+        assert profiler.get_profile("Yuzu")["source"] == "gemini"
+        assert make_profiler().get_profile("yuzu")["source"] == "gemini"
+
+    def test_known_base_wins_over_cache(self, make_profiler):
+        profiler = make_profiler()
+        profiler._cache_profile("gin", {"sweetness": 5.0, "source": "gemini"})
+        assert profiler.get_profile("Gin")["source"] == "known"
+
+    def test_single_normalization_per_lookup(self, make_profiler):
+        profiler = make_profiler()
+        with patch.object(profiler, "_normalize_name", wraps=profiler._normalize_name) as normalize:
+            profiler.get_profile("lime juice")
+        assert normalize.call_count == 1
+
+
+class TestSimilarityIndex:
+    """Tests de l'index des embeddings des ingredients connus."""
+
+    def test_keys_and_aliases_encoded_once(self, make_profiler, sbert):
+        profiler = make_profiler()
+        assert sorted(sbert.encoded_texts) == sorted(
+            ["gin", "rhum blanc", "white rum", "light rum", "jus de citron vert", "lime juice"]
+        )
+        assert profiler.similarity_matrix.shape == (6, sbert.dimension)
+
+        sbert.encoded_texts.clear()
+        for _ in range(3):
+            profiler._find_similar("gin premium")
+        assert sbert.encoded_texts == ["gin premium"] * 3
+
+    def test_alias_resolves_to_canonical_key(self, make_profiler):
+        profile = make_profiler()._find_similar("white rum premium")
+        assert profile["source"] == "similarity"
+        assert profile["similar_to"] == "Rhum blanc"
+        assert profile["similarity_score"] >= 0.75
+
+    def test_below_threshold(self, make_profiler):
+        assert make_profiler()._find_similar("sirop de sucre de canne") is None
+
+    def test_persisted_next_to_known_ingredients(self, make_profiler, sbert, tmp_path):
+        make_profiler()
+        assert (tmp_path / "known_ingredients.manifest.json").exists()
+
+        sbert.encoded_texts.clear()
+        profiler = make_profiler()
+        assert sbert.encoded_texts == []
+        assert profiler._find_similar("lime juice frais")["similar_to"] == "Jus de citron vert"
+
+    def test_only_changed_names_reencoded(self, make_profiler, sbert, tmp_path):
+        make_profiler()
+        known = json.loads(json.dumps(KNOWN))
+        known["spirits"]["gin"]["name_en"].append("london dry gin")
+        (tmp_path / "known_ingredients.json").write_text(json.dumps(known), encoding="utf-8")
+
+        sbert.encoded_texts.clear()
+        make_profiler()
+        assert sbert.encoded_texts == ["london dry gin"]
+
+
+
+class TestGetProfiles:
+    """Tests de la resolution groupee."""
+
+    NAMES = ["Gin", "White Rum", "white rum premium", "Yuzu", "Shiso", "yuzu!", "Mystere",
+             "Jus de Citron Vert", "Yuzu", "Sirop de cassis maison"]
+
+    @staticmethod
+    def without_timestamp(profiles):
+        return [{k: v for k, v in profile.items() if k != "timestamp"} for profile in profiles]
+
+    def test_matches_per_item_calls(self, make_profiler, gemini):
+        batch = make_profiler("batch.json").get_profiles(self.NAMES)
+        single_profiler = make_profiler("single.json")
+        single = [single_profiler.get_profile(name) for name in self.NAMES]
+
+        assert self.without_timestamp(batch) == self.without_timestamp(single)
+        assert [p["source"] for p in batch] == ["known", "known", "similarity", "gemini", "gemini",
+                                                "gemini", "fallback", "known", "gemini", "gemini"]
+
+    def test_matches_per_item_without_gemini(self, make_profiler):
+        batch = make_profiler("batch.json").get_profiles(self.NAMES)
+        single_profiler = make_profiler("single.json")
+        assert batch == [single_profiler.get_profile(name) for name in self.NAMES]
+
+    def test_single_sbert_batch(self, make_profiler, sbert):
+        profiler = make_profiler()
+        with patch.object(sbert, "encode", wraps=sbert.encode) as encode:
+            profiler.get_profiles(self.NAMES)
+        assert encode.call_count == 1
+        assert sorted(encode.call_args.args[0]) == sorted(set(self.NAMES) - {"Gin", "White Rum", "Jus de Citron Vert"})
+
+    def test_grouped_gemini_prompts(self, make_profiler, gemini):
+        profiler = make_profiler()
+        with patch.object(ingredient_profiler, "GEMINI_BATCH_SIZE", 2):
+            profiles = profiler.get_profiles(["Yuzu", "Shiso", "Kumquat", "Sansho", "Combava"])
+
+        assert len(gemini) == 3
+        assert all(p["source"] == "gemini" for p in profiles)
+        cached = json.loads(profiler.cache_path.read_text(encoding="utf-8"))
+        assert sorted(cached) == ["combava", "kumquat", "sansho", "shiso", "yuzu"]
+
+    def test_missing_from_grouped_answer_retried_alone(self, make_profiler, gemini):
+        profiles = make_profiler().get_profiles(["Yuzu", "Mystere"])
+        assert [p["source"] for p in profiles] == ["gemini", "fallback"]
+        assert sum("Analyse ces ingredients" in p for p in gemini) == 1
+
+    def test_profiles_are_independent_copies(self, make_profiler):
+        first, second = make_profiler().get_profiles(["Gin", "gin"])
+        first["sweetness"] = 0
+        assert second["sweetness"] == KNOWN["spirits"]["gin"]["sweetness"]
+
+    def test_inferred_profile_does_not_alias_cache(self, make_profiler, gemini):
+        profiler = make_profiler()
+        first, second = profiler.get_profiles(["Yuzu", "yuzu"])
+        first["sweetness"] = 0
+        assert profiler.profiles_cache["yuzu"]["sweetness"] != 0
+        assert second["sweetness"] != 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,169 @@
+"""
+Tests pour l'instrumentation des etapes du pipeline
+====================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import threading
+import time
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend, instrumentation
+from src.instrumentation import StageMetrics, get_stage_metrics, observe, span, trace, use_trace
+from tests.conftest import StubTransport
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    get_stage_metrics().reset()
+    yield get_stage_metrics()
+    get_stage_metrics().reset()
+
+
+class TestSpans:
+    """Tests des spans et des traces."""
+
+    def test_spans_recorded_in_trace(self):
+        with trace() as current:
+            with span("guardrail"):
+                time.sleep(0.01)
+            with span("cache_lookup"):
+                pass
+            with span("cache_lookup"):
+                pass
+
+        assert set(current.stages) == {"guardrail", "cache_lookup"}
+        assert current.stages["guardrail"] >= 10
+        assert get_stage_metrics().snapshot()["cache_lookup"]["count"] == 2
+
+    def test_span_outside_trace_only_feeds_metrics(self):
+        with span("scoring"):
+            pass
+        assert instrumentation.current_trace() is None
+        assert get_stage_metrics().snapshot()["scoring"]["count"] == 1
+
+    def test_span_recorded_on_exception(self):
+        with trace() as current:
+            with pytest.raises(ValueError):
+                with span("gemini"):
+                    raise ValueError("boom")
+        assert "gemini" in current.stages
+
+    def test_traces_isolated_between_threads(self):
+        stages = {}
+
+        def request(name):
+            with trace() as current:
+                with span(name):
+                    time.sleep(0.01)
+            stages[name] = set(current.stages)
+
+        threads = [threading.Thread(target=request, args=(f"stage{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert stages == {f"stage{i}": {f"stage{i}"} for i in range(4)}
+
+    def test_use_trace_from_worker_thread(self):
+        with trace() as current:
+            worker = threading.Thread(target=lambda: _observe_in(current, "gemini.model-a"))
+            worker.start()
+            worker.join()
+        assert "gemini.model-a" in current.stages
+
+
+def _observe_in(current, stage):
+    with use_trace(current):
+        observe(stage, 0.5)
+
+
+class TestStageMetrics:
+    """Tests des quantiles et de l'export Prometheus."""
+
+    def test_quantiles(self):
+        metrics = StageMetrics()
+        for ms in range(1, 101):
+            metrics.observe("gemini", ms / 1000)
+
+        entry = metrics.snapshot()["gemini"]
+        assert entry["count"] == 100
+        assert entry["p50"] == pytest.approx(0.0505, abs=1e-3)
+        assert entry["p95"] == pytest.approx(0.095, abs=1e-3)
+        assert entry["p99"] == pytest.approx(0.099, abs=1e-3)
+
+    def test_reservoir_bounded(self):
+        metrics = StageMetrics(reservoir_size=10)
+        for i in range(100):
+            metrics.observe("render", float(i))
+        entry = metrics.snapshot()["render"]
+        assert entry["count"] == 100
+        assert entry["p50"] >= 90
+
+    def test_prometheus_text(self):
+        metrics = StageMetrics()
+        metrics.observe("gemini.gemini-2.5-flash", 0.8)
+        text = metrics.to_prometheus()
+
+        assert "# TYPE ia_pero_stage_duration_seconds summary" in text
+        assert 'ia_pero_stage_duration_seconds{stage="gemini.gemini-2.5-flash",quantile="0.99"} 0.800000' in text
+        assert 'ia_pero_stage_duration_seconds_count{stage="gemini.gemini-2.5-flash"} 1' in text
+
+    def test_export_throttled(self, tmp_path):
+        path = tmp_path / "metrics.prom"
+        observe("request", 0.1)
+        with patch.object(instrumentation, "_last_export", None):
+            assert instrumentation.maybe_export_metrics(path, interval=3600)
+            assert not instrumentation.maybe_export_metrics(path, interval=3600)
+        assert 'stage="request"' in path.read_text(encoding="utf-8")
+
+    def test_model_stats_exported(self, tmp_path):
+        path = tmp_path / "metrics.prom"
+        instrumentation.export_metrics(path)
+        text = path.read_text(encoding="utf-8")
+
+        model = backend.GEMINI_MODELS[0]
+        assert "# TYPE ia_pero_model_budget_utilization gauge" in text
+        assert f'ia_pero_model_budget_utilization{{model="{model}",budget="rpd"}}' in text
+        assert f'ia_pero_model_calls_total{{model="{model}",outcome="requests"}}' in text
+
+    def test_failing_collector_does_not_break_export(self, tmp_path):
+        def broken():
+            raise RuntimeError("boom")
+
+        with patch.object(instrumentation, "_collectors", [broken]):
+            observe("request", 0.1)
+            assert 'stage="request"' in instrumentation.render_metrics()
+
+
+class TestPipelineStages:
+    """Tests des etapes mesurees dans le backend."""
+
+    def test_generate_recipe_stages(self, sbert, isolated_cache):
+        with patch.object(backend, "_call_gemini_api", return_value=None):
+            with trace() as first:
+                backend.generate_recipe("un mojito frais")
+            with trace() as second:
+                backend.generate_recipe("un mojito frais")
+
+        assert {"guardrail", "cache_lookup", "gemini", "fallback", "cache_store"} <= set(first.stages)
+        assert set(second.stages) == {"guardrail", "cache_lookup"}
+
+    def test_model_calls_attached_to_caller_trace(self, make_service):
+        service = make_service(StubTransport({"model-a": RuntimeError("429 quota")}))
+        with trace() as current:
+            service.generate_sync("key", "prompt")
+
+        assert {"gemini.model-a", "gemini.model-b"} <= set(current.stages)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,149 @@
+"""
+Tests pour le registre des modeles SBERT
+=========================================
+
+Le chargeur est factice: aucun telechargement de modele.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend, embeddings, model_registry
+from src.model_registry import ModelRegistry, get_model_registry, set_model_registry
+from tests.conftest import FakeSbertModel
+
+
+class CountingLoader:
+    """Chargeur factice comptant les chargements."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.loaded = []
+        self._lock = threading.Lock()
+
+    def __call__(self, name):
+        time.sleep(self.delay)
+        with self._lock:
+            self.loaded.append(name)
+        return FakeSbertModel()
+
+
+@pytest.fixture
+def registry():
+    """Registre global remplace par un registre a chargeur factice."""
+    previous = model_registry._registry
+    loader = CountingLoader()
+    set_model_registry(ModelRegistry(loader=loader))
+    yield get_model_registry(), loader
+    set_model_registry(previous)
+
+
+class TestModelRegistry:
+    """Tests du chargement, du partage et du dechargement."""
+
+    def test_loaded_lazily_once(self):
+        loader = CountingLoader()
+        registry = ModelRegistry(loader=loader)
+        assert registry.loaded() == []
+
+        first = registry.get("all-MiniLM-L6-v2")
+        assert registry.get("all-MiniLM-L6-v2") is first
+        assert loader.loaded == ["all-MiniLM-L6-v2"]
+
+    def test_concurrent_get_loads_once(self):
+        loader = CountingLoader(delay=0.05)
+        registry = ModelRegistry(loader=loader)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            models = list(pool.map(lambda _: registry.get("all-MiniLM-L6-v2"), range(8)))
+
+        assert loader.loaded == ["all-MiniLM-L6-v2"]
+        assert all(model is models[0] for model in models)
+
+    def test_models_keyed_by_name(self):
+        registry = ModelRegistry(loader=CountingLoader())
+        assert registry.get("model-a") is not registry.get("model-b")
+        assert registry.loaded() == ["model-a", "model-b"]
+
+    def test_unload_then_reload(self):
+        loader = CountingLoader()
+        registry = ModelRegistry(loader=loader)
+        first = registry.get("model-a")
+        registry.get("model-b")
+
+        assert registry.unload("model-a") == ["model-a"]
+        assert "model-a" not in registry
+        assert registry.get("model-a") is not first
+        assert registry.unload() == ["model-a", "model-b"]
+        assert registry.loaded() == []
+        assert loader.loaded == ["model-a", "model-b", "model-a"]
+
+    def test_failed_load_not_cached(self):
+        attempts = []
+
+        def loader(name):
+            attempts.append(name)
+            if len(attempts) == 1:
+                raise OSError("hub unreachable")
+            return FakeSbertModel()
+
+        registry = ModelRegistry(loader=loader)
+        with pytest.raises(OSError):
+            registry.get("model-a")
+        assert registry.get("model-a") is not None
+        assert len(attempts) == 2
+
+    def test_register(self):
+        loader = CountingLoader()
+        registry = ModelRegistry(loader=loader)
+        model = FakeSbertModel()
+        registry.register("model-a", model)
+
+        assert registry.get("model-a") is model
+        assert loader.loaded == []
+
+
+class TestSharedInstance:
+    """Tests du partage entre backend, embeddings et IngredientProfiler."""
+
+    def test_backend_and_embeddings_share_model(self, registry):
+        registry, loader = registry
+        assert backend.get_sbert_model() is embeddings.load_sbert_model(backend.MODEL_NAME)
+        assert loader.loaded == [backend.MODEL_NAME]
+
+    def test_keyword_embeddings_use_requested_model(self, registry):
+        registry, loader = registry
+        backend._get_keyword_embeddings.cache_clear()
+        try:
+            backend._get_keyword_embeddings("other-model", ("gin", "rhum"))
+        finally:
+            backend._get_keyword_embeddings.cache_clear()
+        assert registry.get("other-model").encoded_texts == ["gin", "rhum"]
+        assert loader.loaded == ["other-model"]
+
+    def test_profiler_uses_registry(self, registry, tmp_path):
+        from src.ingredient_profiler import IngredientProfiler
+
+        registry, loader = registry
+        profiler = IngredientProfiler(
+            known_ingredients_path=tmp_path / "known.json",
+            cache_path=tmp_path / "profiles.json",
+        )
+        assert profiler.sbert_model is backend.get_sbert_model()
+
+        registry.unload()
+        assert profiler.sbert_model is not None
+        assert loader.loaded == [backend.MODEL_NAME, backend.MODEL_NAME]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,174 @@
+"""
+Tests pour le routeur de modeles (token buckets & circuit breaker)
+===================================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.generation_service import GenerationService
+from src.model_router import (
+    ModelLimits, ModelRouter, TokenBucket,
+    FAILURE_THRESHOLD, RATE_LIMIT_COOLDOWN,
+)
+from tests.conftest import FakeClock, StubTransport
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class TestTokenBucket:
+    """Tests du seau a jetons."""
+
+    def test_burst_then_refill(self, clock):
+        bucket = TokenBucket(10, 60.0, clock)
+
+        assert all(bucket.try_acquire() for _ in range(10))
+        assert not bucket.try_acquire()
+        assert bucket.utilization() == pytest.approx(1.0)
+
+        clock.now += 6.0  # 10 RPM: un jeton toutes les 6 secondes
+        assert bucket.try_acquire()
+        assert not bucket.try_acquire()
+
+
+class TestModelRouter:
+    """Tests du routage par quota."""
+
+    def test_first_model_with_capacity(self, clock):
+        """Le modele prefere est utilise tant qu'il a du quota, puis le suivant."""
+        router = ModelRouter({"lite": ModelLimits(rpm=2, rpd=20), "flash": ModelLimits(rpm=5)}, clock)
+
+        assert [router.acquire() for _ in range(3)] == ["lite", "lite", "flash"]
+        assert router.stats()["lite"]["rpm_available"] == 0
+        assert router.stats()["lite"]["skipped"] == 1
+
+    def test_daily_budget(self, clock):
+        router = ModelRouter({"lite": ModelLimits(rpm=10, rpd=2)}, clock)
+
+        router.acquire()
+        clock.now += 60
+        router.acquire()
+        clock.now += 60
+
+        assert router.acquire() is None
+        assert not router.has_capacity()
+
+    def test_rate_limit_opens_circuit(self, clock):
+        """Apres un 429, le modele est saute sans appel jusqu'a la fin du cooldown."""
+        router = ModelRouter({"lite": ModelLimits(rpm=10), "flash": ModelLimits()}, clock)
+
+        router.record_failure(router.acquire(), "rate limit")
+        assert router.stats()["lite"]["state"] == "open"
+        assert router.acquire() == "flash"
+
+        clock.now += RATE_LIMIT_COOLDOWN + 1
+        assert router.acquire() == "lite"
+
+    def test_repeated_errors_open_circuit(self, clock):
+        router = ModelRouter({"lite": ModelLimits()}, clock)
+
+        for _ in range(FAILURE_THRESHOLD - 1):
+            router.record_failure("lite", "error")
+        assert router.acquire() == "lite"
+
+        router.record_failure("lite", "error")
+        assert router.acquire() is None
+
+    def test_exclude_tried_models(self, clock):
+        router = ModelRouter({"lite": ModelLimits(), "flash": ModelLimits()}, clock)
+        assert router.acquire(exclude=["lite"]) == "flash"
+        assert router.acquire(exclude=["lite", "flash"]) is None
+
+    def test_reserve_left_to_users(self, clock):
+        """Un appel de fond laisse la reserve intacte et ignore les quotas inconnus."""
+        router = ModelRouter({"lite": ModelLimits(rpm=10, rpd=4), "fallback": ModelLimits()}, clock)
+
+        assert router.acquire(reserve=0.5) == "lite"
+        clock.now += 60
+        assert router.acquire(reserve=0.5) == "lite"
+        clock.now += 60
+
+        # 2 jetons RPD restants sur 4: la moitie reste aux utilisateurs
+        assert router.acquire(reserve=0.5) is None
+        assert not router.has_capacity(reserve=0.5)
+        assert router.acquire() == "lite"
+        assert router.has_capacity()
+
+
+class TestServiceRouting:
+    """Tests du service de generation branche sur le routeur."""
+
+    def test_exhausted_model_not_called(self, clock):
+        """Un modele sans quota n'est pas appele (pas d'aller-retour perdu)."""
+        transport = StubTransport()
+        router = ModelRouter({"lite": ModelLimits(rpm=1), "flash": ModelLimits()}, clock)
+        service = GenerationService(transport, router)
+        try:
+            service.generate_sync("cle-1", "prompt")
+            service.generate_sync("cle-2", "prompt")
+        finally:
+            service.close()
+
+        assert transport.calls == ["lite", "flash"]
+
+    def test_rate_limited_model_skipped_next_time(self, clock):
+        transport = StubTransport({"lite": RuntimeError("429 Resource exhausted")})
+        router = ModelRouter({"lite": ModelLimits(rpm=10), "flash": ModelLimits()}, clock)
+        service = GenerationService(transport, router)
+        try:
+            service.generate_sync("cle-1", "prompt")
+            service.generate_sync("cle-2", "prompt")
+        finally:
+            service.close()
+
+        assert transport.calls == ["lite", "flash", "flash"]
+        assert router.stats()["lite"]["rate_limited"] == 1
+
+    def test_no_capacity_returns_none(self, clock):
+        transport = StubTransport()
+        service = GenerationService(transport, ModelRouter({"lite": ModelLimits(rpd=1)}, clock))
+        try:
+            assert service.generate_sync("cle-1", "prompt") is not None
+            assert service.generate_sync("cle-2", "prompt") is None
+        finally:
+            service.close()
+
+        assert transport.calls == ["lite"]
+
+    def test_user_retries_after_background_failure(self, clock):
+        """Un appelant qui rejoint une generation de fond en echec reessaie avec tout le quota."""
+        transport = StubTransport({"lite": RuntimeError("429 Resource exhausted")})
+        transport.release.clear()
+        router = ModelRouter({"lite": ModelLimits(rpm=10), "flash": ModelLimits()}, clock)
+        service = GenerationService(transport, router)
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                background = pool.submit(service.generate_sync, "cle", "prompt", 0.5)
+                while not transport.calls:
+                    time.sleep(0.01)
+                user = pool.submit(service.generate_sync, "cle", "prompt")
+                while service.stats()["coalesced"] < 1:
+                    time.sleep(0.01)
+                transport.release.set()
+
+                assert background.result(timeout=5) is None
+                assert user.result(timeout=5) == ("flash", "reponse de flash")
+        finally:
+            service.close()
+
+        assert transport.calls == ["lite", "flash"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
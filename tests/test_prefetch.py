@@ -0,0 +1,185 @@
+"""
+Tests pour le prechauffage du cache de recettes
+================================================
+
+Construction des requetes, selection des requetes a prechauffer et
+passages du CacheWarmer (fonction de prechauffage factice), puis
+backend.prefetch_recipe avec le modele SBERT factice.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import time
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend
+from src.analytics import AnalyticsLog
+from src.model_router import ModelRouter
+from src.prefetch import CacheWarmer, popular_queries
+from src.queries import SURPRISE_QUERIES, DEFAULT_BUDGET, build_default_query, build_final_query
+from tests.conftest import FakeClock
+
+
+def make_analytics(tmp_path, queries, status="ok"):
+    log = AnalyticsLog(directory=tmp_path / "analytics", flush_interval=None, legacy_file=None)
+    for query in queries:
+        log.record({"query": query, "status": status, "cached": False})
+    return log
+
+
+class TestQueryBuilder:
+    """Tests de la construction des requetes finales."""
+
+    def test_budget_and_filters(self):
+        query = build_final_query("un mojito", "Luxe (> 25€)", {"alcohol": "Sans Alcool", "difficulty": "Facile"})
+        assert query == "un mojito (budget: Luxe (> 25€)) [sans alcool, mocktail, recette simple et rapide]"
+
+    def test_default_query_matches_ui_defaults(self):
+        assert build_default_query(SURPRISE_QUERIES[0]) == f"{SURPRISE_QUERIES[0]} (budget: {DEFAULT_BUDGET})"
+
+
+class TestPopularQueries:
+    """Tests de la lecture des requetes frequentes."""
+
+    def test_ranked_by_frequency(self, tmp_path):
+        log = make_analytics(tmp_path, ["negroni", "Mojito", "mojito ", "negroni", "mojito", "spritz"])
+        assert popular_queries(log, top_n=2) == ["Mojito", "negroni"]
+
+    def test_errors_ignored(self, tmp_path):
+        log = make_analytics(tmp_path, ["reparer mon velo"] * 3, status="error")
+        assert popular_queries(log) == []
+
+    def test_disabled(self, tmp_path):
+        assert popular_queries(make_analytics(tmp_path, ["negroni"]), top_n=0) == []
+
+
+class TestCacheWarmer:
+    """Tests des passages de prechauffage."""
+
+    def make_warmer(self, tmp_path, statuses=None, **kwargs):
+        calls = []
+
+        def prefetch(query):
+            calls.append(query)
+            return (statuses or {}).get(query, "warmed")
+
+        analytics = make_analytics(tmp_path, ["negroni", "negroni", "Un classique des annees folles"])
+        warmer = CacheWarmer(prefetch=prefetch, analytics=analytics, **kwargs)
+        return warmer, calls
+
+    def test_candidates_in_final_form(self, tmp_path):
+        warmer, _ = self.make_warmer(tmp_path)
+        candidates = warmer.candidates()
+
+        assert candidates[:len(SURPRISE_QUERIES)] == [build_default_query(q) for q in SURPRISE_QUERIES]
+        assert build_default_query("negroni") in candidates
+        assert len(candidates) == len(set(candidates)) == len(SURPRISE_QUERIES) + 1
+
+    def test_generations_capped_per_run(self, tmp_path):
+        warmer, calls = self.make_warmer(tmp_path, max_per_run=3)
+        counts = warmer.run_once()
+        assert counts == {"warmed": 3}
+        assert len(calls) == 3
+
+    def test_cached_queries_do_not_count_toward_cap(self, tmp_path):
+        cached = {build_default_query(q): "cached" for q in SURPRISE_QUERIES[:4]}
+        warmer, calls = self.make_warmer(tmp_path, statuses=cached, max_per_run=2)
+        assert warmer.run_once() == {"cached": 4, "warmed": 2}
+
+    def test_stops_without_capacity(self, tmp_path):
+        statuses = {build_default_query(SURPRISE_QUERIES[1]): "no_capacity"}
+        warmer, calls = self.make_warmer(tmp_path, statuses=statuses, max_per_run=10)
+        assert warmer.run_once() == {"warmed": 1, "no_capacity": 1}
+        assert len(calls) == 2
+
+    def test_background_thread(self, tmp_path):
+        warmer, calls = self.make_warmer(tmp_path, max_per_run=1, interval=0.01, initial_delay=0)
+        warmer.start()
+        try:
+            deadline = time.time() + 5
+            while warmer.stats().get("runs", 0) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            warmer.stop()
+
+        assert not warmer.running
+        assert warmer.stats()["runs"] >= 2
+
+
+class TestPrefetchRecipe:
+    """Tests de backend.prefetch_recipe."""
+
+    RECIPE = {"name": "Le Prechauffe", "ingredients": [], "instructions": "", "taste_profile": {}}
+
+    def test_warmed_then_cached(self, sbert, isolated_cache):
+        with patch.object(backend, "_call_gemini_api", return_value=self.RECIPE) as gemini:
+            assert backend.prefetch_recipe("un mojito frais") == "warmed"
+            assert backend.prefetch_recipe("un mojito frais") == "cached"
+            result = backend.generate_recipe("un mojito frais")
+
+        assert gemini.call_count == 1
+        assert result["cached"] is True
+        assert result["recipe"]["name"] == "Le Prechauffe"
+
+    def test_fallback_never_cached(self, sbert, isolated_cache):
+        with patch.object(backend, "_call_gemini_api", return_value=None):
+            assert backend.prefetch_recipe("un mojito frais") == "failed"
+        assert backend.get_recipe_cache().get(backend._get_cache_key("un mojito frais")) is None
+
+    def test_no_call_without_capacity(self, sbert, isolated_cache):
+        with patch.object(backend.get_model_router(), "has_capacity", return_value=False), \
+                patch.object(backend, "_call_gemini_api") as gemini:
+            assert backend.prefetch_recipe("un mojito frais") == "no_capacity"
+        gemini.assert_not_called()
+
+    def test_off_topic_rejected(self, sbert, isolated_cache):
+        assert backend.prefetch_recipe("reparer mon velo") == "rejected"
+
+    def test_lookups_counted_apart(self, sbert, isolated_cache):
+        """Les recherches du prechauffage ne faussent pas le taux de hit des utilisateurs."""
+        before = backend.get_cache_stats()
+        with patch.object(backend, "_call_gemini_api", return_value=self.RECIPE):
+            backend.prefetch_recipe("un mojito frais")
+            backend.prefetch_recipe("un mojito frais")
+            backend.prefetch_recipe("un daiquiri frais")
+        after = backend.get_cache_stats()
+
+        assert (after["hits"], after["misses"]) == (before["hits"], before["misses"])
+        assert after["semantic_hits"] == before["semantic_hits"]
+        assert backend.get_semantic_index().stats()["misses"] == 0
+        assert after["prefetch_hits"] - before["prefetch_hits"] == 1
+        assert after["prefetch_misses"] - before["prefetch_misses"] == 2
+
+
+class TestPrefetchQuotaReserve:
+    """Le prechauffage laisse une part du quota aux utilisateurs."""
+
+    def test_nothing_generated_near_daily_limit(self, tmp_path, sbert, isolated_cache):
+        """Modeles a quota proches de leur limite RPD: aucune generation, meme avec les fallbacks."""
+        clock = FakeClock()
+        router = ModelRouter(backend.GEMINI_MODEL_LIMITS, clock)
+        limited = [name for name, limits in backend.GEMINI_MODEL_LIMITS.items() if limits.rpd]
+        for name in limited:
+            others = [other for other in backend.GEMINI_MODEL_LIMITS if other != name]
+            for _ in range(15):
+                assert router.acquire(exclude=others) == name
+                clock.now += 60
+
+        warmer = CacheWarmer(prefetch=backend.prefetch_recipe, analytics=make_analytics(tmp_path, []))
+        with patch.object(backend, "get_model_router", return_value=router), \
+                patch.object(backend, "_call_gemini_api") as gemini:
+            assert warmer.run_once() == {"no_capacity": 1}
+
+        gemini.assert_not_called()
+        # Les utilisateurs disposent toujours du quota restant
+        assert router.acquire() == limited[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
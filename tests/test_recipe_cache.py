@@ -0,0 +1,298 @@
+"""
+Tests pour le cache des recettes (backends SQLite & JSON)
+==========================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.recipe_cache import (
+    JsonRecipeCache,
+    MemoryRecipeCache,
+    SemanticRecipeIndex,
+    SQLiteRecipeCache,
+    TieredRecipeCache,
+    create_recipe_cache,
+    migrate_json_cache,
+)
+
+MOJITO = {"name": "Mojito", "ingredients": ["Rhum", "Menthe"], "instructions": "1. Piler.", "taste_profile": {}}
+NEGRONI = {"name": "Negroni", "ingredients": ["Gin", "Campari"], "instructions": "1. Remuer.", "taste_profile": {}}
+
+
+class TestSQLiteRecipeCache:
+    """Tests du backend SQLite."""
+
+    def test_get_set(self, tmp_path):
+        """Une recette ecrite est relue a l'identique."""
+        cache = SQLiteRecipeCache(tmp_path / "cache.db")
+
+        assert cache.get("abc") is None
+        cache.set("abc", MOJITO)
+
+        assert cache.get("abc") == MOJITO
+        assert "abc" in cache
+        assert len(cache) == 1
+
+    def test_set_replaces_existing_key(self, tmp_path):
+        """La cle primaire garantit une seule entree par requete."""
+        cache = SQLiteRecipeCache(tmp_path / "cache.db")
+        cache.set("abc", MOJITO)
+        cache.set("abc", NEGRONI)
+
+        assert cache.get("abc") == NEGRONI
+        assert len(cache) == 1
+
+    def test_wal_mode_enabled(self, tmp_path):
+        """La base est en mode WAL (lectures concurrentes)."""
+        cache = SQLiteRecipeCache(tmp_path / "cache.db")
+        mode = cache._connection().execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+
+    def test_concurrent_writers(self, tmp_path):
+        """Des sessions concurrentes (threads) ne perdent aucune entree."""
+        cache = SQLiteRecipeCache(tmp_path / "cache.db")
+
+        def write(start):
+            for i in range(start, start + 25):
+                cache.set(f"key-{i}", {"name": f"Cocktail {i}"})
+
+        threads = [threading.Thread(target=write, args=(n * 25,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(cache) == 100
+
+    def test_persistence_between_instances(self, tmp_path):
+        """Un nouveau worker relit les recettes deja en base."""
+        SQLiteRecipeCache(tmp_path / "cache.db").set("abc", MOJITO)
+        assert SQLiteRecipeCache(tmp_path / "cache.db").get("abc") == MOJITO
+
+
+class FakeClock:
+    """Horloge manuelle pour tester les TTL."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoryRecipeCache:
+    """Tests du LRU en memoire (taille, TTL, compteurs)."""
+
+    def test_lru_eviction(self):
+        """Au-dela de max_entries, la moins recemment utilisee est evincee."""
+        cache = MemoryRecipeCache(max_entries=2)
+        cache.set("a", MOJITO)
+        cache.set("b", NEGRONI)
+        cache.get("a")  # "a" devient la plus recente
+        cache.set("c", MOJITO)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == MOJITO
+        assert cache.stats()["evictions"] == 1
+
+    def test_byte_limit(self):
+        """La taille cumulee est bornee."""
+        size = len(json.dumps(MOJITO, ensure_ascii=False).encode("utf-8"))
+        cache = MemoryRecipeCache(max_entries=100, max_bytes=size * 2)
+        for i in range(5):
+            cache.set(f"k{i}", MOJITO)
+
+        assert len(cache) == 2
+        assert cache.stats()["bytes"] <= size * 2
+
+    def test_ttl_expiration(self):
+        """Une entree expiree n'est plus servie."""
+        clock = FakeClock()
+        cache = MemoryRecipeCache(ttl=60, clock=clock)
+        cache.set("a", MOJITO)
+
+        clock.now = 59
+        assert cache.get("a") == MOJITO
+        clock.now = 61
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_counters(self):
+        cache = MemoryRecipeCache()
+        cache.set("a", MOJITO)
+        cache.get("a")
+        cache.get("absent")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_returned_recipe_is_a_copy(self):
+        """Modifier une recette servie ne corrompt pas le cache."""
+        cache = MemoryRecipeCache()
+        cache.set("a", MOJITO)
+        cache.get("a")["name"] = "Autre"
+        assert cache.get("a")["name"] == "Mojito"
+
+
+class TestTieredRecipeCache:
+    """Tests du cache a deux niveaux (memoire + disque)."""
+
+    def test_disk_hit_promoted_to_memory(self, tmp_path):
+        persistent = SQLiteRecipeCache(tmp_path / "cache.db")
+        persistent.set("a", MOJITO)
+        tiered = TieredRecipeCache(MemoryRecipeCache(), persistent)
+
+        assert tiered.get("a") == MOJITO  # Depuis le disque
+        assert tiered.get("a") == MOJITO  # Depuis la memoire
+        assert tiered.stats()["hits"] == 1
+        assert tiered.stats()["misses"] == 1
+
+    def test_write_through(self, tmp_path):
+        persistent = SQLiteRecipeCache(tmp_path / "cache.db")
+        tiered = TieredRecipeCache(MemoryRecipeCache(), persistent)
+        tiered.set("a", NEGRONI)
+
+        assert persistent.get("a") == NEGRONI
+        assert tiered.memory.get("a") == NEGRONI
+
+    def test_set_many_refreshes_memory(self, tmp_path):
+        persistent = SQLiteRecipeCache(tmp_path / "cache.db")
+        tiered = TieredRecipeCache(MemoryRecipeCache(), persistent)
+        tiered.set("a", MOJITO)
+
+        assert tiered.set_many(iter([("a", NEGRONI), ("b", MOJITO)])) == 2
+        assert tiered.get("a") == NEGRONI
+        assert persistent.get("b") == MOJITO
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class TestSemanticRecipeIndex:
+    """Tests de l'index des embeddings de requetes."""
+
+    def test_lookup_above_threshold(self):
+        index = SemanticRecipeIndex(threshold=0.9, model_name="fake")
+        index.add("mojito", unit([1, 0, 0]))
+        index.add("negroni", unit([0, 1, 0]))
+
+        key, similarity = index.lookup(unit([1, 0.1, 0]))
+        assert key == "mojito"
+        assert similarity > 0.9
+        assert index.lookup(unit([1, 1, 0])) is None
+
+    def test_lookup_does_not_count(self):
+        """Hits et misses sont comptes par l'appelant (record_lookup)."""
+        index = SemanticRecipeIndex(threshold=0.9, model_name="fake")
+        index.add("mojito", unit([1, 0, 0]))
+        index.lookup(unit([1, 0, 0]))
+        assert index.stats()["hits"] == 0
+
+        index.record_lookup(hit=True)
+        index.record_lookup(hit=False)
+        assert index.stats() == {"entries": 1, "hits": 1, "misses": 1, "evictions": 0}
+
+    def test_lookup_restricted_to_bucket(self):
+        """Une requete ne correspond qu'aux requetes de meme budget et filtres."""
+        index = SemanticRecipeIndex(threshold=0.9, model_name="fake")
+        index.add("mojito-modere", unit([1, 0, 0]), bucket="(budget: modere)")
+        index.add("mojito-luxe", unit([1, 0.05, 0]), bucket="(budget: luxe)")
+
+        assert index.lookup(unit([1, 0, 0]), bucket="(budget: luxe)")[0] == "mojito-luxe"
+        assert index.lookup(unit([1, 0, 0]), bucket="(budget: modere)")[0] == "mojito-modere"
+        assert index.lookup(unit([1, 0, 0]), bucket="(budget: economique)") is None
+        assert index.lookup(unit([1, 0, 0])) is None
+
+    def test_remove(self):
+        index = SemanticRecipeIndex(threshold=0.9, model_name="fake")
+        index.add("mojito", unit([1, 0, 0]))
+        index.add("negroni", unit([0, 1, 0]))
+        index.remove("mojito")
+
+        assert "mojito" not in index
+        assert index.lookup(unit([1, 0, 0])) is None
+        assert index.lookup(unit([0, 1, 0]))[0] == "negroni"
+
+    def test_empty_index(self):
+        index = SemanticRecipeIndex(threshold=0.9, model_name="fake")
+        assert index.lookup(unit([1, 0, 0])) is None
+
+    def test_growth_beyond_initial_capacity(self):
+        index = SemanticRecipeIndex(threshold=0.99, model_name="fake")
+        vectors = np.eye(100, dtype=np.float32)
+        for i, vector in enumerate(vectors):
+            index.add(f"k{i}", vector)
+
+        assert len(index) == 100
+        assert index.lookup(vectors[73])[0] == "k73"
+
+    def test_persistence_per_model(self, tmp_path):
+        """L'index est recharge au demarrage, pour le meme modele uniquement."""
+        db = tmp_path / "cache.db"
+        SemanticRecipeIndex(0.9, "fake", path=db).add("mojito", unit([1, 0, 0]))
+
+        assert SemanticRecipeIndex(0.9, "fake", path=db).lookup(unit([1, 0, 0]))[0] == "mojito"
+        assert len(SemanticRecipeIndex(0.9, "other-model", path=db)) == 0
+
+    def test_oldest_entries_evicted(self, tmp_path):
+        """Au-dela de max_entries, les requetes les plus anciennes sont evincees."""
+        db = tmp_path / "cache.db"
+        index = SemanticRecipeIndex(0.99, "fake", path=db, max_entries=3)
+        vectors = np.eye(5, dtype=np.float32)
+        for i, vector in enumerate(vectors):
+            index.add(f"k{i}", vector)
+
+        assert len(index) == 3
+        assert index.stats()["evictions"] == 2
+        assert index.lookup(vectors[0]) is None
+        assert index.lookup(vectors[4])[0] == "k4"
+
+        reloaded = SemanticRecipeIndex(0.99, "fake", path=db, max_entries=2)
+        assert len(reloaded) == 2
+        assert reloaded.lookup(vectors[2]) is None
+        assert [reloaded.lookup(v)[0] for v in vectors[3:]] == ["k3", "k4"]
+        assert len(SemanticRecipeIndex(0.99, "fake", path=db, max_entries=10)) == 2
+
+
+class TestBackendsAndMigration:
+    """Tests de la selection des backends et de la migration JSON."""
+
+    def test_create_recipe_cache(self, tmp_path):
+        assert isinstance(create_recipe_cache("sqlite", tmp_path / "c.db"), SQLiteRecipeCache)
+        assert isinstance(create_recipe_cache("json", tmp_path / "c.json"), JsonRecipeCache)
+        with pytest.raises(ValueError):
+            create_recipe_cache("redis", tmp_path / "c")
+
+    def test_migrate_json_cache(self, tmp_path):
+        """Toutes les recettes JSON sont importees, puis le fichier est renomme."""
+        json_path = tmp_path / "recipe_cache.json"
+        json_path.write_text(json.dumps({"k1": MOJITO, "k2": NEGRONI}), encoding="utf-8")
+        cache = SQLiteRecipeCache(tmp_path / "cache.db")
+
+        assert migrate_json_cache(json_path, cache) == 2
+        assert cache.get("k1") == MOJITO
+        assert cache.get("k2") == NEGRONI
+        assert not json_path.exists()
+        assert (tmp_path / "recipe_cache.json.migrated").exists()
+
+        # One-shot: rien a migrer au demarrage suivant
+        assert migrate_json_cache(json_path, cache) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
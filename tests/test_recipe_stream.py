@@ -0,0 +1,240 @@
+"""
+Tests pour la generation de recettes en streaming
+==================================================
+
+Parseur JSON incremental et pipeline generate_recipe_stream, avec un
+modele Gemini factice qui renvoie la reponse par morceaux.
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src import backend
+from src.gemini_client import GeminiClientPool
+from src.generation_service import GeminiTransport, GenerationService
+from src.model_router import ModelLimits, ModelRouter
+from src.recipe_stream import IncrementalRecipeParser
+
+
+RECIPE = {
+    "name": "Le \"Charleston\", version courte",
+    "ingredients": ["50ml Gin", "20ml Citron {frais}", "1 trait d'Angostura"],
+    "instructions": "1. Remplir de glace. 2. Secouer, puis filtrer.",
+    "taste_profile": {"Douceur": 2.0, "Acidite": 4.0},
+}
+RESPONSE = "```json\n" + json.dumps(RECIPE, indent=2, ensure_ascii=False) + "\n```"
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestIncrementalRecipeParser:
+    """Tests du parseur incremental."""
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64, 10000])
+    def test_fields_emitted_in_order_for_any_chunking(self, size):
+        parser = IncrementalRecipeParser()
+        events = []
+        for chunk in chunked(RESPONSE, size):
+            events.extend(parser.feed(chunk))
+
+        assert [field for field, _ in events] == list(RECIPE)
+        assert dict(events) == RECIPE
+        assert parser.result() == RECIPE
+
+    def test_field_available_before_end_of_stream(self):
+        """Le nom est emis des que la virgule qui le suit arrive."""
+        parser = IncrementalRecipeParser()
+        text = json.dumps(RECIPE)
+        cut = text.index('"ingredients"')
+
+        assert parser.feed(text[:cut]) == [("name", RECIPE["name"])]
+        assert parser.result() is None
+
+    def test_incomplete_object_has_no_result(self):
+        parser = IncrementalRecipeParser()
+        parser.feed(json.dumps(RECIPE)[:-10])
+        assert not parser.complete
+        assert parser.result() is None
+
+    def test_text_after_object_ignored(self):
+        parser = IncrementalRecipeParser()
+        parser.feed('{"name": "A"}\n``` et du texte {')
+        assert parser.result() == {"name": "A"}
+
+
+class StreamingModel:
+    """Modele factice: generate_content(stream=True) renvoie des morceaux."""
+
+    def __init__(self, text, chunk_size=5, fail_after=None):
+        self.chunks = chunked(text, chunk_size)
+        self.fail_after = fail_after
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        self.calls += 1
+        assert stream
+        return self._iterate()
+
+    def _iterate(self):
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError("connection reset")
+            yield SimpleNamespace(text=chunk)
+
+
+class GatedStreamingModel(StreamingModel):
+    """Modele factice dont le flux attend `release` avant le premier morceau."""
+
+    def __init__(self, text, **kwargs):
+        super().__init__(text, **kwargs)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def _iterate(self):
+        self.started.set()
+        self.release.wait(timeout=5)
+        yield from super()._iterate()
+
+
+@pytest.fixture
+def gemini(isolated_cache):
+    """Pool, routeur et service de generation factices: {nom: StreamingModel}."""
+    services = []
+
+    def install(models, **kwargs):
+        pool = GeminiClientPool(model_factory=lambda name: models[name])
+        router = ModelRouter({name: ModelLimits() for name in models})
+        service = GenerationService(GeminiTransport(pool), router, **kwargs)
+        services.append(service)
+        return patch.multiple(
+            backend,
+            GOOGLE_API_KEY="test",
+            get_client_pool=lambda: pool,
+            get_model_router=lambda: router,
+            get_generation_service=lambda: service,
+        )
+    yield install
+    for service in services:
+        service.close()
+
+
+class TestGenerateRecipeStream:
+    """Tests du pipeline generate_recipe_stream."""
+
+    def test_fields_then_done(self, sbert, gemini):
+        with gemini({"model-a": StreamingModel(RESPONSE)}):
+            events = list(backend.generate_recipe_stream("un gin citron"))
+
+        fields = [e["field"] for e in events if e["type"] == "field"]
+        assert fields[:3] == ["name", "ingredients", "instructions"]
+        assert events[-1]["type"] == "done"
+
+        result = events[-1]["result"]
+        assert result["status"] == "ok"
+        assert result["cached"] is False
+        assert result["recipe"]["name"] == RECIPE["name"]
+        assert result["recipe"]["taste_profile"]["Qualite"] == 3.0
+
+    def test_cache_written_only_when_complete(self, sbert, gemini):
+        key = backend._get_cache_key("un gin citron")
+        with gemini({"model-a": StreamingModel(RESPONSE)}):
+            stream = backend.generate_recipe_stream("un gin citron")
+            for event in stream:
+                if event["type"] == "field":
+                    assert backend.get_recipe_cache().get(key) is None
+
+        assert backend.get_recipe_cache().get(key)["name"] == RECIPE["name"]
+
+    def test_second_request_served_from_cache(self, sbert, gemini):
+        model = StreamingModel(RESPONSE)
+        with gemini({"model-a": model}):
+            list(backend.generate_recipe_stream("un gin citron"))
+            events = list(backend.generate_recipe_stream("un gin citron"))
+
+        assert model.calls == 1
+        assert [e["type"] for e in events] == ["done"]
+        assert events[0]["result"]["cached"] is True
+
+    def test_failover_before_first_field(self, sbert, gemini):
+        broken = StreamingModel(RESPONSE, fail_after=0)
+        healthy = StreamingModel(RESPONSE)
+        with gemini({"model-a": broken, "model-b": healthy}):
+            events = list(backend.generate_recipe_stream("un gin citron"))
+
+        assert broken.calls == 1 and healthy.calls == 1
+        assert events[-1]["result"]["recipe"]["name"] == RECIPE["name"]
+
+    def test_failure_after_fields_uses_fallback(self, sbert, gemini):
+        """Des champs deja affiches ne sont pas melanges avec un autre modele."""
+        broken = StreamingModel(RESPONSE, chunk_size=40, fail_after=3)
+        other = StreamingModel(RESPONSE)
+        with gemini({"model-a": broken, "model-b": other}):
+            events = list(backend.generate_recipe_stream("un gin citron"))
+
+        assert other.calls == 0
+        types = [e["type"] for e in events]
+        assert "field" in types
+        assert types[-2:] == ["reset", "done"]
+        assert events[-1]["result"]["recipe"]["name"] != RECIPE["name"]
+
+    def test_no_reset_when_nothing_shown(self, sbert, gemini):
+        with gemini({"model-a": StreamingModel(RESPONSE, fail_after=0)}):
+            events = list(backend.generate_recipe_stream("un gin citron"))
+
+        assert [e["type"] for e in events] == ["done"]
+
+    def test_concurrent_same_query_joins_stream(self, sbert, gemini):
+        """Un second appelant attend la recette du flux en cours, sans nouvel appel."""
+        model = GatedStreamingModel(RESPONSE)
+        with gemini({"model-a": model}):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                first = pool.submit(list, backend.generate_recipe_stream("un gin citron"))
+                assert model.started.wait(timeout=5)
+                second = pool.submit(list, backend.generate_recipe_stream("un gin citron"))
+                while backend.get_generation_service().stats()["coalesced"] < 1:
+                    time.sleep(0.01)
+                model.release.set()
+                streamed, joined = first.result(timeout=5), second.result(timeout=5)
+
+        assert model.calls == 1
+        assert streamed[-1]["result"]["recipe"]["name"] == RECIPE["name"]
+        assert [e["type"] for e in joined] == ["done"]
+        assert joined[0]["result"]["recipe"] == streamed[-1]["result"]["recipe"]
+
+    def test_stream_uses_service_timeout(self, sbert, gemini):
+        """Un flux trop lent est abandonne au profit du modele suivant."""
+        slow = GatedStreamingModel(RESPONSE)
+        healthy = StreamingModel(RESPONSE)
+        with gemini({"model-a": slow, "model-b": healthy}, timeout=0.2):
+            events = list(backend.generate_recipe_stream("un gin citron"))
+        slow.release.set()
+
+        assert healthy.calls == 1
+        assert events[-1]["result"]["recipe"]["name"] == RECIPE["name"]
+
+    def test_off_topic_query_rejected(self, sbert, gemini):
+        model = StreamingModel(RESPONSE)
+        with gemini({"model-a": model}):
+            events = list(backend.generate_recipe_stream("reparer mon velo"))
+
+        assert model.calls == 0
+        assert events == [{"type": "done", "result": events[0]["result"]}]
+        assert events[0]["result"]["status"] == "error"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -25,8 +25,10 @@ from src.scoring import (
     generate_profile_summary,
     identify_exploration_areas,
     enrich_short_query,
+    split_enriched_query,
     generate_progression_plan,
-    generate_taste_bio
+    generate_taste_bio,
+    score_batch
 )
 
 
@@ -92,6 +94,17 @@ class TestEnrichShortQuery:
 
         assert enriched == query, "Preferences neutres = pas d'enrichissement"
 
+    def test_split_enriched_query(self):
+        """Le contexte ajoute est separe du texte de l'utilisateur."""
+        preferences = {"Douceur": 5, "Acidite": 3, "Amertume": 1, "Force": 3, "Fraicheur": 4, "Complexite": 3, "Exotisme": 3}
+        enriched = enrich_short_query("mojito, menthe", preferences)
+
+        query, context = split_enriched_query(enriched)
+        assert query == "mojito, menthe"
+        assert context == enriched[len("mojito, menthe, "):]
+        assert split_enriched_query("un cocktail doux, rafraichissant et leger") == \
+            ("un cocktail doux, rafraichissant et leger", "")
+
 
 class TestProfileGeneration:
     """Tests pour la generation de profil (EF4.3)."""
@@ -204,9 +217,12 @@ class TestWeightedCoverageScore:
 
     def test_coverage_score_formula(self, mock_model):
         """Test de la formule Coverage Score = SWi*Si / SWi."""
-        with patch('src.scoring.calculate_block_similarity') as mock_sim:
+        with patch('src.scoring.calculate_all_block_similarities') as mock_sim:
             # Simule des scores fixes pour chaque bloc
-            mock_sim.return_value = (0.5, ["keyword1"])
+            mock_sim.return_value = (
+                {dim: 0.5 for dim in TASTE_BLOCKS},
+                {dim: ["keyword1"] for dim in TASTE_BLOCKS},
+            )
 
             preferences = {dim: 3 for dim in TASTE_BLOCKS}  # Tous neutres
             result = calculate_weighted_coverage_score("test query", preferences, mock_model)
@@ -217,8 +233,11 @@ class TestWeightedCoverageScore:
 
     def test_coverage_score_with_preferences(self, mock_model):
         """Test que les preferences influencent le score."""
-        with patch('src.scoring.calculate_block_similarity') as mock_sim:
-            mock_sim.return_value = (0.6, ["sweet"])
+        with patch('src.scoring.calculate_all_block_similarities') as mock_sim:
+            mock_sim.return_value = (
+                {dim: 0.6 for dim in TASTE_BLOCKS},
+                {dim: ["sweet"] for dim in TASTE_BLOCKS},
+            )
 
             # Preferences elevees
             high_prefs = {dim: 5 for dim in TASTE_BLOCKS}
@@ -234,6 +253,90 @@ class TestWeightedCoverageScore:
             assert result_low.coverage_score > 0
 
 
+class TestVectorizedBlockScoring:
+    """Le calcul vectorise donne le meme resultat que le calcul bloc par bloc."""
+
+    QUERIES = [
+        "cocktail tres sucre et doux avec fruits tropicaux",
+        "negroni amer avec campari et gin",
+        "mojito frais menthe citron",
+        "whisky",
+    ]
+
+    @staticmethod
+    def legacy_coverage_score(query, preferences, model):
+        """Reference: boucle historique sur calculate_block_similarity."""
+        query_embedding = model.encode(query, convert_to_numpy=True)
+        block_scores, weighted_scores, matched_keywords = {}, {}, {}
+        total_weighted_score, total_weight = 0.0, 0.0
+        for block_name, block_config in TASTE_BLOCKS.items():
+            score, matched = calculate_block_similarity(query_embedding, block_config["keywords"], model)
+            final_weight = block_config["weight"] * (preferences.get(block_name, 3) / 3.0)
+            block_scores[block_name] = round(score * 100, 1)
+            weighted_scores[block_name] = round(score * final_weight * 100, 1)
+            matched_keywords[block_name] = matched
+            total_weighted_score += score * final_weight
+            total_weight += final_weight
+        coverage = round(total_weighted_score / total_weight * 100, 1)
+        return coverage, block_scores, weighted_scores, matched_keywords
+
+    @pytest.mark.parametrize("query", QUERIES)
+    def test_identical_to_per_block_loop(self, fake_sbert, query):
+        preferences = {"Douceur": 5, "Acidite": 2, "Amertume": 1, "Force": 4, "Fraicheur": 3, "Complexite": 3, "Exotisme": 4}
+
+        result = calculate_weighted_coverage_score(query, preferences, fake_sbert)
+        coverage, block_scores, weighted_scores, matched_keywords = \
+            self.legacy_coverage_score(query, preferences, fake_sbert)
+
+        assert result.coverage_score == coverage
+        assert result.block_scores == block_scores
+        assert result.weighted_scores == weighted_scores
+        assert result.matched_keywords == matched_keywords
+
+    def test_keywords_encoded_once(self, fake_sbert):
+        """Les mots-cles des 7 blocs sont encodes en une seule passe."""
+        preferences = dict(DEFAULT_USER_WEIGHTS)
+        calculate_weighted_coverage_score("mojito frais", preferences, fake_sbert)
+        calculate_weighted_coverage_score("negroni amer", preferences, fake_sbert)
+
+        n_keywords = sum(len(block["keywords"]) for block in TASTE_BLOCKS.values())
+        assert len(fake_sbert.encoded_texts) == n_keywords + 2
+
+
+class TestScoreBatch:
+    """Tests du scoring par lots (analyses hors-ligne)."""
+
+    QUERIES = ["mojito frais menthe", "negroni amer campari", "punch tropical ananas coco"]
+    PROFILES = [
+        dict(DEFAULT_USER_WEIGHTS),
+        {"Douceur": 5, "Acidite": 1, "Amertume": 1, "Force": 2, "Fraicheur": 4, "Complexite": 3, "Exotisme": 5},
+    ]
+
+    def test_matches_single_query_scoring(self, fake_sbert):
+        """Chaque ligne correspond au calcul requete par requete."""
+        scores = score_batch(self.QUERIES, self.PROFILES, fake_sbert, batch_size=2)
+
+        assert len(scores) == len(self.QUERIES) * len(self.PROFILES)
+        for row in scores:
+            expected = calculate_weighted_coverage_score(
+                self.QUERIES[row["query"]], self.PROFILES[row["profile"]], fake_sbert)
+            assert row["coverage_score"] == pytest.approx(expected.coverage_score, abs=0.1)
+            for dim, score in expected.block_scores.items():
+                assert row[dim] == pytest.approx(score, abs=0.1)
+
+    def test_accepts_likert_matrix(self, fake_sbert):
+        """Une matrice [n_profils x 7] equivaut a la liste de dictionnaires."""
+        matrix = np.array([[p[dim] for dim in TASTE_BLOCKS] for p in self.PROFILES])
+
+        from_dicts = score_batch(self.QUERIES, self.PROFILES, fake_sbert)
+        from_matrix = score_batch(self.QUERIES, matrix, fake_sbert)
+
+        np.testing.assert_array_equal(from_dicts, from_matrix)
+
+    def test_empty_input(self, fake_sbert):
+        assert len(score_batch([], self.PROFILES, fake_sbert)) == 0
+
+
 class TestIntegrationScoring:
     """Tests d'integration avec le vrai modele SBERT."""
 
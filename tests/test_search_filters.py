@@ -0,0 +1,78 @@
+"""
+Tests pour les filtres de la recherche semantique
+==================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import pandas as pd
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.catalog import CocktailCatalog
+from src.search_filters import is_alcoholic
+
+
+@pytest.fixture
+def catalog():
+    """Mini catalogue au format de load_cocktails_csv()."""
+    return pd.DataFrame({
+        "name": ["Mojito", "Negroni", "Virgin Colada", "Zombie"],
+        "description_semantique": [
+            "Mojito est un cocktail Classic alcoolise.",
+            "Un classique amer.",
+            "Virgin Colada est un cocktail Sans alcool sans alcool.",
+            "Un punch tiki puissant.",
+        ],
+        "category": ["Classic", "Classic", "Sans alcool", "Tiki"],
+        "difficulty": ["Facile", "Moyen", "Facile", "Difficile"],
+        "prep_time": [4, 5, 3, 12],
+        "source": ["kaggle", "generated", "kaggle", "generated"],
+    })
+
+
+class TestFilterMasks:
+    """Tests des masques booleens par filtre."""
+
+    def test_no_active_filter(self, catalog):
+        """'Tous' partout: pas de masque (recherche non filtree)."""
+        masks = CocktailCatalog.from_dataframe(catalog).filters
+        assert masks.build({"source": "Tous", "difficulty": "Tous"}) is None
+        assert masks.build(None) is None
+
+    def test_ui_labels(self, catalog):
+        """Les libelles de l'interface sont traduits en valeurs du CSV."""
+        masks = CocktailCatalog.from_dataframe(catalog).filters
+
+        assert list(masks.build({"source": "Base Kaggle"})) == [True, False, True, False]
+        assert list(masks.build({"difficulty": "Expert"})) == [False, False, False, True]
+        assert list(masks.build({"alcohol": "Sans Alcool"})) == [False, False, True, False]
+
+    def test_prep_time_buckets(self, catalog):
+        masks = CocktailCatalog.from_dataframe(catalog).filters
+
+        assert list(masks.build({"prep_time": "< 5 min"})) == [True, False, True, False]
+        assert list(masks.build({"prep_time": "5-10 min"})) == [False, True, False, False]
+        assert list(masks.build({"prep_time": "> 10 min"})) == [False, False, False, True]
+
+    def test_filters_combined(self, catalog):
+        """Plusieurs filtres: ET logique."""
+        mask = CocktailCatalog.from_dataframe(catalog).filters.build({
+            "source": "Base Kaggle", "alcohol": "Avec Alcool", "category": "Classic",
+        })
+        assert list(mask) == [True, False, False, False]
+
+    def test_unknown_value_matches_nothing(self, catalog):
+        mask = CocktailCatalog.from_dataframe(catalog).filters.build({"category": "Inexistante"})
+        assert not mask.any()
+
+    def test_alcohol_status(self, catalog):
+        assert list(is_alcoholic(catalog)) == [True, True, False, True]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,71 @@
+"""
+Tests pour la normalisation des noms d'ingredients
+===================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.text_normalization import normalize_many, normalize_name, split_quantity, strip_accents
+
+
+class TestNormalizeName:
+    """Tests de la normalisation des noms."""
+
+    @pytest.mark.parametrize("raw, expected", [
+        ("Crème de Cassis", "creme de cassis"),
+        ("  Jus d'Orange ", "jus dorange"),
+        ("Rhum Blanc!", "rhum blanc"),
+        ("ginger-beer", "ginger-beer"),
+        ("Cachaça", "cachaca"),
+    ])
+    def test_profiler_form(self, raw, expected):
+        assert normalize_name(raw) == expected
+
+    def test_punctuation_kept_for_known_keys(self):
+        assert normalize_name("Jus d'Orange", strip_punctuation=False) == "jus d'orange"
+
+    def test_strip_accents_keeps_ascii(self):
+        assert strip_accents("Tequila") == "Tequila"
+        assert strip_accents("Négroni Épicé") == "Negroni Epice"
+
+    def test_memoized(self):
+        normalize_name.cache_clear()
+        for _ in range(3):
+            normalize_name("Crème de Menthe")
+        info = normalize_name.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_normalize_many(self):
+        names = ["Gin", "Crème de Cassis", "gin", "Gin"]
+        assert normalize_many(names) == ["gin", "creme de cassis", "gin", "gin"]
+        assert normalize_many(names, strip_punctuation=False) == [normalize_name(n, False) for n in names]
+        assert normalize_many([]) == []
+
+
+class TestSplitQuantity:
+    """Tests de l'extraction des quantites."""
+
+    @pytest.mark.parametrize("text, expected", [
+        ("60ml Vodka", (60.0, "Vodka")),
+        ("6 cl Gin", (60.0, "Gin")),
+        ("2 oz Rum", (60.0, "Rum")),
+        ("1 TBSP Sugar syrup", (15.0, "Sugar syrup")),
+        ("2 dash Angostura", (1.0, "Angostura")),
+        ("Mint leaves", (1.0, "Mint leaves")),
+    ])
+    def test_quantities(self, text, expected):
+        assert split_quantity(text) == expected
+
+    def test_fraction(self):
+        assert split_quantity("1/2 oz Lime juice")[0] == 15.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,133 @@
+"""
+Tests pour les index vectoriels (recherche exacte et IVF)
+==========================================================
+
+Auteurs: Adam Beloucif & Amina Medjdoub
+Projet: RNCP Bloc 2 - Expert en Ingenierie de Donnees
+"""
+
+import pytest
+import numpy as np
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.embeddings import normalize_embeddings
+from src.vector_index import ExactIndex, IVFIndex, build_index, measure_recall, top_k
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    """Corpus synthetique en grappes (comme des familles de cocktails)."""
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(40, 64))
+    rows = centers[rng.integers(0, 40, size=4000)] + 0.3 * rng.normal(size=(4000, 64))
+    queries = centers[rng.integers(0, 40, size=50)] + 0.3 * rng.normal(size=(50, 64))
+    return normalize_embeddings(rows), normalize_embeddings(queries)
+
+
+class TestTopK:
+    """Tests de la selection top-k par argpartition."""
+
+    def test_matches_full_sort(self):
+        scores = np.random.default_rng(0).random(1000)
+        np.testing.assert_array_equal(top_k(scores, 10), np.argsort(scores)[::-1][:10])
+
+    def test_k_larger_than_corpus(self):
+        assert list(top_k(np.array([0.1, 0.9, 0.5]), 10)) == [1, 2, 0]
+
+    def test_empty(self):
+        assert len(top_k(np.array([]), 5)) == 0
+
+
+class TestExactIndex:
+    """Tests de l'index exact (reference)."""
+
+    def test_search_returns_best_rows(self, corpus):
+        embeddings, queries = corpus
+        indices, scores = ExactIndex(embeddings).search(queries[0], 5)
+
+        expected = embeddings @ queries[0]
+        np.testing.assert_array_equal(indices, np.argsort(expected)[::-1][:5])
+        np.testing.assert_allclose(scores, expected[indices])
+
+
+class TestIVFIndex:
+    """Tests de l'index approximatif IVF."""
+
+    def test_recall_on_clustered_corpus(self, corpus):
+        """Rappel eleve en ne parcourant qu'une partie des listes."""
+        embeddings, queries = corpus
+        index = IVFIndex(embeddings, n_lists=64, nprobe=8)
+
+        assert measure_recall(index, embeddings, queries, k=10) >= 0.9
+
+    def test_all_lists_probed_is_exact(self, corpus):
+        """Avec nprobe = n_lists, l'IVF retrouve exactement les memes voisins."""
+        embeddings, queries = corpus
+        index = IVFIndex(embeddings, n_lists=16, nprobe=16)
+
+        assert measure_recall(index, embeddings, queries, k=10) == 1.0
+
+    def test_every_row_assigned_once(self, corpus):
+        embeddings, _ = corpus
+        index = IVFIndex(embeddings, n_lists=32)
+
+        assert index.offsets[-1] == len(embeddings)
+        np.testing.assert_array_equal(np.sort(index.ids), np.arange(len(embeddings)))
+
+
+class TestMaskedSearch:
+    """Tests du filtrage avant la selection du top-k."""
+
+    @pytest.fixture
+    def mask(self, corpus):
+        embeddings, _ = corpus
+        return np.random.default_rng(1).random(len(embeddings)) < 0.1
+
+    def test_exact_results_fill_top_k(self, corpus, mask):
+        """Seules les lignes autorisees sont retournees, et il y en a k."""
+        embeddings, queries = corpus
+        indices, _ = ExactIndex(embeddings).search(queries[0], 10, mask=mask)
+
+        assert len(indices) == 10
+        assert mask[indices].all()
+        allowed = np.flatnonzero(mask)
+        expected = allowed[np.argsort(embeddings[allowed] @ queries[0])[::-1][:10]]
+        np.testing.assert_array_equal(indices, expected)
+
+    def test_fewer_allowed_rows_than_k(self, corpus):
+        embeddings, queries = corpus
+        mask = np.zeros(len(embeddings), dtype=bool)
+        mask[[3, 7]] = True
+
+        for index in (ExactIndex(embeddings), IVFIndex(embeddings, n_lists=32, nprobe=2)):
+            indices, scores = index.search(queries[0], 5, mask=mask)
+            assert sorted(indices) == [3, 7]
+            assert np.isfinite(scores).all()
+
+    def test_ivf_fills_top_k(self, corpus, mask):
+        embeddings, queries = corpus
+        index = IVFIndex(embeddings, n_lists=64, nprobe=1)
+
+        for query in queries[:10]:
+            indices, _ = index.search(query, 10, mask=mask)
+            assert len(indices) == 10
+            assert mask[indices].all()
+
+
+class TestBuildIndex:
+    """Tests du choix de backend selon la taille du corpus."""
+
+    def test_small_corpus_uses_exact_index(self, corpus):
+        embeddings, _ = corpus
+        assert isinstance(build_index(embeddings), ExactIndex)
+
+    def test_large_corpus_uses_ivf(self, corpus):
+        embeddings, _ = corpus
+        assert isinstance(build_index(embeddings, min_ivf_rows=1000), IVFIndex)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])